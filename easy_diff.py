@@ -6,27 +6,70 @@ License: MIT
 """
 import sublime
 import time
-import difflib
+import hashlib
+import re
 from os.path import basename, join, splitext, exists
 from os import stat as osstat
 import tempfile
-from EasyDiff.easy_diff_global import load_settings, get_encoding, notify
+from EasyDiff.easy_diff_global import load_settings, get_encoding, notify, log
+from EasyDiff.lib.multiconf import get as multiget
+import EasyDiff.lib.differ as differ
+import EasyDiff.lib.folders as folders
+from EasyDiff.lib.lru import LRUCache
+from EasyDiff.lib.mapped import MappedLines, is_supported_encoding
+from EasyDiff.lib.snapshot import TextSnapshot
+from EasyDiff.easy_diff_highlight import track as track_highlights
+from EasyDiff.easy_diff_side_by_side import SideBySide
+from EasyDiff.easy_diff_navigate import register as register_hunks
+from EasyDiff.lib.hunks import HunkIndex
 import subprocess
+import threading
+import traceback
+import concurrent.futures
+import multiprocessing
 
 LEFT = 1
 RIGHT = 2
 
+# Status bar refresh interval (ms) while a diff runs
+STATUS_INTERVAL = 250
+
+# Characters written to the diff view per batch
+OUTPUT_CHUNK_SIZE = 256 * 1024
+
+# Block size (bytes or characters) used when checking if both sides are identical
+COMPARE_BLOCK_SIZE = 1024 * 1024
+
+# Approximate memory overhead of a cached diff line and of a cache entry
+CACHE_LINE_OVERHEAD = 57
+CACHE_ENTRY_OVERHEAD = 64
+
+# Cache of diff results (hunk lines) keyed by the identity of both sides and the diff options
+DIFF_CACHE = LRUCache(0)
+
+# Options to ignore kinds of differences, from the settings or command arguments
+IGNORE_OPTIONS = ("ignore_whitespace_change", "ignore_all_whitespace", "ignore_case", "ignore_eol")
+
+# Worker pool for segmented diffs and the (workers, python) config it was created with
+EXECUTOR = None
+EXECUTOR_CONFIG = None
+EXECUTOR_LOCK = threading.Lock()
+
+# Single thread that computes diff statistics one request at a time
+STATS_EXECUTOR = None
+
 
 class EasyDiffView(object):
-    """Simulate the look of a view."""
+    """Simulate the look of a view (the content is kept as a compact `TextSnapshot`)."""
 
     def __init__(self, name, content, encoding):
         """Initialize."""
 
         self.filename = name
-        self.content = content
+        self.content = TextSnapshot(content)
         self.time = time.ctime()
         self.encode = encoding
+        self.hash = None
 
     def encoding(self):
         """Return enconding."""
@@ -46,13 +89,25 @@ class EasyDiffView(object):
     def substr(self, region):
         """Get the desired region from the content buffer."""
 
-        return self.content[region.begin():region.end() + 1]
+        return self.content.substr(region.begin(), region.end())
 
     def size(self):
         """Get the size."""
 
         return len(self.content)
 
+    def lines(self):
+        """Iterate the lines of the content."""
+
+        return self.content.lines()
+
+    def digest(self):
+        """Get a digest of the content."""
+
+        if self.hash is None:
+            self.hash = hashlib.sha1(self.content.data).hexdigest()
+        return self.hash
+
 
 class EasyDiffInput(object):
     """Class for diff input."""
@@ -62,6 +117,11 @@ class EasyDiffInput(object):
 
         self.untitled = False
         self.temp_folder = None
+        self.interner = differ.LineInterner()
+        self.views = {}
+        self.b1 = []
+        self.b2 = []
+        self.loaded = external
         self.process_view(v1, LEFT, external)
         self.process_view(v2, RIGHT, external)
 
@@ -77,17 +137,139 @@ class EasyDiffInput(object):
         else:
             self.set_view(view)
 
-        self.set_buffer(view, external)
+        self.views[side] = view
+
+    def load(self, check=None, large_file_size=0, key=None):
+        """
+        Read the buffers of both sides.
+
+        This is deferred from initialization so it can be done on a worker thread.
+        If a side is a clean view of a file of at least `large_file_size` bytes,
+        the file is memory mapped instead of copying the view's content.
+        Lines are compared by `key` if given (see `differ.line_key`).
+        """
+
+        if not self.loaded:
+            self.interner = differ.LineInterner(key)
+            large = {}
+            if large_file_size > 0:
+                for side in (LEFT, RIGHT):
+                    large[side] = self.large_file(self.views[side], large_file_size)
+            encodings = dict((side, get_encoding(self.views[side])) for side in (LEFT, RIGHT))
+            # Lines can only be hashed without decoding them if both sides hash the same bytes.
+            hash_bytes = (
+                key is None and large.get(LEFT) is not None and large.get(RIGHT) is not None and
+                encodings[LEFT] == encodings[RIGHT]
+            )
+            for side in (LEFT, RIGHT):
+                self.side = side
+                if large.get(side) is not None:
+                    self.set_mapped_buffer(large[side], encodings[side], check, key, hash_bytes)
+                else:
+                    self.set_buffer(self.views[side], any(large.values()), key)
+            self.loaded = True
+
+    def close(self):
+        """Release memory mapped files."""
+
+        for side in (LEFT, RIGHT):
+            bfr = getattr(self, "b%d" % side)
+            if isinstance(bfr, MappedLines):
+                bfr.close()
+
+    def cache_key(self, options):
+        """Get the result cache key for the inputs and diff options."""
+
+        return (
+            self.view_key(self.views[LEFT]),
+            self.view_key(self.views[RIGHT]),
+            tuple(sorted(options.items()))
+        )
+
+    def view_key(self, view):
+        """Identify a side's content: views by id and change count, snapshots by content digest."""
+
+        if isinstance(view, EasyDiffView):
+            return ("content", view.digest())
+        return ("view", view.id(), view.change_count())
+
+    def clean_file(self, view):
+        """Get the file name of a view whose buffer matches the file on disk."""
 
-    def set_buffer(self, view, external):
+        name = view.file_name()
+        if (
+            isinstance(view, EasyDiffView) or name is None or
+            view.is_dirty() or not exists(name)
+        ):
+            name = None
+        return name
+
+    def identical(self):
+        """
+        Quickly check if both sides have identical content.
+
+        Sizes are compared first, and then the content is compared block by block
+        without building the line buffers.  Clean views of files on disk are read
+        from the files directly.  A `False` result only means the sides may differ.
+        """
+
+        v1, v2 = self.views[LEFT], self.views[RIGHT]
+        if isinstance(v1, EasyDiffView) and isinstance(v2, EasyDiffView):
+            return v1.content.data == v2.content.data
+        file1, file2 = self.clean_file(v1), self.clean_file(v2)
+        if file1 is not None and file2 is not None:
+            if osstat(file1).st_size != osstat(file2).st_size:
+                return False
+            with open(file1, "rb") as f1, open(file2, "rb") as f2:
+                while True:
+                    block = f1.read(COMPARE_BLOCK_SIZE)
+                    if block != f2.read(COMPARE_BLOCK_SIZE):
+                        return False
+                    if not block:
+                        return True
+
+        size = v1.size()
+        if size != v2.size():
+            return False
+        for start in range(0, size, COMPARE_BLOCK_SIZE):
+            region = sublime.Region(start, min(start + COMPARE_BLOCK_SIZE, size))
+            if v1.substr(region) != v2.substr(region):
+                return False
+        return True
+
+    def large_file(self, view, large_file_size):
+        """Get the file name if the view is a clean view of a large file that can be memory mapped."""
+
+        name = self.clean_file(view)
+        if (
+            name is not None and
+            osstat(name).st_size >= large_file_size and
+            is_supported_encoding(get_encoding(view))
+        ):
+            return name
+        return None
+
+    def set_buffer(self, view, hashed=False, key=None):
         """Set buffer."""
 
+        if isinstance(view, EasyDiffView):
+            # Decode the snapshot's lines directly instead of copying the whole text first.
+            lines = view.lines() if not hashed else list(view.lines())
+        else:
+            lines = differ.split_lines(view.substr(sublime.Region(0, view.size())))
         setattr(
             self,
             "b%d" % self.side,
-            view.substr(sublime.Region(0, view.size())).splitlines() if not external else []
+            differ.HashedLines(lines, key) if hashed else self.interner.intern(lines)
         )
 
+    def set_mapped_buffer(self, name, encoding, check=None, key=None, hash_bytes=False):
+        """Set buffer from a memory mapped file."""
+
+        bfr = MappedLines(name, encoding, key, hash_bytes)
+        setattr(self, "b%d" % self.side, bfr)
+        bfr.index(check)
+
     def set_view(self, view):
         """Set the view."""
 
@@ -156,32 +338,565 @@ class EasyDiff(object):
         )
 
     @classmethod
-    def compare(cls, inputs):
-        """Compare the views."""
-
-        diff = difflib.unified_diff(
-            inputs.b1, inputs.b2,
-            inputs.f1, inputs.f2,
-            inputs.t1, inputs.t2,
-            lineterm=''
+    def get_options(cls, overrides=None):
+        """Get the diff options from the settings, overridden by command arguments."""
+
+        settings = load_settings()
+        options = {
+            "algorithm": multiget(settings, "diff_algorithm", differ.AUTO)
+        }
+        for name in IGNORE_OPTIONS:
+            value = overrides.get(name) if overrides else None
+            options[name] = bool(multiget(settings, name, False) if value is None else value)
+        patterns = overrides.get("ignore_patterns") if overrides else None
+        if patterns is None:
+            patterns = multiget(settings, "diff_ignore_patterns", [])
+        options["ignore_patterns"] = tuple(patterns)
+        return options
+
+    @classmethod
+    def ignores(cls, options):
+        """Check if the options ignore any differences."""
+
+        return bool(options["ignore_patterns"]) or any(options[name] for name in IGNORE_OPTIONS)
+
+    @classmethod
+    def line_key(cls, options):
+        """Get the line normalization function for the options (or `None`)."""
+
+        kwargs = dict((name, options[name]) for name in IGNORE_OPTIONS)
+        try:
+            return differ.line_key(ignore_patterns=options["ignore_patterns"], **kwargs)
+        except re.error as e:
+            log("Invalid diff_ignore_patterns, patterns are not applied: %s" % e, status=True)
+            return differ.line_key(**kwargs)
+
+    @classmethod
+    def compare(cls, inputs, overrides=None):
+        """Compare the views in the background and show the result."""
+
+        settings = load_settings()
+        DIFF_CACHE.set_max_size(int(multiget(settings, "diff_cache_size_mb", 32)) * 1024 * 1024)
+        large_file_size = int(multiget(settings, "large_file_threshold_mb", 64)) * 1024 * 1024
+        workers = int(multiget(settings, "diff_parallel_workers", 0))
+        executor = get_executor(workers, multiget(settings, "diff_parallel_python", ""))
+        budget = int(multiget(settings, "diff_time_budget_ms", 0)) / 1000.0
+        options = cls.get_options(overrides)
+        title = "EasyDiff: %s -> %s (%s)" % (basename(inputs.f1), basename(inputs.f2), time.ctime())
+        work = cls.get_side_by_side if multiget(settings, "diff_layout", "unified") == "side_by_side" else cls.get_diff
+        DiffJob.start(
+            sublime.active_window(),
+            lambda job: work(inputs, options, large_file_size, job, executor, workers, budget),
+            title,
+            (inputs.f1, inputs.f2)
+        )
+
+    @classmethod
+    def compare_folders(cls, left, right):
+        """Compare the files of two folders in the background and show a summary."""
+
+        settings = load_settings()
+        workers = max(int(multiget(settings, "folder_compare_workers", 4)), 1)
+        exclude = tuple(multiget(settings, "folder_compare_exclude", [".git", ".hg", ".svn"]))
+        title = "EasyDiff: %s/ -> %s/ (%s)" % (basename(left), basename(right), time.ctime())
+        DiffJob.start(
+            sublime.active_window(),
+            lambda job: cls.get_folder_summary(left, right, workers, exclude, job),
+            title,
+            (left, right),
+            use_buffer=True,
+            kind="folders"
         )
-        result = u"\n".join(line for line in diff)
 
-        if result == "":
-            notify("No Difference")
-            return
+    @classmethod
+    def get_folder_summary(cls, left, right, workers, exclude, job):
+        """
+        Generate the lines of a folder compare summary (worker thread).
+
+        Each differing file is listed as `<status> <path>` where the status is
+        `-` (removed), `+` (added), `!` (modified), or `?` (unreadable).
+        """
+
+        job.set_phase("Scanning")
+        # Both folders are scanned at the same time, so there are always at least two workers.
+        executor = concurrent.futures.ThreadPoolExecutor(max(workers, 2))
+        counts = dict((status, 0) for status in (folders.REMOVED, folders.ADDED, folders.MODIFIED, folders.ERROR))
+        try:
+            for status, path in folders.compare_folders(left, right, executor, workers, exclude, job.check):
+                if not any(counts.values()):
+                    job.set_phase("Comparing")
+                    yield "--- %s" % left
+                    yield "+++ %s" % right
+                counts[status] += 1
+                yield "%s %s" % (status, path)
+        finally:
+            executor.shutdown(wait=False)
+        if any(counts.values()):
+            yield ""
+            yield "%d removed, %d added, %d modified, %d unreadable" % (
+                counts[folders.REMOVED], counts[folders.ADDED], counts[folders.MODIFIED], counts[folders.ERROR]
+            )
+
+    @classmethod
+    def stats(cls, inputs, overrides=None, callback=None):
+        """
+        Count the changes between the inputs in the background.
+
+        `callback` is called on the main thread with the statistics (see `get_stats`),
+        or `None` if the inputs could not be compared; by default they are shown in the
+        status bar.  Requests are queued and computed one at a time, so many pairs can
+        be submitted at once.
+        """
+
+        global STATS_EXECUTOR
+
+        settings = load_settings()
+        large_file_size = int(multiget(settings, "large_file_threshold_mb", 64)) * 1024 * 1024
+        workers = int(multiget(settings, "diff_parallel_workers", 0))
+        executor = get_executor(workers, multiget(settings, "diff_parallel_python", ""))
+        budget = int(multiget(settings, "diff_time_budget_ms", 0)) / 1000.0
+        options = cls.get_options(overrides)
+        names = (basename(inputs.f1), basename(inputs.f2))
+
+        def run():
+            try:
+                stats = cls.get_stats(inputs, options, large_file_size, None, executor, workers, budget)
+            except Exception:
+                log("Diff statistics failed!\n%s" % traceback.format_exc())
+                stats = None
+            sublime.set_timeout(
+                lambda: callback(stats) if callback is not None else show_stats(names, stats), 0
+            )
+
+        if STATS_EXECUTOR is None:
+            STATS_EXECUTOR = concurrent.futures.ThreadPoolExecutor(1)
+        STATS_EXECUTOR.submit(run)
+
+    @classmethod
+    def get_stats(cls, inputs, options, large_file_size=0, check=None, executor=None, workers=0, budget=0):
+        """
+        Match the inputs and count the changes without generating any diff text (worker thread).
+
+        Returns the dict of `differ.LineMatcher.get_stats` with `approximate` added.
+        The inputs are closed when done.
+        """
+
+        try:
+            if inputs.identical():
+                return {"added": 0, "removed": 0, "changed": 0, "hunks": 0, "ratio": 1.0, "approximate": False}
+            inputs.load(check, large_file_size, cls.line_key(options))
+            matcher = differ.LineMatcher(
+                inputs.b1, inputs.b2, options["algorithm"], check, executor, workers, budget
+            )
+            stats = matcher.get_stats()
+            executor_failed(executor, matcher.executor_error)
+            stats["approximate"] = matcher.approximate
+            return stats
+        finally:
+            inputs.close()
+
+    @classmethod
+    def match(cls, inputs, options, large_file_size, job, executor=None, workers=0, budget=0):
+        """Load and match the inputs (worker thread); the inputs are closed on failure."""
+
+        try:
+            inputs.load(job.check, large_file_size, cls.line_key(options))
+            job.set_phase("Matching")
+            matcher = differ.LineMatcher(
+                inputs.b1, inputs.b2, options["algorithm"], job.check, executor, workers, budget
+            )
+            matcher.get_opcodes()
+            executor_failed(executor, matcher.executor_error)
+            job.approximate = matcher.approximate
+            job.set_phase("Writing")
+        except Exception:
+            inputs.close()
+            raise
+        return matcher
 
-        use_buffer = bool(load_settings().get("use_buffer", False))
+    @classmethod
+    def get_diff(cls, inputs, options, large_file_size, job, executor=None, workers=0, budget=0):
+        """
+        Match the inputs and return a generator of unified diff lines (worker thread).
+
+        If matching exceeds the time budget (seconds), the job is marked approximate
+        and the result is not cached.
+        """
+
+        job.set_phase("Reading")
+        key = inputs.cache_key(options)
+        body = DIFF_CACHE.get(key)
+        if body is not None:
+            return cls.cached_diff(inputs, body)
+        if inputs.identical():
+            DIFF_CACHE.put(key, [], CACHE_ENTRY_OVERHEAD)
+            return []
+        matcher = cls.match(inputs, options, large_file_size, job, executor, workers, budget)
+        return cls.cache_diff(
+            None if matcher.approximate else key,
+            differ.unified_diff(
+                inputs.b1, inputs.b2,
+                inputs.f1, inputs.f2,
+                inputs.t1, inputs.t2,
+                lineterm='',
+                matcher=matcher,
+                check=job.check
+            ),
+            inputs.close
+        )
+
+    @classmethod
+    def get_side_by_side(cls, inputs, options, large_file_size, job, executor=None, workers=0, budget=0):
+        """Match the inputs and show them side by side in a new window (worker thread)."""
+
+        job.set_phase("Reading")
+        if inputs.identical():
+            job.call(notify, "No Difference")
+            return None
+        matcher = cls.match(inputs, options, large_file_size, job, executor, workers, budget)
+        opcodes = matcher.get_opcodes()
+        if all(code[0] == 'equal' for code in opcodes):
+            # The ignore options can leave nothing to show.
+            inputs.close()
+            job.call(notify, "No Difference")
+            return None
+        suffix = " (approximate)" if matcher.approximate else ""
+        panes = SideBySide(
+            None,
+            (basename(inputs.f1) + suffix, basename(inputs.f2) + suffix),
+            opcodes
+        )
+        try:
+            job.call(panes.open)
+            for side in (0, 1):
+                for chunk in iter_chunks(panes.lines(side, inputs.b1, inputs.b2)):
+                    job.check()
+                    job.call(panes.write, side, chunk)
+            job.call(panes.finish)
+        except differ.DiffCancelledError:
+            job.call(panes.cancel)
+            raise
+        finally:
+            inputs.close()
+        return None
 
-        win = sublime.active_window()
-        if use_buffer:
-            v = win.new_file()
-            v.set_name("EasyDiff: %s -> %s (%s)" % (basename(inputs.f1), basename(inputs.f2), time.ctime()))
-            v.set_scratch(True)
-            v.assign_syntax('Packages/Diff/Diff.tmLanguage')
-            v.run_command('append', {'characters': result})
+    @classmethod
+    def cached_diff(cls, inputs, body):
+        """Generate a diff from cached hunk lines."""
+
+        if body:
+            for line in differ.unified_header(inputs.f1, inputs.f2, inputs.t1, inputs.t2, lineterm=''):
+                yield line
+            for line in body:
+                yield line
+
+    @classmethod
+    def cache_diff(cls, key, diff, done=None):
+        """
+        Pass through diff lines and cache the hunk lines once the diff is complete.
+
+        `done` is called when the diff is finished or abandoned.
+        Nothing is cached if `key` is `None`.
+        """
+
+        body = []
+        size = CACHE_ENTRY_OVERHEAD
+        limit = DIFF_CACHE.max_size
+        try:
+            for index, line in enumerate(diff):
+                if index > 1 and body is not None:
+                    body.append(line)
+                    size += len(line) + CACHE_LINE_OVERHEAD
+                    if size > limit:
+                        body = None
+                yield line
+        finally:
+            if done is not None:
+                done()
+        if body is not None and key is not None:
+            DIFF_CACHE.put(key, body, size)
+
+
+def format_stats(stats):
+    """Format diff statistics for display."""
+
+    return "+%d -%d ~%d lines in %d hunk%s, %.1f%% similar%s" % (
+        stats["added"], stats["removed"], stats["changed"],
+        stats["hunks"], "" if stats["hunks"] == 1 else "s",
+        stats["ratio"] * 100,
+        " (approximate)" if stats["approximate"] else ""
+    )
+
+
+def show_stats(names, stats):
+    """Show the statistics of a compare in the status bar (main thread)."""
+
+    if stats is None:
+        sublime.status_message("EasyDiff: Could not compare %s -> %s" % names)
+    else:
+        sublime.status_message("EasyDiff: %s -> %s: %s" % (names[0], names[1], format_stats(stats)))
+
+
+def get_executor(workers, python=""):
+    """
+    Get the worker pool for segmented diffs.
+
+    Worker processes are only used if a Python interpreter is configured,
+    as the plugin host cannot spawn itself; otherwise a thread pool is used.
+    """
+
+    global EXECUTOR
+    global EXECUTOR_CONFIG
+
+    config = (workers, python)
+    with EXECUTOR_LOCK:
+        if EXECUTOR is not None and EXECUTOR_CONFIG != config:
+            EXECUTOR.shutdown(wait=False)
+            EXECUTOR = None
+            EXECUTOR_CONFIG = None
+
+        if workers > 1 and EXECUTOR is None:
+            if python and exists(python):
+                try:
+                    context = multiprocessing.get_context("spawn")
+                    context.set_executable(python)
+                    EXECUTOR = concurrent.futures.ProcessPoolExecutor(workers, mp_context=context)
+                except Exception as e:
+                    log("Could not create diff worker processes, falling back to threads: %s" % e)
+            if EXECUTOR is None:
+                EXECUTOR = concurrent.futures.ThreadPoolExecutor(workers)
+            EXECUTOR_CONFIG = config
+
+        return EXECUTOR
+
+
+def executor_failed(executor, error):
+    """
+    Replace a worker pool that failed while matching with threads (any thread).
+
+    The diff itself was finished without the workers; worker processes that could
+    not be started once will not start for the next diff either.
+    """
+
+    global EXECUTOR
+
+    if error is None:
+        return
+    log("Diff workers failed, matching continued without them: %s" % error)
+    with EXECUTOR_LOCK:
+        if executor is EXECUTOR and not isinstance(executor, concurrent.futures.ThreadPoolExecutor):
+            executor.shutdown(wait=False)
+            EXECUTOR = concurrent.futures.ThreadPoolExecutor(EXECUTOR_CONFIG[0])
+
+
+def iter_chunks(result, size=OUTPUT_CHUNK_SIZE):
+    """Split diff text, or join an iterable of diff lines, into chunks of roughly `size` characters."""
+
+    if isinstance(result, str):
+        for start in range(0, len(result), size):
+            yield result[start:start + size]
+        return
+
+    batch = []
+    count = 0
+    sep = ""
+    for line in result:
+        batch.append(line)
+        count += len(line) + 1
+        if count >= size:
+            yield sep + "\n".join(batch)
+            sep = "\n"
+            batch = []
+            count = 0
+    if batch:
+        yield sep + "\n".join(batch)
+
+
+class DiffOutput(object):
+    """Diff output view or panel that is written in chunks (main thread)."""
+
+    def __init__(self, window, title, index=None, sources=(None, None), use_buffer=None):
+        """Initialize (`use_buffer` overrides the setting unless it is `None`)."""
+
+        self.window = window
+        self.title = title
+        self.index = index
+        self.sources = sources
+        self.view = None
+        self.use_buffer = bool(load_settings().get("use_buffer", False) if use_buffer is None else use_buffer)
+
+    def open(self):
+        """Create the view or output panel."""
+
+        if self.use_buffer:
+            self.view = self.window.new_file()
+            self.view.set_name(self.title)
+            self.view.set_scratch(True)
         else:
-            v = win.create_output_panel('easy_diff')
-            v.assign_syntax('Packages/Diff/Diff.tmLanguage')
-            v.run_command('append', {'characters': result})
-            win.run_command("show_panel", {"panel": "output.easy_diff"})
+            self.view = self.window.create_output_panel('easy_diff')
+        self.view.assign_syntax('Packages/Diff/Diff.tmLanguage')
+        if self.index is not None:
+            register_hunks(self.view, self.index, self.sources)
+        track_highlights(self.view)
+        if not self.use_buffer:
+            self.window.run_command("show_panel", {"panel": "output.easy_diff"})
+
+    def write(self, text):
+        """Append a chunk of text."""
+
+        if self.view is None:
+            self.open()
+        self.view.run_command('append', {'characters': text})
+
+    def close(self):
+        """Finish writing."""
+
+        # The diff is generated content; do not let the chunked appends linger in undo history.
+        if hasattr(self.view, "clear_undo_stack"):
+            self.view.clear_undo_stack()
+
+    def cancel(self):
+        """Mark partially written output as cancelled."""
+
+        if self.use_buffer and self.view.is_valid():
+            self.view.set_name("%s (cancelled)" % self.title)
+
+
+class DiffJob(object):
+    """
+    Diff running on a worker thread.
+
+    Only one job of a kind runs per window: starting a new one cancels the previous one.
+    The work returns diff text or an iterable of diff lines (or `None` for no result)
+    which is handed to the main thread in bounded chunks.
+    """
+
+    jobs = {}
+    lock = threading.Lock()
+
+    def __init__(self, window, work, title, sources=(None, None), use_buffer=None, kind="diff"):
+        """Initialize."""
+
+        self.window = window
+        self.key = (window.id(), kind)
+        self.work = work
+        self.title = title
+        self.sources = sources
+        self.use_buffer = use_buffer
+        self.cancelled = False
+        self.done = False
+        self.approximate = False
+        self.phase = "Preparing"
+        self.start_time = time.time()
+
+    @classmethod
+    def start(cls, window, work, title, sources=(None, None), use_buffer=None, kind="diff"):
+        """
+        Cancel the window's running job of the kind and start a new one.
+
+        `sources` are the paths of the compared files, used to jump from the diff to the source.
+        `use_buffer` overrides the `use_buffer` setting unless it is `None`.  Jobs of
+        other kinds keep running, so diffs opened from a folder compare summary do not
+        cancel the summary.
+        """
+
+        job = cls(window, work, title, sources, use_buffer, kind)
+        with cls.lock:
+            previous = cls.jobs.get(job.key)
+            if previous is not None:
+                previous.cancel()
+            cls.jobs[job.key] = job
+        thread = threading.Thread(target=job.run)
+        thread.daemon = True
+        thread.start()
+        sublime.set_timeout(job.update_status, STATUS_INTERVAL)
+        return job
+
+    def cancel(self):
+        """Cancel the job."""
+
+        self.cancelled = True
+
+    def check(self):
+        """Abort the work if the job has been cancelled."""
+
+        if self.cancelled:
+            raise differ.DiffCancelledError()
+
+    def set_phase(self, phase):
+        """Set the current phase shown in the status bar."""
+
+        self.check()
+        self.phase = phase
+
+    def call(self, fn, *args):
+        """Run a function on the main thread and wait for it to finish."""
+
+        event = threading.Event()
+
+        def callback():
+            try:
+                fn(*args)
+            finally:
+                event.set()
+
+        sublime.set_timeout(callback, 0)
+        event.wait()
+
+    def run(self):
+        """Run the work and stream the result (worker thread)."""
+
+        output = None
+        try:
+            result = self.work(self)
+            if result is not None:
+                index = HunkIndex()
+                for chunk in iter_chunks(index.scan(result)):
+                    self.check()
+                    if output is None:
+                        output = DiffOutput(
+                            self.window,
+                            self.title + " (approximate)" if self.approximate else self.title,
+                            index,
+                            self.sources,
+                            self.use_buffer
+                        )
+                    self.call(output.write, chunk)
+                self.check()
+                if output is None:
+                    self.call(notify, "No Difference")
+                else:
+                    self.call(output.close)
+                    if self.approximate:
+                        self.call(notify, "Diff time budget exceeded: result is approximate")
+        except differ.DiffCancelledError:
+            if output is not None:
+                self.call(output.cancel)
+        except Exception:
+            log("Diff failed!\n%s" % traceback.format_exc())
+        finally:
+            self.done = True
+            with self.lock:
+                if self.jobs.get(self.key) is self:
+                    del self.jobs[self.key]
+
+    def update_status(self):
+        """Show progress in the status bar until the job is done."""
+
+        if self.done or self.cancelled:
+            return
+        sublime.status_message(
+            "EasyDiff: %s... (%ds)" % (self.phase, int(time.time() - self.start_time))
+        )
+        sublime.set_timeout(self.update_status, STATUS_INTERVAL)
+
+
+def plugin_unloaded():
+    """Shutdown the worker pools."""
+
+    global STATS_EXECUTOR
+
+    get_executor(0)
+    if STATS_EXECUTOR is not None:
+        STATS_EXECUTOR.shutdown(wait=False)
+        STATS_EXECUTOR = None
@@ -6,61 +6,76 @@ License: MIT
 """
 import sublime
 import sublime_plugin
-from os.path import basename
+from os.path import basename, join, exists, isdir
+import re
 from EasyDiff.easy_diff_global import load_settings, log, get_external_diff, get_target, get_group_view
+from EasyDiff.easy_diff_global import get_folder_target
 from EasyDiff.easy_diff_dynamic_menu import update_menu
 from EasyDiff.easy_diff import EasyDiffView, EasyDiffInput, EasyDiff
+from EasyDiff.easy_diff_navigate import INDEXES
+from EasyDiff.easy_diff_live import LiveDiff
 
 LEFT = None
 
+RE_FOLDER_ENTRY = re.compile(r'^([-+!?]) (.+)$')
+
 
 ###############################
 # Helper Functions
 ###############################
-def diff(right, external=False):
+def has_left():
+    """Check if a view, selection, or clipboard (not a folder) is set as the left side."""
+
+    return LEFT is not None and LEFT.get("folder") is None
+
+
+def has_left_folder():
+    """Check if a folder is set as the left side."""
+
+    return LEFT is not None and LEFT.get("folder") is not None
+
+
+def get_side(side):
+    """Get the view or the clipboard/selection snapshot of a side (or `None`)."""
+
+    for w in sublime.windows():
+        if w.id() == side["win_id"]:
+            for v in w.views():
+                if v.id() == side["view_id"]:
+                    return v
+            return None
+    return side["clip"] if side["clip"] else None
+
+
+def get_left():
+    """Get the view or the clipboard/selection snapshot set as the left side (or `None`)."""
+
+    return get_side(LEFT) if has_left() else None
+
+
+def diff(right, external=False, live=False, options=None, stats=False):
     """
     Initiate diff by getting left side and right side compare.
 
     Call the appropriate diff method and call internal or external diff.
+    A live diff is only possible if both sides are views.
+    With `stats`, only the changes are counted and shown in the status bar.
+    `options` override diff settings (such as the ignore options) for internal diffs.
     """
 
-    lw = None
-    rw = None
-    lv = None
-    rv = None
-
-    for w in sublime.windows():
-        if w.id() == LEFT["win_id"]:
-            lw = w
-        if w.id() == right["win_id"]:
-            rw = w
-        if lw is not None and rw is not None:
-            break
-
-    if lw is not None:
-        for v in lw.views():
-            if v.id() == LEFT["view_id"]:
-                lv = v
-                break
-    else:
-        if LEFT["clip"]:
-            lv = LEFT["clip"]
-
-    if rw is not None:
-        for v in rw.views():
-            if v.id() == right["view_id"]:
-                rv = v
-                break
-    else:
-        if right["clip"]:
-            rv = right["clip"]
+    lv = get_side(LEFT)
+    rv = get_side(right)
 
     if lv is not None and rv is not None:
         ext_diff = get_external_diff()
         if external:
             EasyDiff.extcompare(EasyDiffInput(lv, rv, external=True), ext_diff)
+        elif live and not isinstance(lv, EasyDiffView) and not isinstance(rv, EasyDiffView):
+            LiveDiff.start(lv, rv)
+        elif stats:
+            EasyDiff.stats(EasyDiffInput(lv, rv), options)
         else:
-            EasyDiff.compare(EasyDiffInput(lv, rv))
+            EasyDiff.compare(EasyDiffInput(lv, rv), options)
     else:
         log("Can't compare")
 
@@ -107,13 +122,13 @@ class _EasyDiffSelection(object):
 class _EasyDiffCompareBothTextCommand(sublime_plugin.TextCommand):
     """Compare text command."""
 
-    def run(self, edit, external=False, group=-1, index=-1):
+    def run(self, edit, external=False, group=-1, index=-1, stats=False, **kwargs):
         """Run command."""
 
         if index != -1:
             # Ensure we have the correct view
             self.view = get_group_view(sublime.active_window(), group, index)
-        diff(self.get_right(), external=external)
+        diff(self.get_right(), external=external, options=kwargs, stats=stats)
 
     def view_has_selections(self, group=-1, index=-1):
         """Check if view has selections."""
@@ -143,10 +158,10 @@ class _EasyDiffCompareBothTextCommand(sublime_plugin.TextCommand):
 
         return True
 
-    def is_enabled(self, external=False, group=-1, index=-1):
+    def is_enabled(self, external=False, group=-1, index=-1, **kwargs):
         """Check if command is enabled."""
 
-        return LEFT is not None and self.check_enabled(group, index)
+        return has_left() and self.check_enabled(group, index)
 
 
 class _EasyDiffCompareBothWindowCommand(sublime_plugin.WindowCommand):
@@ -154,10 +169,13 @@ class _EasyDiffCompareBothWindowCommand(sublime_plugin.WindowCommand):
 
     no_view = False
 
-    def run(self, external=False, paths=[], group=-1, index=-1):
+    def run(self, external=False, paths=[], group=-1, index=-1, live=False, stats=False, **kwargs):
         """run command."""
 
         self.external = external
+        self.live = live
+        self.stats = stats
+        self.options = kwargs
         self.set_view(paths, group, index)
         if not self.no_view and self.view is None:
             return
@@ -177,7 +195,7 @@ class _EasyDiffCompareBothWindowCommand(sublime_plugin.WindowCommand):
     def diff(self):
         """Diff."""
 
-        diff(self.get_right(), external=self.external)
+        diff(self.get_right(), external=self.external, live=self.live, options=self.options, stats=self.stats)
 
     def set_view(self, paths, group=-1, index=-1, open_file=True):
         """Set view."""
@@ -203,10 +221,10 @@ class _EasyDiffCompareBothWindowCommand(sublime_plugin.WindowCommand):
 
         return True
 
-    def is_enabled(self, external=False, paths=[], group=-1, index=-1):
+    def is_enabled(self, external=False, paths=[], group=-1, index=-1, live=False, stats=False, **kwargs):
         """Check if command is enabled."""
 
-        return LEFT is not None and self.check_enabled(paths)
+        return has_left() and self.check_enabled(paths)
 
 
 ###############################
@@ -261,11 +279,12 @@ class EasyDiffCompareBothViewCommand(_EasyDiffCompareBothWindowCommand):
 
         return True
 
-    def is_enabled(self, external=False, paths=[], group=-1, index=-1):
+    def is_enabled(self, external=False, paths=[], group=-1, index=-1, live=False, stats=False, **kwargs):
         """Check if command is enabled."""
 
         return (
-            LEFT is not None and
+            has_left() and
+            (not live or LEFT["clip"] is None) and
             (get_target(paths, group, index) is not None if len(paths) or index != -1 else True) and
             self.check_enabled()
         )
@@ -318,7 +337,7 @@ class EasyDiffCompareBothClipboardCommand(_EasyDiffCompareBothWindowCommand):
         valid_path = get_target(paths, group, index) is not None if len(paths) or index != -1 else True
         return bool(load_settings().get("use_clipboard", True)) and valid_path
 
-    def is_visible(self, external=False, paths=[], group=-1, index=-1):
+    def is_visible(self, external=False, paths=[], group=-1, index=-1, **kwargs):
         """Check if command is visible."""
 
         return bool(load_settings().get("use_clipboard", True))
@@ -388,12 +407,100 @@ class EasyDiffCompareBothSelectionCommand(_EasyDiffCompareBothTextCommand, _Easy
 
         return bool(load_settings().get("use_selections", True)) and self.view_has_selections(group, index)
 
-    def is_visible(self, external=False, group=-1, index=-1):
+    def is_visible(self, external=False, group=-1, index=-1, **kwargs):
         """Check if command is visible."""
 
         return bool(load_settings().get("use_selections", True))
 
 
+###############################
+# Set Folder
+###############################
+class EasyDiffSetLeftFolderCommand(sublime_plugin.WindowCommand):
+    """Set left side folder command."""
+
+    def run(self, paths=[]):
+        """Run command."""
+
+        global LEFT
+        folder = get_folder_target(paths)
+        if folder is None:
+            return
+        LEFT = {"win_id": None, "view_id": None, "clip": None, "folder": folder}
+        update_menu(basename(folder) + "/")
+
+    def is_enabled(self, paths=[]):
+        """Check if command is enabled."""
+
+        return get_folder_target(paths) is not None
+
+
+class EasyDiffCompareBothFolderCommand(sublime_plugin.WindowCommand):
+    """Compare folder command."""
+
+    def run(self, paths=[]):
+        """Run command."""
+
+        folder = get_folder_target(paths)
+        if folder is not None and has_left_folder():
+            EasyDiff.compare_folders(LEFT["folder"], folder)
+
+    def is_enabled(self, paths=[]):
+        """Check if command is enabled."""
+
+        return (
+            has_left_folder() and get_folder_target(paths) is not None and
+            bool(load_settings().get("show_internal", True))
+        )
+
+
+class EasyDiffFolderEntryCommand(sublime_plugin.TextCommand):
+    """Diff the file under the cursor in a folder compare summary."""
+
+    def get_entry(self):
+        """Get the folders and the relative path of the file under the cursor (or `None`)."""
+
+        entry = INDEXES.get(self.view.id())
+        if entry is None or len(self.view.sel()) == 0:
+            return None
+        folders = entry[1]
+        if not all(folder is not None and isdir(folder) for folder in folders):
+            return None
+        m = RE_FOLDER_ENTRY.match(self.view.substr(self.view.line(self.view.sel()[0].begin())))
+        return (folders, m.group(2)) if m is not None else None
+
+    def run(self, edit):
+        """Run command."""
+
+        entry = self.get_entry()
+        if entry is not None:
+            folders, path = entry
+            window = self.view.window() or sublime.active_window()
+            sides = []
+            for folder in folders:
+                name = join(folder, path)
+                if exists(name):
+                    # Opened like a file compare opens them, so the encoding is detected
+                    # and large files can be memory mapped.
+                    sides.append(window.open_file(name))
+                else:
+                    sides.append(EasyDiffView("%s (missing)" % name, "", "UTF-8"))
+            self.diff(sides)
+
+    def diff(self, sides):
+        """Compare the sides once the files are loaded."""
+
+        if any(not isinstance(side, EasyDiffView) and side.is_loading() for side in sides):
+            sublime.set_timeout(lambda: self.diff(sides), 100)
+        else:
+            EasyDiff.compare(EasyDiffInput(sides[0], sides[1]))
+
+    def is_enabled(self):
+        """Check if the cursor is on a file in a folder compare summary."""
+
+        return self.get_entry() is not None
+
+
 ###############################
 # MRU Tab Command
 ###############################
@@ -507,7 +614,25 @@ PANEL_ENTRIES = [
         "cmd": lambda self, external: self.view.window().run_command(
             "easy_diff_panel_compare", {"external": external}
         ),
-        "condition": lambda self, external: LEFT is not None and bool(
+        "condition": lambda self, external: has_left() and bool(
+            load_settings().get("quick_panel_left_right_commands", True)
+        )
+    },
+    {
+        "caption": "Live Compare with %(file)s",
+        "cmd": lambda self, external: self.view.window().run_command(
+            "easy_diff_compare_both_view", {"live": True}
+        ),
+        "condition": lambda self, external: not external and has_left() and LEFT["clip"] is None and bool(
+            load_settings().get("quick_panel_left_right_commands", True)
+        )
+    },
+    {
+        "caption": "Diff Statistics with %(file)s",
+        "cmd": lambda self, external: self.view.window().run_command(
+            "easy_diff_compare_both_view", {"stats": True}
+        ),
+        "condition": lambda self, external: not external and has_left() and bool(
             load_settings().get("quick_panel_left_right_commands", True)
         )
     },
@@ -640,7 +765,7 @@ class EasyDiffPanelCommand(sublime_plugin.TextCommand):
         """Get left name."""
 
         name = None
-        if LEFT is not None:
+        if has_left():
             left = LEFT.get("clip")
             name = None
             if left is not None:
@@ -757,7 +882,7 @@ class EasyDiffPanelCompareCommand(sublime_plugin.TextCommand):
             enabled = True
         elif external and bool(load_settings().get("show_external", True)):
             enabled = True
-        return LEFT is not None and enabled
+        return has_left() and enabled
 
 
 ###############################
@@ -157,6 +157,11 @@ SVN_INTERNAL_MENU = '''
                 "command": "easy_diff_svn",
                 "args": {"last": true}
             },
+            {
+                "caption": "SVN Merge with Left Side",
+                "command": "easy_diff_svn",
+                "args": {"merge": true}
+            },
             {
                 "caption": "SVN Revert",
                 "command": "easy_diff_svn",
@@ -174,6 +179,11 @@ GIT_INTERNAL_MENU = '''
                 "command": "easy_diff_git",
                 "args": {"last": true}
             },
+            {
+                "caption": "Git Merge with Left Side",
+                "command": "easy_diff_git",
+                "args": {"merge": true}
+            },
             {
                 "caption": "Git Revert",
                 "command": "easy_diff_git",
@@ -191,6 +201,11 @@ HG_INTERNAL_MENU = '''
                 "command": "easy_diff_hg",
                 "args": {"last": true}
             },
+            {
+                "caption": "Mercurial Merge with Left Side",
+                "command": "easy_diff_hg",
+                "args": {"merge": true}
+            },
             {
                 "caption": "Mercurial Revert",
                 "command": "easy_diff_hg",
@@ -270,6 +285,11 @@ INTERNAL_SIDEBAR_MENU = '''{ "caption": "-" },
                 "caption": "Clipboard",
                 "command": "easy_diff_set_left_clipboard",
                 "args": {"paths": []}
+            },
+            {
+                "caption": "Folder",
+                "command": "easy_diff_set_left_folder",
+                "args": {"paths": []}
             }
         ]
     },
@@ -286,6 +306,11 @@ INTERNAL_SIDEBAR_MENU = '''{ "caption": "-" },
                 "caption": "Clipboard",
                 "command": "easy_diff_compare_both_clipboard",
                 "args": {"paths": []}
+            },
+            {
+                "caption": "Folder",
+                "command": "easy_diff_compare_both_folder",
+                "args": {"paths": []}
             }
         ]
     },
@@ -337,6 +362,11 @@ SVN_SIDEBAR_INTERNAL_MENU = '''
                 "command": "easy_diff_svn",
                 "args": {"last": true, "paths": []}
             },
+            {
+                "caption": "SVN Merge with Left Side",
+                "command": "easy_diff_svn",
+                "args": {"merge": true, "paths": []}
+            },
             {
                 "caption": "SVN Revert",
                 "command": "easy_diff_svn",
@@ -355,6 +385,11 @@ GIT_SIDEBAR_INTERNAL_MENU = '''
                 "command": "easy_diff_git",
                 "args": {"last": true, "paths": []}
             },
+            {
+                "caption": "Git Merge with Left Side",
+                "command": "easy_diff_git",
+                "args": {"merge": true, "paths": []}
+            },
             {
                 "caption": "Git Revert",
                 "command": "easy_diff_git",
@@ -373,6 +408,11 @@ HG_SIDEBAR_INTERNAL_MENU = '''
                 "command": "easy_diff_hg",
                 "args": {"last": true, "paths": []}
             },
+            {
+                "caption": "Mercurial Merge with Left Side",
+                "command": "easy_diff_hg",
+                "args": {"merge": true, "paths": []}
+            },
             {
                 "caption": "Mercurial Revert",
                 "command": "easy_diff_hg",
@@ -539,6 +579,11 @@ SVN_TAB_INTERNAL_MENU = '''
                 "command": "easy_diff_svn",
                 "args": {"last": true, "group": -1, "index": -1}
             },
+            {
+                "caption": "SVN Merge with Left Side",
+                "command": "easy_diff_svn",
+                "args": {"merge": true, "group": -1, "index": -1}
+            },
             {
                 "caption": "SVN Revert",
                 "command": "easy_diff_svn",
@@ -557,6 +602,11 @@ GIT_TAB_INTERNAL_MENU = '''
                 "command": "easy_diff_git",
                 "args": {"last": true, "group": -1, "index": -1}
             },
+            {
+                "caption": "Git Merge with Left Side",
+                "command": "easy_diff_git",
+                "args": {"merge": true, "group": -1, "index": -1}
+            },
             {
                 "caption": "Git Revert",
                 "command": "easy_diff_git",
@@ -575,6 +625,11 @@ HG_TAB_INTERNAL_MENU = '''
                 "command": "easy_diff_hg",
                 "args": {"last": true, "group": -1, "index": -1}
             },
+            {
+                "caption": "Mercurial Merge with Left Side",
+                "command": "easy_diff_hg",
+                "args": {"merge": true, "group": -1, "index": -1}
+            },
             {
                 "caption": "Mercurial Revert",
                 "command": "easy_diff_hg",
@@ -151,6 +151,12 @@ def get_target(paths=[], group=-1, index=-1):
     return target
 
 
+def get_folder_target(paths=[]):
+    """Get the target folder."""
+
+    return paths[0] if len(paths) and isdir(paths[0]) else None
+
+
 def notify(msg):
     """Notify with SubNotify if possible and enabled."""
 
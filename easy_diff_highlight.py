@@ -0,0 +1,320 @@
+"""
+Easy Diff Highlight.
+
+Lazily highlight what changed within changed lines of diff views.
+
+Copyright (c) 2013 - 2015 Isaac Muse <isaacmuse@gmail.com>
+License: MIT
+"""
+import sublime
+import sublime_plugin
+import re
+from EasyDiff.easy_diff_global import load_settings
+from EasyDiff.lib.multiconf import get as multiget
+from EasyDiff.lib.lru import LRUCache
+from EasyDiff.easy_diff_navigate import get_index
+import EasyDiff.lib.differ as differ
+
+# Viewport polling interval (ms); there is no scroll event to react to
+POLL_INTERVAL = 200
+
+# Lines above and below the viewport that are highlighted ahead of scrolling
+MARGIN_LINES = 50
+
+# How far back to look for the header of the hunk at the top of the viewport (without a hunk index)
+MAX_SCAN_LINES = 5000
+
+# Longer lines are not highlighted
+MAX_LINE_LENGTH = 10000
+
+# Time limit (seconds) for matching the tokens of a pair of lines
+MATCH_TIMEOUT = 0.05
+
+# Line pairs sharing less than this ratio of text are shown as wholly changed
+MIN_SIMILARITY = 0.4
+
+# Number of change blocks whose highlights are cached per view
+BLOCK_CACHE_SIZE = 2000
+
+DELETED_KEY = "easy_diff_deleted_chars"
+INSERTED_KEY = "easy_diff_inserted_chars"
+DELETED_SCOPE = "diff.deleted.char markup.deleted.diff"
+INSERTED_SCOPE = "diff.inserted.char markup.inserted.diff"
+
+RE_HUNK = re.compile(r'^@@ -\d+(?:,(\d+))? \+\d+(?:,(\d+))? @@')
+RE_WORD = re.compile(r'\w+|\s+|[^\w\s]', re.UNICODE)
+
+HIGHLIGHTERS = {}
+POLLING = False
+
+
+def intraline_spans(a, b, mode="word"):
+    """
+    Get the changed spans of two lines as two lists of `(start, end)` offsets.
+
+    Returns `None` if the lines are too different for highlighting to be useful.
+    """
+
+    if max(len(a), len(b)) > MAX_LINE_LENGTH:
+        return None
+    if mode == "char":
+        ta, tb = list(a), list(b)
+    else:
+        ta, tb = RE_WORD.findall(a), RE_WORD.findall(b)
+
+    opcodes = differ.LineMatcher(ta, tb, differ.MYERS, timeout=MATCH_TIMEOUT).get_opcodes()
+    offsets_a = [0]
+    for token in ta:
+        offsets_a.append(offsets_a[-1] + len(token))
+    offsets_b = [0]
+    for token in tb:
+        offsets_b.append(offsets_b[-1] + len(token))
+
+    equal = 0
+    spans_a = []
+    spans_b = []
+    for tag, i1, i2, j1, j2 in opcodes:
+        if tag == 'equal':
+            equal += offsets_a[i2] - offsets_a[i1]
+            continue
+        if i2 > i1:
+            spans_a.append((offsets_a[i1], offsets_a[i2]))
+        if j2 > j1:
+            spans_b.append((offsets_b[j1], offsets_b[j2]))
+
+    if equal * 2 < (len(a) + len(b)) * MIN_SIMILARITY:
+        return None
+    return spans_a, spans_b
+
+
+def iter_blocks(lines, start):
+    """
+    Find change blocks in unified diff lines that start at the point `start`.
+
+    A change block is a run of removed lines followed by a run of added lines.
+    Lines before the first hunk header are skipped.  Yields two lists of
+    `(point, text)` for the removed and added lines (without the `-`/`+`).
+    """
+
+    old = new = 0
+    removed = []
+    added = []
+    pt = start
+    for line in lines:
+        if old <= 0 and new <= 0:
+            m = RE_HUNK.match(line)
+            if m:
+                old = int(m.group(1) if m.group(1) is not None else 1)
+                new = int(m.group(2) if m.group(2) is not None else 1)
+        else:
+            c = line[:1]
+            if c == '-':
+                if added:
+                    yield removed, added
+                    removed, added = [], []
+                removed.append((pt + 1, line[1:]))
+                old -= 1
+            elif c == '+':
+                added.append((pt + 1, line[1:]))
+                new -= 1
+            elif c != '\\':
+                if removed and added:
+                    yield removed, added
+                removed, added = [], []
+                old -= 1
+                new -= 1
+            if old <= 0 and new <= 0:
+                if removed and added:
+                    yield removed, added
+                removed, added = [], []
+        pt += len(line) + 1
+    if removed and added:
+        yield removed, added
+
+
+class IntraLineHighlighter(object):
+    """Highlight the change blocks around the viewport of a diff view."""
+
+    def __init__(self, view):
+        """Initialize."""
+
+        self.view = view
+        self.state = None
+        self.cache = LRUCache(BLOCK_CACHE_SIZE)
+
+    def find_hunk_start(self, row):
+        """Find the row of the hunk header at or above the row."""
+
+        view = self.view
+        index = get_index(view)
+        if index is not None:
+            hunk = index.hunk_at(row)
+            return hunk if hunk is not None else row
+        for r in range(row, max(row - MAX_SCAN_LINES, -1), -1):
+            if view.substr(view.line(view.text_point(r, 0))).startswith('@@'):
+                return r
+        return row
+
+    def highlight(self, removed, added, mode):
+        """Get the regions of the changes within a block's line pairs."""
+
+        deleted = []
+        inserted = []
+        for (pt_a, a), (pt_b, b) in zip(removed, added):
+            spans = intraline_spans(a, b, mode)
+            if spans is None:
+                continue
+            deleted.extend(sublime.Region(pt_a + s, pt_a + e) for s, e in spans[0])
+            inserted.extend(sublime.Region(pt_b + s, pt_b + e) for s, e in spans[1])
+        return deleted, inserted
+
+    def update(self, force=False):
+        """Highlight the blocks in and around the viewport if it changed."""
+
+        view = self.view
+        mode = multiget(load_settings(), "intraline_highlight", "word")
+        visible = view.visible_region()
+        state = (visible.begin(), visible.end(), view.change_count(), mode)
+        if state == self.state and not force:
+            return
+        self.state = state
+
+        deleted = []
+        inserted = []
+        if mode in ("word", "char"):
+            first = max(view.rowcol(visible.begin())[0] - MARGIN_LINES, 0)
+            last = view.rowcol(visible.end())[0] + MARGIN_LINES
+            begin = view.text_point(first, 0)
+            end = view.line(view.text_point(last, 0)).end()
+            start = view.text_point(self.find_hunk_start(first), 0)
+            for removed, added in iter_blocks(view.substr(sublime.Region(start, end)).split('\n'), start):
+                if added[-1][0] < begin:
+                    continue
+                # Keyed by the text too, as rewritten views (like live diffs) can change a block in place.
+                key = (removed[0][0], hash((tuple(line for pt, line in removed), tuple(line for pt, line in added))))
+                regions = self.cache.get(key)
+                if regions is None:
+                    regions = self.highlight(removed, added, mode)
+                    self.cache.put(key, regions, 1)
+                deleted.extend(regions[0])
+                inserted.extend(regions[1])
+
+        view.add_regions(DELETED_KEY, deleted, DELETED_SCOPE, "", sublime.DRAW_NO_OUTLINE)
+        view.add_regions(INSERTED_KEY, inserted, INSERTED_SCOPE, "", sublime.DRAW_NO_OUTLINE)
+
+    def clear(self):
+        """Clear the cache (when the mode changes)."""
+
+        self.cache.clear()
+
+
+def track(view):
+    """Start highlighting a diff view (any thread)."""
+
+    view.settings().set("easy_diff_view", True)
+    sublime.set_timeout_async(lambda: _track(view), 0)
+
+
+def _track(view):
+    """Register the view and start polling."""
+
+    if view.is_valid() and view.id() not in HIGHLIGHTERS:
+        HIGHLIGHTERS[view.id()] = IntraLineHighlighter(view)
+    start_polling()
+
+
+def start_polling():
+    """Poll the viewports if there are tracked views and polling stopped."""
+
+    global POLLING
+
+    if not POLLING and HIGHLIGHTERS:
+        POLLING = True
+        sublime.set_timeout_async(poll, 0)
+
+
+def is_shown(view):
+    """Check if a view is the visible view of its group or the visible output panel."""
+
+    window = view.window()
+    if window is None:
+        return False
+    group = window.get_view_index(view)[0]
+    if group != -1:
+        active = window.active_view_in_group(group)
+        return active is not None and active.id() == view.id()
+    panel = window.active_panel() or ""
+    if not panel.startswith("output."):
+        return False
+    shown = window.find_output_panel(panel[len("output."):])
+    return shown is not None and shown.id() == view.id()
+
+
+def poll():
+    """
+    Update the highlights of the tracked views that are shown.
+
+    Polling stops when none are shown (an output panel stays valid after it is
+    hidden), and starts again when a tracked view is activated or its selection
+    changes.
+    """
+
+    global POLLING
+
+    shown = False
+    for view_id, highlighter in list(HIGHLIGHTERS.items()):
+        if not highlighter.view.is_valid():
+            del HIGHLIGHTERS[view_id]
+        elif is_shown(highlighter.view):
+            highlighter.update()
+            shown = True
+    if shown:
+        sublime.set_timeout_async(poll, POLL_INTERVAL)
+    else:
+        POLLING = False
+
+
+def reload_highlights():
+    """Recompute the highlights of all tracked views (settings changed)."""
+
+    for highlighter in list(HIGHLIGHTERS.values()):
+        highlighter.clear()
+        if highlighter.view.is_valid():
+            highlighter.update(force=True)
+
+
+class EasyDiffHighlightListener(sublime_plugin.EventListener):
+    """Track diff views and react to cursor movement."""
+
+    def on_activated_async(self, view):
+        """Pick up diff views (e.g. after a plugin reload)."""
+
+        if view.settings().get("easy_diff_view", False):
+            _track(view)
+
+    def on_selection_modified_async(self, view):
+        """Update the highlights when jumping around a diff view."""
+
+        highlighter = HIGHLIGHTERS.get(view.id())
+        if highlighter is not None:
+            highlighter.update()
+            start_polling()
+
+    def on_post_window_command(self, window, command, args):
+        """Poll again when a panel is shown, which can be the panel of a diff."""
+
+        if command == "show_panel":
+            start_polling()
+
+    def on_close(self, view):
+        """Stop tracking the view."""
+
+        HIGHLIGHTERS.pop(view.id(), None)
+
+
+def plugin_loaded():
+    """Set up the plugin."""
+
+    settings = load_settings()
+    settings.clear_on_change('reload_highlight')
+    settings.add_on_change('reload_highlight', lambda: sublime.set_timeout_async(reload_highlights, 0))
@@ -0,0 +1,288 @@
+"""
+Easy Diff Live.
+
+Keep the diff of two views current while they are edited.
+
+Copyright (c) 2013 - 2015 Isaac Muse <isaacmuse@gmail.com>
+License: MIT
+"""
+import sublime
+import sublime_plugin
+import time
+import traceback
+from os.path import basename
+from EasyDiff.easy_diff_global import load_settings, log, debug
+from EasyDiff.lib.multiconf import get as multiget
+from EasyDiff.easy_diff_highlight import track as track_highlights
+import EasyDiff.lib.differ as differ
+import EasyDiff.lib.live as live
+
+LEFT = 0
+RIGHT = 1
+
+# Live sessions by the id of their source and output views
+SESSIONS = {}
+
+# Text change listeners (Sublime Text 4) report the edited rows; without them,
+# the whole view is read on every edit to find what changed.
+TEXT_CHANGE_LISTENER = hasattr(sublime_plugin, "TextChangeListener")
+
+
+def view_lines(view, first=0, last=None):
+    """Get the lines of rows `first` to `last` (exclusive) of a view."""
+
+    if last is None:
+        return view.substr(sublime.Region(0, view.size())).split('\n')
+    if last <= first:
+        return []
+    begin = view.text_point(first, 0)
+    end = view.line(view.text_point(last - 1, 0)).end()
+    return view.substr(sublime.Region(begin, end)).split('\n')
+
+
+def view_name(view):
+    """Get a display name for a view."""
+
+    name = view.file_name()
+    return basename(name) if name is not None else (view.name() or "Untitled")
+
+
+class LiveDiff(object):
+    """
+    Diff of two views that is updated as they are edited.
+
+    Edits are collected as a dirty row range per side (main thread).  Once
+    typing pauses, the dirty rows are read and re-matched against the other side
+    (worker thread), and only the part of the diff view that changed is rewritten.
+    """
+
+    def __init__(self, left, right):
+        """Initialize."""
+
+        self.views = (left, right)
+        self.names = (view_name(left), view_name(right))
+        self.output = None
+        self.diff = None
+        self.listeners = []
+        self.generation = 0
+        settings = load_settings()
+        self.delay = int(multiget(settings, "live_diff_delay_ms", 300))
+        self.algorithm = multiget(settings, "diff_algorithm", differ.AUTO)
+        self.budget = int(multiget(settings, "diff_time_budget_ms", 0)) / 1000.0
+        # Per side: [current start, current end, original start, original end] rows or `None`;
+        # `True` if the whole side has to be re-read.
+        self.dirty = [None, None]
+
+    @classmethod
+    def start(cls, left, right):
+        """Open a live diff of two views (main thread)."""
+
+        session = cls(left, right)
+        session.open()
+        return session
+
+    def open(self):
+        """Create the diff view, start listening for edits, and run the initial diff."""
+
+        window = self.views[RIGHT].window() or sublime.active_window()
+        self.output = window.new_file()
+        self.output.set_name("EasyDiff (live): %s -> %s" % self.names)
+        self.output.set_scratch(True)
+        self.output.set_read_only(True)
+        self.output.assign_syntax('Packages/Diff/Diff.tmLanguage')
+        track_highlights(self.output)
+
+        for view in self.views + (self.output,):
+            SESSIONS[view.id()] = self
+        if TEXT_CHANGE_LISTENER:
+            for side, view in enumerate(self.views):
+                listener = LiveChangeListener()
+                listener.session = self
+                listener.side = side
+                listener.attach(view.buffer())
+                self.listeners.append(listener)
+
+        a = view_lines(self.views[LEFT])
+        b = view_lines(self.views[RIGHT])
+        sublime.set_timeout_async(lambda: self.initialize(a, b), 0)
+
+    def initialize(self, a, b):
+        """Match both sides from scratch (worker thread)."""
+
+        start = time.time()
+        self.diff = live.LiveHunks(differ.IncrementalMatcher(a, b, self.algorithm, self.budget or None), self.names)
+        self.write(self.diff.render_all())
+        debug("live diff matched in %.3fs" % (time.time() - start))
+
+    def stop(self):
+        """Stop updating the diff."""
+
+        for listener in self.listeners:
+            if listener.is_attached():
+                listener.detach()
+        self.listeners = []
+        for view_id in [k for k, v in SESSIONS.items() if v is self]:
+            del SESSIONS[view_id]
+
+    def side(self, view):
+        """Get the side of a source view (or `None`)."""
+
+        for side, v in enumerate(self.views):
+            if v.id() == view.id():
+                return side
+        return None
+
+    def changed(self, side, first, last, added):
+        """
+        Record that rows `first` to `last` (exclusive) of a side were replaced (main thread).
+
+        `added` is the number of rows the replacement added (or removed if negative).
+        """
+
+        dirty = self.dirty[side]
+        if dirty is True:
+            pass
+        elif dirty is None:
+            self.dirty[side] = [first, last + added, first, last]
+        else:
+            # Grow the dirty range to cover the edit, then apply the row delta.
+            if first < dirty[0]:
+                dirty[2] -= dirty[0] - first
+                dirty[0] = first
+            if last > dirty[1]:
+                dirty[3] += last - dirty[1]
+                dirty[1] = last
+            dirty[1] += added
+        self.schedule()
+
+    def modified(self, side):
+        """Record that a side changed in an unknown way (main thread)."""
+
+        self.dirty[side] = True
+        self.schedule()
+
+    def schedule(self):
+        """Update once edits pause for the configured delay."""
+
+        self.generation += 1
+        generation = self.generation
+        sublime.set_timeout(lambda: self.flush(generation), self.delay)
+
+    def flush(self, generation):
+        """Read the dirty rows and hand them to the worker thread (main thread)."""
+
+        if generation != self.generation or self.output is None:
+            return
+        if not self.output.is_valid() or not all(v.is_valid() for v in self.views):
+            self.stop()
+            return
+
+        edits = []
+        for side, dirty in enumerate(self.dirty):
+            if dirty is None:
+                continue
+            if dirty is True:
+                edits.append((side, None, None, view_lines(self.views[side])))
+            else:
+                lines = view_lines(self.views[side], dirty[0], dirty[1])
+                if len(lines) != dirty[1] - dirty[0]:
+                    edits.append((side, None, None, view_lines(self.views[side])))
+                else:
+                    edits.append((side, dirty[2], dirty[3], lines))
+        self.dirty = [None, None]
+        if edits:
+            sublime.set_timeout_async(lambda: self.update(edits), 0)
+
+    def update(self, edits):
+        """Re-match the edited lines and refresh the diff view (worker thread)."""
+
+        if self.diff is None:
+            return
+        try:
+            for side, first, last, lines in edits:
+                if first is None:
+                    # Only the changed middle of the side has to be re-matched.
+                    seq = self.diff.matcher.b if side else self.diff.matcher.a
+                    prefix, suffix = differ.common_affix(seq, lines)
+                    first, last = prefix, len(seq) - suffix
+                    lines = lines[prefix:len(lines) - suffix]
+                replacements = self.diff.replace(side, first, last, lines)
+                if replacements:
+                    self.write(replacements)
+        except Exception:
+            log("Live diff failed!\n%s" % traceback.format_exc())
+            self.stop()
+
+    def write(self, replacements):
+        """Apply `(begin, end, text)` replacements of the old text to the diff view (main thread)."""
+
+        output = self.output
+        sublime.set_timeout(
+            lambda: output.is_valid() and output.run_command(
+                "easy_diff_live_replace", {"replacements": replacements}
+            ),
+            0
+        )
+
+
+if TEXT_CHANGE_LISTENER:
+    class LiveChangeListener(sublime_plugin.TextChangeListener):
+        """Report the rows changed by edits of a live diff source."""
+
+        session = None
+        side = None
+
+        @classmethod
+        def is_applicable(cls, buffer):
+            """Only attach explicitly."""
+
+            return False
+
+        def on_text_changed(self, changes):
+            """Record the changed rows."""
+
+            for change in changes:
+                first, last = change.a.row, change.b.row + 1
+                self.session.changed(self.side, first, last, change.str.count('\n') - (last - first - 1))
+
+
+class EasyDiffLiveReplaceCommand(sublime_plugin.TextCommand):
+    """Replace ranges of a live diff view."""
+
+    def run(self, edit, replacements):
+        """Run command."""
+
+        self.view.set_read_only(False)
+        # The ranges are of the text before any replacement, so replace from the end.
+        for begin, end, text in reversed(replacements):
+            self.view.replace(edit, sublime.Region(begin, end), text)
+        self.view.set_read_only(True)
+
+
+class EasyDiffLiveListener(sublime_plugin.EventListener):
+    """Track edits without text change listeners and stop sessions when views close."""
+
+    def on_modified(self, view):
+        """Record that a source changed."""
+
+        if TEXT_CHANGE_LISTENER:
+            return
+        session = SESSIONS.get(view.id())
+        if session is not None:
+            side = session.side(view)
+            if side is not None:
+                session.modified(side)
+
+    def on_close(self, view):
+        """Stop the session of a closed source or diff view."""
+
+        session = SESSIONS.get(view.id())
+        if session is not None:
+            session.stop()
+
+
+def plugin_unloaded():
+    """Stop all live sessions."""
+
+    for session in set(SESSIONS.values()):
+        session.stop()
@@ -0,0 +1,262 @@
+"""
+Easy Diff Merge.
+
+Three-way merge with conflict navigation and resolution.
+
+Copyright (c) 2013 - 2015 Isaac Muse <isaacmuse@gmail.com>
+License: MIT
+"""
+import sublime
+import sublime_plugin
+from os.path import basename
+from EasyDiff.easy_diff_global import load_settings, log, notify
+from EasyDiff.lib.multiconf import get as multiget
+from EasyDiff.easy_diff import DiffJob, EasyDiff, executor_failed, get_executor, iter_chunks
+import EasyDiff.lib.differ as differ
+import EasyDiff.lib.merge as merge
+
+CONFLICTS_KEY = "easy_diff_conflicts"
+CONFLICTS_SCOPE = "markup.changed.diff"
+
+SIDES = ("left", "base", "right")
+
+
+def view_text(view):
+    """Get the text of a view or a clipboard/selection snapshot (main thread)."""
+
+    return view.substr(sublime.Region(0, view.size()))
+
+
+def view_syntax(view):
+    """Get the syntax of a view (`None` for clipboard/selection snapshots)."""
+
+    settings = getattr(view, "settings", None)
+    return settings().get("syntax") if settings is not None else None
+
+
+class MergeOutput(object):
+    """Merged text view with its conflicts tracked as regions (main thread)."""
+
+    def __init__(self, window, title, syntax=None):
+        """Initialize."""
+
+        self.window = window
+        self.title = title
+        self.syntax = syntax
+        self.view = None
+
+    def open(self):
+        """Create the view."""
+
+        self.view = self.window.new_file()
+        self.view.set_name(self.title)
+        if self.syntax:
+            self.view.assign_syntax(self.syntax)
+        self.view.settings().set("easy_diff_merge", True)
+
+    def write(self, text):
+        """Append a chunk of text."""
+
+        if self.view is None:
+            self.open()
+        self.view.run_command('append', {'characters': text})
+
+    def finish(self, conflicts):
+        """Mark the conflicts and move to the first one."""
+
+        if self.view is None:
+            self.open()
+        view = self.view
+        regions = [
+            sublime.Region(view.text_point(start, 0), view.line(view.text_point(end, 0)).end())
+            for start, end in zip(conflicts.starts, conflicts.ends)
+        ]
+        view.add_regions(CONFLICTS_KEY, regions, CONFLICTS_SCOPE, "", sublime.DRAW_NO_FILL)
+        if hasattr(view, "clear_undo_stack"):
+            view.clear_undo_stack()
+        view.sel().clear()
+        view.sel().add(sublime.Region(regions[0].begin() if regions else 0))
+        view.show(view.sel()[0])
+
+    def cancel(self):
+        """Mark partially written output as cancelled."""
+
+        if self.view is not None and self.view.is_valid():
+            self.view.set_name("%s (cancelled)" % self.title)
+
+
+def start_merge(window, get_texts, names, syntax=None):
+    """
+    Merge three texts in the background and show the result in a new view.
+
+    `get_texts` is called on the worker thread and returns the base, left, and
+    right text (or `None` if they are not available).  `names` label the sides.
+    """
+
+    settings = load_settings()
+    workers = int(multiget(settings, "diff_parallel_workers", 0))
+    executor = get_executor(workers, multiget(settings, "diff_parallel_python", ""))
+    budget = int(multiget(settings, "diff_time_budget_ms", 0)) / 1000.0
+    options = EasyDiff.get_options()
+    title = "EasyDiff Merge: %s + %s (%s)" % (names[0], names[2], names[1])
+
+    def work(job):
+        """Merge and write the result (worker thread)."""
+
+        job.set_phase("Reading")
+        texts = get_texts(job)
+        if texts is None:
+            return None
+        # No line key: a change that a diff would ignore is still a change to merge.
+        interner = differ.LineInterner()
+        base, left, right = [interner.intern(differ.split_lines(text)) for text in texts]
+        job.set_phase("Matching")
+        merger = merge.Merge3(base, left, right, options["algorithm"], job.check, executor, workers, budget)
+        conflicts = merge.ConflictIndex()
+        output = MergeOutput(window, title, syntax)
+        try:
+            for chunk in iter_chunks(merger.merge_lines(names, conflicts)):
+                job.check()
+                if job.phase != "Writing":
+                    # Matching is done once the first lines are merged.
+                    job.set_phase("Writing")
+                    executor_failed(executor, merger.executor_error)
+                    if merger.approximate:
+                        output.title += " (approximate)"
+                job.call(output.write, chunk)
+            job.call(output.finish, conflicts)
+        except differ.DiffCancelledError:
+            job.call(output.cancel)
+            raise
+        if merger.approximate:
+            job.call(notify, "Diff time budget exceeded: merge is approximate")
+        elif len(conflicts):
+            job.call(notify, "%d conflict%s" % (len(conflicts), "" if len(conflicts) == 1 else "s"))
+        return None
+
+    DiffJob.start(window, work, title)
+
+
+###############################
+# Conflict Commands
+###############################
+def conflict_index(view, pt):
+    """Get the index of the conflict region that contains the point (or `-1`)."""
+
+    for index, region in enumerate(view.get_regions(CONFLICTS_KEY)):
+        if region.begin() <= pt <= region.end():
+            return index
+        if region.begin() > pt:
+            break
+    return -1
+
+
+class _EasyDiffConflictCommand(sublime_plugin.TextCommand):
+    """Conflict base command."""
+
+    def is_enabled(self, **kwargs):
+        """Check if the view has unresolved conflicts."""
+
+        return len(self.view.get_regions(CONFLICTS_KEY)) > 0
+
+    def cursor(self):
+        """Get the point of the first cursor."""
+
+        sel = self.view.sel()
+        return sel[0].begin() if len(sel) else 0
+
+    def show(self, pt):
+        """Move the cursor to the point and show it."""
+
+        self.view.sel().clear()
+        self.view.sel().add(sublime.Region(pt))
+        self.view.show_at_center(pt)
+
+
+class EasyDiffNextConflictCommand(_EasyDiffConflictCommand):
+    """Move to the next conflict."""
+
+    def run(self, edit):
+        """Run command."""
+
+        pt = self.cursor()
+        for region in self.view.get_regions(CONFLICTS_KEY):
+            if region.begin() > pt:
+                self.show(region.begin())
+                break
+
+
+class EasyDiffPreviousConflictCommand(_EasyDiffConflictCommand):
+    """Move to the previous conflict."""
+
+    def run(self, edit):
+        """Run command."""
+
+        pt = self.cursor()
+        for region in reversed(self.view.get_regions(CONFLICTS_KEY)):
+            if region.begin() < pt:
+                self.show(region.begin())
+                break
+
+
+class EasyDiffAcceptConflictCommand(_EasyDiffConflictCommand):
+    """Resolve the conflict under the cursor with one of its sides (left, base, or right)."""
+
+    def run(self, edit, side="left"):
+        """Run command."""
+
+        view = self.view
+        regions = view.get_regions(CONFLICTS_KEY)
+        index = conflict_index(view, self.cursor())
+        if index == -1:
+            sublime.status_message("EasyDiff: Not in a conflict")
+            return
+        region = regions[index]
+        sides = merge.split_conflict(view.substr(region).split('\n'))
+        if sides is None:
+            log("The conflict markers have been edited!", status=True)
+            return
+        lines = sides[SIDES.index(side)]
+        text = '\n'.join(lines)
+        if not lines:
+            # Take the line break with the conflict, so no empty line is left behind.
+            if region.end() < view.size():
+                region = sublime.Region(region.begin(), region.end() + 1)
+            elif region.begin() > 0:
+                region = sublime.Region(region.begin() - 1, region.end())
+        view.replace(edit, region, text)
+        del regions[index]
+        view.add_regions(CONFLICTS_KEY, regions, CONFLICTS_SCOPE, "", sublime.DRAW_NO_FILL)
+        self.show(min(region.begin(), view.size()))
+
+    def is_enabled(self, side="left"):
+        """Check if the cursor is in a conflict."""
+
+        return side in SIDES and conflict_index(self.view, self.cursor()) != -1
+
+
+###############################
+# Merge Files
+###############################
+class EasyDiffMergeFilesCommand(sublime_plugin.WindowCommand):
+    """Merge two files that descend from a common base file."""
+
+    def run(self, base, left, right):
+        """Run command."""
+
+        def get_texts(job):
+            texts = []
+            for name in (base, left, right):
+                try:
+                    with open(name, "rb") as f:
+                        texts.append(f.read().decode("utf-8", "replace"))
+                except (IOError, OSError):
+                    log("Could not read \"%s\"!" % name, status=True)
+                    return None
+            return texts
+
+        syntax = None
+        if hasattr(sublime, "find_syntax_for_file"):
+            found = sublime.find_syntax_for_file(right)
+            syntax = found.path if found is not None else None
+        start_merge(self.window, get_texts, (basename(left), basename(base), basename(right)), syntax)
@@ -0,0 +1,105 @@
+"""
+Easy Diff Navigate.
+
+Move between hunks of diff views and jump to the source lines.
+
+Copyright (c) 2013 - 2015 Isaac Muse <isaacmuse@gmail.com>
+License: MIT
+"""
+import sublime
+import sublime_plugin
+from os.path import isfile
+
+# Hunk indexes and `(left, right)` source paths of diff views by view id
+INDEXES = {}
+
+
+def register(view, index, sources):
+    """Attach a hunk index and the source paths to a diff view."""
+
+    INDEXES[view.id()] = (index, sources)
+
+
+def get_index(view):
+    """Get the hunk index of a diff view (or `None`)."""
+
+    entry = INDEXES.get(view.id())
+    return entry[0] if entry is not None else None
+
+
+def current_row(view):
+    """Get the row of the first cursor."""
+
+    sel = view.sel()
+    return view.rowcol(sel[0].begin())[0] if len(sel) else 0
+
+
+def show_row(view, row):
+    """Move the cursor to the start of a row and show it."""
+
+    pt = view.text_point(row, 0)
+    view.sel().clear()
+    view.sel().add(sublime.Region(pt))
+    view.show_at_center(pt)
+
+
+class _EasyDiffHunkCommand(sublime_plugin.TextCommand):
+    """Hunk navigation base command."""
+
+    def is_enabled(self):
+        """Check if the view has a hunk index."""
+
+        index = get_index(self.view)
+        return index is not None and len(index) > 0
+
+
+class EasyDiffNextHunkCommand(_EasyDiffHunkCommand):
+    """Move to the next hunk."""
+
+    def run(self, edit):
+        """Run command."""
+
+        row = get_index(self.view).next_hunk(current_row(self.view))
+        if row is not None:
+            show_row(self.view, row)
+
+
+class EasyDiffPreviousHunkCommand(_EasyDiffHunkCommand):
+    """Move to the previous hunk."""
+
+    def run(self, edit):
+        """Run command."""
+
+        row = get_index(self.view).previous_hunk(current_row(self.view))
+        if row is not None:
+            show_row(self.view, row)
+
+
+class EasyDiffGotoSourceCommand(_EasyDiffHunkCommand):
+    """Open the source file at the line under the cursor."""
+
+    def run(self, edit):
+        """Run command."""
+
+        index, sources = INDEXES[self.view.id()]
+        lines = index.source(current_row(self.view))
+        if lines is None:
+            sublime.status_message("EasyDiff: Not on a diff line")
+            return
+        # Prefer the right side, which is usually the working copy.
+        for side in (1, 0):
+            name = sources[side]
+            if name is not None and isfile(name):
+                window = self.view.window() or sublime.active_window()
+                window.open_file("%s:%d" % (name, lines[side]), sublime.ENCODED_POSITION)
+                return
+        sublime.status_message("EasyDiff: No source file to open")
+
+
+class EasyDiffNavigateListener(sublime_plugin.EventListener):
+    """Drop the hunk indexes of closed diff views."""
+
+    def on_close(self, view):
+        """Forget the index of the view."""
+
+        INDEXES.pop(view.id(), None)
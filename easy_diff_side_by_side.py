@@ -0,0 +1,240 @@
+"""
+Easy Diff Side By Side.
+
+Show a diff as two aligned panes that scroll together.
+
+Copyright (c) 2013 - 2015 Isaac Muse <isaacmuse@gmail.com>
+License: MIT
+"""
+import sublime
+import sublime_plugin
+from array import array
+from bisect import bisect_right
+
+LEFT = 0
+RIGHT = 1
+
+# Viewport polling interval (ms); there is no scroll event to react to
+POLL_INTERVAL = 100
+
+# Rows above and below the viewport that get their regions ahead of scrolling
+MARGIN_ROWS = 200
+
+DELETED = "deleted"
+INSERTED = "inserted"
+FILLER = "filler"
+
+SCOPES = {
+    DELETED: "markup.deleted.diff",
+    INSERTED: "markup.inserted.diff",
+    FILLER: "comment"
+}
+
+LAYOUT = {
+    "cols": [0.0, 0.5, 1.0],
+    "rows": [0.0, 1.0],
+    "cells": [[0, 0, 1, 1], [1, 0, 2, 1]]
+}
+
+# Open side by side diffs by the id of their panes
+SESSIONS = {}
+POLLING = False
+
+
+class Spans(object):
+    """Sorted, non-overlapping row ranges of one kind, searchable by row."""
+
+    def __init__(self):
+        """Initialize."""
+
+        self.starts = array('L')
+        self.ends = array('L')
+
+    def add(self, start, end):
+        """Append a row range (ranges must be added in order)."""
+
+        if end > start:
+            self.starts.append(start)
+            self.ends.append(end)
+
+    def find(self, first, last):
+        """Get the ranges that overlap rows `first` to `last`, clipped to them."""
+
+        index = bisect_right(self.ends, first)
+        count = len(self.starts)
+        while index < count and self.starts[index] < last:
+            yield max(self.starts[index], first), min(self.ends[index], last)
+            index += 1
+
+
+class SideBySide(object):
+    """
+    Two panes showing the sides of a diff aligned with filler lines.
+
+    Only the changes around the viewport get regions, so the cost of
+    showing a diff does not depend on how many changes it has.
+    """
+
+    def __init__(self, window, names, opcodes):
+        """Initialize and lay out the rows of both panes."""
+
+        self.window = window
+        self.names = names
+        self.opcodes = opcodes
+        self.views = None
+        self.ready = False
+        self.state = None
+        self.spans = (
+            {DELETED: Spans(), FILLER: Spans()},
+            {INSERTED: Spans(), FILLER: Spans()}
+        )
+        left, right = self.spans
+        row = 0
+        for tag, i1, i2, j1, j2 in opcodes:
+            n1 = i2 - i1
+            n2 = j2 - j1
+            if tag == 'equal':
+                row += n1
+                continue
+            rows = max(n1, n2)
+            left[DELETED].add(row, row + n1)
+            left[FILLER].add(row + n1, row + rows)
+            right[INSERTED].add(row, row + n2)
+            right[FILLER].add(row + n2, row + rows)
+            row += rows
+
+    def lines(self, side, a, b):
+        """Generate the lines of a pane, with empty lines as filler."""
+
+        for tag, i1, i2, j1, j2 in self.opcodes:
+            n1 = i2 - i1
+            n2 = j2 - j1
+            if tag == 'equal':
+                for line in (b[j1:j2] if side else a[i1:i2]):
+                    yield line
+                continue
+            for line in (b[j1:j2] if side else a[i1:i2]):
+                yield line
+            for _ in range(max(n1, n2) - (n2 if side else n1)):
+                yield ""
+
+    def open(self):
+        """Create a window with the two panes (main thread)."""
+
+        if self.window is None:
+            sublime.run_command("new_window")
+            self.window = sublime.active_window()
+        self.window.set_layout(LAYOUT)
+        views = []
+        for side in (LEFT, RIGHT):
+            self.window.focus_group(side)
+            view = self.window.new_file()
+            view.set_name(self.names[side])
+            view.set_scratch(True)
+            settings = view.settings()
+            # Wrapping would break the alignment of the rows.
+            settings.set("word_wrap", False)
+            settings.set("easy_diff_side_by_side", True)
+            views.append(view)
+        self.views = tuple(views)
+        for view in self.views:
+            SESSIONS[view.id()] = self
+        start_polling()
+
+    def write(self, side, text):
+        """Append text to a pane (main thread)."""
+
+        self.views[side].run_command('append', {'characters': text})
+
+    def finish(self):
+        """Make the panes read only and show the top (main thread)."""
+
+        for view in self.views:
+            view.set_read_only(True)
+            if hasattr(view, "clear_undo_stack"):
+                view.clear_undo_stack()
+            view.set_viewport_position((0, 0), False)
+        self.ready = True
+        self.update()
+
+    def cancel(self):
+        """Mark partially written panes as cancelled (main thread)."""
+
+        if self.views is not None:
+            for side, view in enumerate(self.views):
+                if view.is_valid():
+                    view.set_name("%s (cancelled)" % self.names[side])
+
+    def is_valid(self):
+        """Check if both panes are still open."""
+
+        return self.views is not None and all(view.is_valid() for view in self.views)
+
+    def update(self):
+        """Synchronise scrolling and add the regions around the viewport (main thread)."""
+
+        left, right = self.views
+        positions = (left.viewport_position(), right.viewport_position())
+        if self.state is not None and positions != self.state:
+            # Follow the pane that moved.
+            if positions[LEFT] != self.state[LEFT]:
+                right.set_viewport_position(positions[LEFT], False)
+            else:
+                left.set_viewport_position(positions[RIGHT], False)
+        positions = (left.viewport_position(), right.viewport_position())
+        if positions == self.state:
+            return
+        self.state = positions
+
+        visible = left.visible_region()
+        first = max(left.rowcol(visible.begin())[0] - MARGIN_ROWS, 0)
+        last = left.rowcol(visible.end())[0] + MARGIN_ROWS + 1
+        for side, view in enumerate(self.views):
+            size = view.size()
+            for kind, spans in self.spans[side].items():
+                regions = [
+                    sublime.Region(view.text_point(start, 0), min(view.text_point(end, 0), size))
+                    for start, end in spans.find(first, last)
+                ]
+                view.add_regions(
+                    "easy_diff_%s" % kind, regions, SCOPES[kind], "", sublime.DRAW_NO_OUTLINE
+                )
+
+
+def start_polling():
+    """Start polling the viewports of the open side by side diffs."""
+
+    global POLLING
+
+    if not POLLING and SESSIONS:
+        POLLING = True
+        sublime.set_timeout(poll, POLL_INTERVAL)
+
+
+def poll():
+    """Update all side by side diffs while there are any."""
+
+    global POLLING
+
+    for session in set(SESSIONS.values()):
+        if not session.is_valid():
+            for view_id in [k for k, v in SESSIONS.items() if v is session]:
+                del SESSIONS[view_id]
+        elif session.ready:
+            session.update()
+    if SESSIONS:
+        sublime.set_timeout(poll, POLL_INTERVAL)
+    else:
+        POLLING = False
+
+
+class EasyDiffSideBySideListener(sublime_plugin.EventListener):
+    """Stop tracking side by side diffs when a pane closes."""
+
+    def on_close(self, view):
+        """Stop tracking the session of the pane."""
+
+        session = SESSIONS.get(view.id())
+        if session is not None:
+            for view_id in [k for k, v in SESSIONS.items() if v is session]:
+                del SESSIONS[view_id]
@@ -6,13 +6,24 @@ License: MIT
 """
 import sublime
 import sublime_plugin
+from os import stat as osstat
 from os.path import basename, splitext, join, exists
+import threading
+import time
 import EasyDiff.lib.svn as svn
 import EasyDiff.lib.git as git
 import EasyDiff.lib.hg as hg
+import EasyDiff.lib.vcroot as vcroot
+import EasyDiff.lib.vcprobe as vcprobe
+import EasyDiff.lib.runner as runner
+from EasyDiff.lib.lru import LRUCache
 from EasyDiff.lib.multiconf import get as multiget
 from EasyDiff.easy_diff_global import load_settings, log, debug, get_encoding
 from EasyDiff.easy_diff_global import get_external_diff, get_target, notify, get_group_view
+from EasyDiff.easy_diff import DiffJob, EasyDiff, executor_failed, get_executor
+from EasyDiff.easy_diff_basic import has_left, get_left
+from EasyDiff.easy_diff_merge import start_merge, view_text, view_syntax
+import EasyDiff.lib.differ as differ
 import subprocess
 import tempfile
 
@@ -20,6 +31,32 @@ SVN_ENABLED = False
 GIT_ENABLED = False
 HG_ENABLED = False
 
+# Control directory of each version control type
+CONTROL_DIRS = {"SVN": vcroot.SVN, "GIT": vcroot.GIT, "HG": vcroot.HG}
+
+# Files in the control directory that change when files are added to or removed from version control
+CONTROL_FILES = {"SVN": ("wc.db",), "GIT": ("index", "HEAD"), "HG": ("dirstate",)}
+
+# Number of files whose versioned state is remembered (per version control type)
+VERSIONED_CACHE_SIZE = 4096
+
+# Seconds before a file whose control files changed is checked again (saving it checks it right away)
+VERSIONED_REFRESH_INTERVAL = 10
+
+# Versioned state of files by (control type, path): (versioned, control files stamp, time checked)
+VERSIONED = LRUCache(VERSIONED_CACHE_SIZE * len(CONTROL_DIRS))
+VERSIONED_PENDING = set()
+VERSIONED_LOCK = threading.Lock()
+
+# Modules of the version control types
+VC_MODULES = {"SVN": svn, "GIT": git, "HG": hg}
+
+# Binaries the version control types were last set up with
+VC_BINARIES = {}
+
+# Versions of the binaries that have been probed (set up when the plugin is loaded)
+VC_VERSIONS = None
+
 
 ###############################
 # Version Control Base
@@ -41,6 +78,39 @@ class _VersionControlDiff(object):
 
         return False
 
+    def get_base(self, name, **kwargs):
+        """Get the content of the base (or previous) revision of the file and a label for it."""
+
+        return None, None
+
+    def engine_diff(self, name, options, job, executor=None, workers=0, budget=0, **kwargs):
+        """
+        Diff the file against its base revision with the internal diff engine.
+
+        Used when differences are ignored, which the version control diff cannot do.
+        Both sides are split into lines like every other input of the engine.
+        """
+
+        job.set_phase("Reading")
+        base, label = self.get_base(name, **kwargs)
+        if base is None:
+            log("Could not get the base revision of \"%s\"!" % basename(name), status=True)
+            return None
+        with open(name, "rb") as f:
+            current = f.read()
+        interner = differ.LineInterner(EasyDiff.line_key(options))
+        a = interner.intern(differ.split_lines(self.decode(base)))
+        b = interner.intern(differ.split_lines(self.decode(current)))
+        job.set_phase("Matching")
+        matcher = differ.LineMatcher(a, b, options["algorithm"], job.check, executor, workers, budget)
+        matcher.get_opcodes()
+        executor_failed(executor, matcher.executor_error)
+        job.approximate = matcher.approximate
+        job.set_phase("Writing")
+        return differ.unified_diff(
+            a, b, "%s (%s)" % (name, label), name, lineterm='', matcher=matcher, check=job.check
+        )
+
     def vc_is_enabled(self, name):
         """Check if version control command is enabled."""
 
@@ -51,7 +121,7 @@ class _VersionControlDiff(object):
                     self.control_enabled and
                     (
                         multiget(load_settings(), "skip_version_check_on_is_enabled", False) or
-                        self.is_versioned(name)
+                        cached_is_versioned(self, name)
                     )
                 )
             except Exception:
@@ -106,29 +176,23 @@ class _VersionControlDiff(object):
                 sublime.error_message("Could not revert \"%s\"!" % basename(name))
 
     def internal_diff(self, name, **kwargs):
-        """Diff with internal diff."""
-
-        result = self.get_diff(name, **kwargs)
-
-        if result == "":
-            notify("No Difference")
-            result = None
-
-        if result is not None:
-            use_buffer = bool(load_settings().get("use_buffer", False))
-
-            win = sublime.active_window()
-            if use_buffer:
-                v = win.new_file()
-                v.set_name("EasyDiff: %s (%s)" % (self.control_type, basename(name)))
-                v.set_scratch(True)
-                v.assign_syntax('Packages/Diff/Diff.tmLanguage')
-                v.run_command('append', {'characters': result})
-            else:
-                v = win.create_output_panel('easy_diff')
-                v.assign_syntax('Packages/Diff/Diff.tmLanguage')
-                v.run_command('append', {'characters': result})
-                win.run_command("show_panel", {"panel": "output.easy_diff"})
+        """Diff with internal diff in the background."""
+
+        settings = load_settings()
+        workers = int(multiget(settings, "diff_parallel_workers", 0))
+        executor = get_executor(workers, multiget(settings, "diff_parallel_python", ""))
+        budget = int(multiget(settings, "diff_time_budget_ms", 0)) / 1000.0
+        options = EasyDiff.get_options(kwargs)
+        ignore = EasyDiff.ignores(options)
+        DiffJob.start(
+            sublime.active_window(),
+            lambda job: (
+                self.engine_diff(name, options, job, executor, workers, budget, **kwargs) if ignore
+                else self.get_diff(name, **kwargs)
+            ),
+            "EasyDiff: %s (%s)" % (self.control_type, basename(name)),
+            (None, name)
+        )
 
     def external_diff(self, name, **kwargs):
         """Diff with external diff command."""
@@ -145,6 +209,29 @@ class _VersionControlDiff(object):
                 ]
             )
 
+    def merge(self, name, **kwargs):
+        """Merge the left side and the file's view with the base (or previous) revision as the common base."""
+
+        left = get_left()
+        if left is None:
+            log("No left side to merge with!", status=True)
+            return
+        texts = (view_text(left), view_text(self.view))
+
+        def get_texts(job):
+            base, label = self.get_base(name, **kwargs)
+            if base is None:
+                log("Could not get the base revision of \"%s\"!" % basename(name), status=True)
+                return None
+            return self.decode(base), texts[0], texts[1]
+
+        names = (
+            basename(left.file_name() or "Untitled"),
+            "%s (%s %s)" % (basename(name), self.control_type, "previous" if kwargs.get("last", False) else "base"),
+            basename(name)
+        )
+        start_merge(sublime.active_window(), get_texts, names, view_syntax(self.view))
+
     def is_loaded(self):
         """Check if view is loaded."""
 
@@ -167,6 +254,8 @@ class _VersionControlDiff(object):
         if name is not None:
             if self.kwargs.get("revert"):
                 self.revert(name)
+            elif self.kwargs.get("merge"):
+                self.merge(name, **self.kwargs)
             else:
                 external = self.kwargs.get("external", False)
                 if not external:
@@ -211,7 +300,7 @@ class _VersionControlCommand(sublime_plugin.WindowCommand):
                 return False
             name = self.view.file_name() if self.view is not None else None
 
-        if name is None:
+        if name is None or (kwargs.get("merge", False) and not has_left()):
             return False
 
         return self.vc_is_enabled(name)
@@ -254,6 +343,12 @@ class _EasyDiffSvn(_VersionControlDiff):
             log("View not versioned under SVN!", status=True)
         return f1, f2
 
+    def get_base(self, name, **kwargs):
+        """Get the content of the base (or previous) revision of the file and a label for it."""
+
+        rev = "PREV" if kwargs.get("last", False) else "BASE"
+        return svn.cat(name, rev), "r%s" % rev
+
     def is_versioned(self, name):
         """Check if file is versioned."""
 
@@ -315,6 +410,17 @@ class _EasyDiffGit(_VersionControlDiff):
             log("View not versioned under Git!", status=True)
         return f1, f2
 
+    def get_base(self, name, **kwargs):
+        """Get the content of the base (or previous) revision of the file and a label for it."""
+
+        rev = "HEAD"
+        if kwargs.get("last", False):
+            revs = git.getrevision(name, 2)
+            if revs is None or len(revs) != 2:
+                return None, None
+            rev = revs[1]
+        return git.show(name, rev), rev
+
     def is_versioned(self, name):
         """Check if file is versioned."""
 
@@ -381,6 +487,17 @@ class _EasyDiffHg(_VersionControlDiff):
             log("View not versioned under Mercurial!", status=True)
         return f1, f2
 
+    def get_base(self, name, **kwargs):
+        """Get the content of the base (or previous) revision of the file and a label for it."""
+
+        rev = None
+        if kwargs.get("last", False):
+            revs = hg.getrevision(name, 2)
+            if revs is None or len(revs) != 2:
+                return None, None
+            rev = revs[1]
+        return hg.cat(name, rev), rev if rev is not None else "BASE"
+
     def is_versioned(self, name):
         """Check if file is versioned."""
 
@@ -432,16 +549,210 @@ class EasyDiffHgCommand(_VersionControlCommand, _EasyDiffHg):
         self.setup()
 
 
+###############################
+# Versioned State Cache
+###############################
+def control_stamp(control_type, name):
+    """
+    Get the modification times and sizes of the control files of the file's working copy (or `None`).
+
+    Only the files that track what is versioned are stamped, as the control
+    directory itself changes with all kinds of routine activity.
+    """
+
+    control = CONTROL_DIRS[control_type]
+    root = vcroot.get_root(name, control)
+    if root is None:
+        return None
+    stamp = []
+    for filename in CONTROL_FILES[control_type]:
+        try:
+            st = osstat(join(root, control, filename))
+            stamp.append((st.st_mtime, st.st_size))
+        except OSError:
+            stamp.append(None)
+    return tuple(stamp)
+
+
+def cached_is_versioned(vc, name):
+    """
+    Check if a file is versioned without spawning a process.
+
+    The state is computed in the background and remembered until the control
+    files of the working copy change or the file is saved.  Changed control
+    files are only acted on once the state is `VERSIONED_REFRESH_INTERVAL`
+    seconds old.  Until it is known, files in a working copy are assumed to be
+    versioned.
+    """
+
+    stamp = control_stamp(vc.control_type, name)
+    if stamp is None:
+        return False
+    entry = VERSIONED.get((vc.control_type, name))
+    if entry is None or (entry[1] != stamp and time.time() - entry[2] >= VERSIONED_REFRESH_INTERVAL):
+        update_versioned(vc, name)
+    return entry[0] if entry is not None else True
+
+
+def update_versioned(vc, name):
+    """Compute the versioned state of a file in the background."""
+
+    key = (vc.control_type, name)
+    with VERSIONED_LOCK:
+        if key in VERSIONED_PENDING:
+            return
+        VERSIONED_PENDING.add(key)
+
+    def update():
+        try:
+            try:
+                versioned = vc.is_versioned(name)
+            except Exception as e:
+                debug(e)
+                versioned = False
+            # Take the stamp last, as checking may refresh files in the control directory (such as Git's index).
+            VERSIONED.put(key, (versioned, control_stamp(vc.control_type, name), time.time()), 1)
+        finally:
+            with VERSIONED_LOCK:
+                VERSIONED_PENDING.discard(key)
+
+    sublime.set_timeout_async(update, 0)
+
+
+def version_controls():
+    """Get an instance of each enabled version control type."""
+
+    controls = []
+    for cls in (_EasyDiffSvn, _EasyDiffGit, _EasyDiffHg):
+        vc = cls()
+        vc.setup()
+        if vc.control_enabled:
+            controls.append(vc)
+    return controls
+
+
+class EasyDiffVersionedListener(sublime_plugin.EventListener):
+    """Keep the versioned state of files up to date for command enablement."""
+
+    def on_activated_async(self, view):
+        """Compute the versioned state of the file ahead of any menu being shown."""
+
+        name = view.file_name()
+        if name is not None and exists(name):
+            for vc in version_controls():
+                cached_is_versioned(vc, name)
+
+    def on_post_save(self, view):
+        """Check the saved file again (a new file may have been saved into a working copy)."""
+
+        name = view.file_name()
+        if name is None:
+            return
+        for vc in version_controls():
+            key = (vc.control_type, name)
+            entry = VERSIONED.get(key)
+            if entry is not None:
+                # Keep the last known state until the new one is known.
+                VERSIONED.put(key, (entry[0], None, entry[2]), 1)
+            update_versioned(vc, name)
+
+
+class EasyDiffVcTimingCommand(sublime_plugin.WindowCommand):
+    """Show where the time of the version control commands went in the console."""
+
+    def run(self):
+        """Run command."""
+
+        stats = runner.get_stats()
+        if not stats:
+            log("No version control commands have been run.")
+        for binary, subcommand, calls, failures, wait, elapsed, slowest in stats:
+            log(
+                "%-20s calls: %-6d failed: %-4d run: %-9.3fs waited: %-9.3fs slowest: %.3fs" % (
+                    ("%s %s" % (binary, subcommand)).strip(), calls, failures, elapsed, wait, slowest
+                )
+            )
+        self.window.run_command("show_panel", {"panel": "console"})
+
+
 ###############################
 # Loaders
 ###############################
-def setup_vc_binaries():
-    """Setup version control binaries."""
+def set_vc_enabled(control_type, enabled):
+    """Enable or disable a version control type."""
 
     global SVN_ENABLED
     global GIT_ENABLED
     global HG_ENABLED
 
+    if control_type == "SVN":
+        SVN_ENABLED = enabled
+    elif control_type == "GIT":
+        GIT_ENABLED = enabled
+    elif control_type == "HG":
+        HG_ENABLED = enabled
+
+
+def apply_vc_version(control_type, binary, version):
+    """Enable a version control type if its binary answered (main thread)."""
+
+    if VC_BINARIES.get(control_type) != binary:
+        # The binary was changed while it was being probed.
+        return
+    name = control_type.lower()
+    if version is vcprobe.TIMED_OUT:
+        log("%s did not answer in time!" % name)
+    elif isinstance(version, Exception):
+        log("%s not found or is not working!" % name)
+    else:
+        log("%s %s" % (name, version))
+        set_vc_enabled(control_type, True)
+
+
+def probe_vc_binaries(binaries):
+    """
+    Find the versions of the binaries of `{control type: binary}`.
+
+    Binaries that have not changed since they were last probed are looked up in
+    the version cache; the others are probed at the same time in the background.
+    """
+
+    pending = {}
+    for control_type, binary in binaries.items():
+        VC_BINARIES[control_type] = binary
+        set_vc_enabled(control_type, False)
+        stamp = vcprobe.binary_stamp(binary)
+        entry = VC_VERSIONS.get(stamp)
+        if entry is not None:
+            apply_vc_version(control_type, binary, entry["version"])
+        else:
+            pending[control_type] = (binary, stamp)
+
+    if not pending:
+        return
+
+    timeout = float(multiget(load_settings(), "vc_probe_timeout", 10))
+    probes = dict((control_type, VC_MODULES[control_type].version) for control_type in pending)
+
+    def run():
+        results = vcprobe.probe(probes, timeout)
+        found = {}
+        for control_type, version in results.items():
+            binary, stamp = pending[control_type]
+            if stamp is not None and version is not vcprobe.TIMED_OUT and not isinstance(version, Exception):
+                found[stamp] = version
+            sublime.set_timeout(lambda c=control_type, b=binary, v=version: apply_vc_version(c, b, v), 0)
+        if found:
+            VC_VERSIONS.put(found)
+
+    thread = threading.Thread(target=run)
+    thread.daemon = True
+    thread.start()
+
+
+def setup_vc_binaries():
+    """Setup version control binaries, probing only the ones that changed."""
+
     settings = load_settings()
     svn_path = multiget(settings, "svn", None)
     git_path = multiget(settings, "git", None)
@@ -453,21 +764,18 @@ def setup_vc_binaries():
     if hg_path is not None and hg_path != "":
         hg.set_hg_path(hg_path)
 
-    try:
-        log("svn %s" % svn.version())
-        SVN_ENABLED = True
-    except Exception:
-        log("svn not found or is not working!")
-    try:
-        log("git %s" % git.version())
-        GIT_ENABLED = True
-    except Exception:
-        log("git not found or is not working!")
-    try:
-        log("hg %s" % hg.version())
-        HG_ENABLED = True
-    except Exception:
-        log("hg not found or is not working!")
+    timeout = multiget(settings, "vc_query_timeout", runner.DEFAULT_QUERY_TIMEOUT)
+    runner.configure(
+        float(timeout) if timeout else None,
+        int(multiget(settings, "vc_max_processes", runner.DEFAULT_MAX_PROCESSES))
+    )
+
+    binaries = {"SVN": svn.get_svn_path(), "GIT": git.get_git_path(), "HG": hg.get_hg_path()}
+    changed = dict((key, value) for key, value in binaries.items() if VC_BINARIES.get(key) != value)
+    if changed:
+        # Different binaries may not see files the same way.
+        VERSIONED.clear()
+        probe_vc_binaries(changed)
 
     settings.clear_on_change('reload_vc')
     settings.add_on_change('reload_vc', setup_vc_binaries)
@@ -476,4 +784,13 @@ def setup_vc_binaries():
 def plugin_loaded():
     """Setup plugin."""
 
+    global VC_VERSIONS
+
+    VC_VERSIONS = vcprobe.VersionCache(join(sublime.cache_path(), "EasyDiff", "vc_versions.json"))
     setup_vc_binaries()
+
+
+def plugin_unloaded():
+    """Stop the Git processes that are kept running."""
+
+    git.stop_cat_files()
@@ -0,0 +1,1098 @@
+"""
+Differ.
+
+Line based diff engine with selectable algorithms.
+
+Copyright (c) 2013 - 2015 Isaac Muse <isaacmuse@gmail.com>
+License: MIT
+"""
+from array import array
+import bisect
+import concurrent.futures
+import difflib
+import re
+import time
+
+MYERS = "myers"
+PATIENCE = "patience"
+HISTOGRAM = "histogram"
+DIFFLIB = "difflib"
+AUTO = "auto"
+
+ALGORITHMS = (MYERS, PATIENCE, HISTOGRAM, DIFFLIB)
+
+# When the combined line count is at or below this,
+# "auto" uses Myers (minimal diff), else histogram.
+# Myers is O(ND), so it is only picked when even a
+# total rewrite is cheap.
+AUTO_MYERS_LIMIT = 4000
+
+# Chunk size used when comparing common prefixes and suffixes.
+AFFIX_CHUNK = 4096
+
+# Segmented (parallel) matching is only used when the
+# trimmed input has at least this many lines.
+PARALLEL_MIN_LINES = 50000
+
+# Segments created per worker to balance the load.
+SEGMENTS_PER_WORKER = 4
+
+# Histogram diff ignores lines that occur more than this
+# many times in the left side when looking for anchors.
+HISTOGRAM_MAX_CHAIN = 64
+
+RE_WHITESPACE = re.compile(r'\s+')
+
+# Replacement for the spans of lines matched by ignore patterns
+MASK = '\x00'
+
+
+def split_lines(text):
+    """
+    Split text into the lines that are compared.
+
+    Lines end at line feeds and lose a trailing carriage return; a final line
+    break does not start another line.  Every compared input is split this way
+    (`TextSnapshot` and `MappedLines` split the same way without this function),
+    so inputs from different sources agree on where their lines are.
+    """
+
+    lines = text.split('\n')
+    if not lines[-1]:
+        lines.pop()
+    if '\r' in text:
+        lines = [line[:-1] if line.endswith('\r') else line for line in lines]
+    return lines
+
+
+def compile_patterns(patterns):
+    """Compile a list of regular expressions into a single alternation."""
+
+    return re.compile('|'.join('(?:%s)' % pattern for pattern in patterns))
+
+
+def line_key(
+    ignore_whitespace_change=False, ignore_all_whitespace=False, ignore_case=False, ignore_eol=False,
+    ignore_patterns=None
+):
+    """
+    Get a function that normalizes lines for comparison.
+
+    Spans matching any of the `ignore_patterns` are masked, so lines that only
+    differ within them compare equal.  Returns `None` if lines are compared as is.
+    """
+
+    steps = []
+    if ignore_patterns:
+        mask = compile_patterns(ignore_patterns).sub
+        steps.append(lambda line: mask(MASK, line))
+    if ignore_eol:
+        steps.append(lambda line: line.rstrip('\r\n'))
+    if ignore_all_whitespace:
+        steps.append(lambda line: RE_WHITESPACE.sub('', line))
+    elif ignore_whitespace_change:
+        steps.append(lambda line: RE_WHITESPACE.sub(' ', line).rstrip())
+    if ignore_case:
+        steps.append(lambda line: line.lower())
+
+    if not steps:
+        return None
+
+    def key(line):
+        for step in steps:
+            line = step(line)
+        return line
+
+    return key
+
+
+class InternedLines(object):
+    """
+    Sequence of lines stored as ids into a shared line table.
+
+    If the lines were interned by a normalized key, the original `lines`
+    are kept as the table only holds one line per key.
+    """
+
+    def __init__(self, ids, table, lines=None):
+        """Initialize."""
+
+        self.ids = ids
+        self.table = table
+        self.lines = lines
+
+    def __len__(self):
+        """Get the line count."""
+
+        return len(self.ids)
+
+    def __getitem__(self, index):
+        """Get a line or a list of lines for a slice."""
+
+        if self.lines is not None:
+            return self.lines[index]
+        if isinstance(index, slice):
+            table = self.table
+            return [table[i] for i in self.ids[index]]
+        return self.table[self.ids[index]]
+
+    def __iter__(self):
+        """Iterate the lines."""
+
+        if self.lines is not None:
+            return iter(self.lines)
+        table = self.table
+        return (table[i] for i in self.ids)
+
+
+class HashedLines(object):
+    """
+    Sequence of lines identified by their hashes.
+
+    Used when one side is too large to intern; equal hashes are verified
+    against the real lines (normalized by `key` if given) after matching.
+    """
+
+    hashed = True
+
+    def __init__(self, lines, key=None):
+        """Initialize."""
+
+        self.lines = lines
+        self.key = key
+        self.ids = array('q', [hash(line) for line in (map(key, lines) if key is not None else lines)])
+
+    def __len__(self):
+        """Get the line count."""
+
+        return len(self.lines)
+
+    def __getitem__(self, index):
+        """Get a line or a list of lines for a slice."""
+
+        return self.lines[index]
+
+    def __iter__(self):
+        """Iterate the lines."""
+
+        return iter(self.lines)
+
+
+class LineInterner(object):
+    """
+    Map every distinct line to a small integer id.
+
+    Sequences interned with the same interner can be compared by id only,
+    and duplicate lines share a single string object.  With a `key` (see
+    `line_key`), lines are interned by their normalized form instead.
+    """
+
+    def __init__(self, key=None):
+        """Initialize."""
+
+        self.key = key
+        self.index = {}
+        self.table = []
+
+    def intern(self, lines):
+        """Intern the lines and return them as an `InternedLines` sequence."""
+
+        index = self.index
+        table = self.table
+        ids = array('I')
+        append = ids.append
+        key = self.key
+        if key is not None and not isinstance(lines, list):
+            lines = list(lines)
+        for line in (map(key, lines) if key is not None else lines):
+            i = index.get(line)
+            if i is None:
+                i = index[line] = len(table)
+                table.append(line)
+            append(i)
+        return InternedLines(ids, table, lines if key is not None else None)
+
+
+class DiffCancelledError(Exception):
+    """Raised from a check callback to abort a running diff."""
+
+
+class Deadline(object):
+    """
+    Time budget for matching.
+
+    Once expired, regions that are not matched yet are only matched approximately.
+    """
+
+    def __init__(self, deadline):
+        """Initialize with an absolute `time.time()` deadline."""
+
+        self.deadline = deadline
+        self.expired = False
+        self.approximate = False
+
+    def __call__(self):
+        """Check if the deadline has passed."""
+
+        if not self.expired and time.time() > self.deadline:
+            self.expired = True
+        return self.expired
+
+
+def select_algorithm(algorithm, size):
+    """Resolve the algorithm to use for the given combined line count."""
+
+    if algorithm in ALGORITHMS:
+        return algorithm
+    return MYERS if size <= AUTO_MYERS_LIMIT else HISTOGRAM
+
+
+###############################
+# Myers
+###############################
+def _middle_snake(a, alo, ahi, b, blo, bhi, check, deadline):
+    """
+    Find the middle snake of the region.
+
+    Returns the snake start and end (relative to the region) and the edit distance,
+    or `None` if the deadline expired.
+    """
+
+    n = ahi - alo
+    m = bhi - blo
+    delta = n - m
+    odd = delta & 1
+    max_d = (n + m + 1) // 2
+    offset = max_d + 1
+    vf = [0] * (2 * max_d + 3)
+    vb = [0] * (2 * max_d + 3)
+
+    for d in range(max_d + 1):
+        if check is not None:
+            check()
+        if deadline is not None and deadline():
+            return None
+
+        # Forward search
+        for k in range(-d, d + 1, 2):
+            if k == -d or (k != d and vf[offset + k - 1] < vf[offset + k + 1]):
+                x = vf[offset + k + 1]
+            else:
+                x = vf[offset + k - 1] + 1
+            y = x - k
+            x0, y0 = x, y
+            while x < n and y < m and a[alo + x] == b[blo + y]:
+                x += 1
+                y += 1
+            vf[offset + k] = x
+            if odd and delta - (d - 1) <= k <= delta + (d - 1):
+                if x + vb[offset + delta - k] >= n:
+                    return x0, y0, x, y, 2 * d - 1
+
+        # Reverse search
+        for k in range(-d, d + 1, 2):
+            if k == -d or (k != d and vb[offset + k - 1] < vb[offset + k + 1]):
+                x = vb[offset + k + 1]
+            else:
+                x = vb[offset + k - 1] + 1
+            y = x - k
+            x0, y0 = x, y
+            while x < n and y < m and a[ahi - 1 - x] == b[bhi - 1 - y]:
+                x += 1
+                y += 1
+            vb[offset + k] = x
+            if not odd and -d <= delta - k <= d:
+                if x + vf[offset + delta - k] >= n:
+                    return n - x, m - y, n - x0, m - y0, 2 * d
+
+    # Unreachable: the paths must meet by max_d.
+    return 0, 0, n, m, n + m
+
+
+def _myers(a, alo, ahi, b, blo, bhi, blocks, check=None, deadline=None):
+    """Linear space Myers diff, appending matching blocks (unordered)."""
+
+    stack = [(alo, ahi, blo, bhi)]
+    while stack:
+        if check is not None:
+            check()
+        alo, ahi, blo, bhi = stack.pop()
+
+        # Common prefix
+        start = alo
+        while alo < ahi and blo < bhi and a[alo] == b[blo]:
+            alo += 1
+            blo += 1
+        if alo > start:
+            blocks.append((start, blo - (alo - start), alo - start))
+
+        # Common suffix
+        end = ahi
+        while alo < ahi and blo < bhi and a[ahi - 1] == b[bhi - 1]:
+            ahi -= 1
+            bhi -= 1
+        if ahi < end:
+            blocks.append((ahi, bhi, end - ahi))
+
+        if alo == ahi or blo == bhi:
+            continue
+
+        snake = _middle_snake(a, alo, ahi, b, blo, bhi, check, deadline)
+        if snake is None:
+            _approximate(a, alo, ahi, b, blo, bhi, blocks, deadline)
+            continue
+        x0, y0, x1, y1, d = snake
+        if x1 > x0:
+            blocks.append((alo + x0, blo + y0, x1 - x0))
+        if d > 1:
+            stack.append((alo + x1, ahi, blo + y1, bhi))
+            stack.append((alo, alo + x0, blo, blo + y0))
+
+
+def _approximate(a, alo, ahi, b, blo, bhi, blocks, deadline):
+    """
+    Cheaply match a region when out of time.
+
+    Only lines unique to both sides are matched, extended by the equal lines around them.
+    """
+
+    deadline.approximate = True
+    i, j = alo, blo
+    for ai, bj in _unique_anchors(a, alo, ahi, b, blo, bhi):
+        if ai < i or bj < j:
+            continue
+        si, sj = ai, bj
+        while si > i and sj > j and a[si - 1] == b[sj - 1]:
+            si -= 1
+            sj -= 1
+        ei, ej = ai + 1, bj + 1
+        while ei < ahi and ej < bhi and a[ei] == b[ej]:
+            ei += 1
+            ej += 1
+        blocks.append((si, sj, ei - si))
+        i, j = ei, ej
+
+
+###############################
+# Patience
+###############################
+def _unique_anchors(a, alo, ahi, b, blo, bhi):
+    """Find lines unique to both regions and return the longest increasing run of them."""
+
+    counts = {}
+    for i in range(alo, ahi):
+        line = a[i]
+        entry = counts.get(line)
+        counts[line] = [i, None] if entry is None else [-1, None]
+    for j in range(blo, bhi):
+        entry = counts.get(b[j])
+        if entry is not None and entry[0] != -1:
+            entry[1] = j if entry[1] is None else -1
+
+    pairs = [
+        (entry[0], entry[1]) for entry in counts.values()
+        if entry[0] != -1 and entry[1] is not None and entry[1] != -1
+    ]
+    if not pairs:
+        return pairs
+    pairs.sort()
+
+    # Patience sort to get the longest increasing subsequence on the right side index.
+    tails = []
+    tail_index = []
+    back = [None] * len(pairs)
+    for idx, (i, j) in enumerate(pairs):
+        lo, hi = 0, len(tails)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if tails[mid] < j:
+                lo = mid + 1
+            else:
+                hi = mid
+        back[idx] = tail_index[lo - 1] if lo else None
+        if lo == len(tails):
+            tails.append(j)
+            tail_index.append(idx)
+        else:
+            tails[lo] = j
+            tail_index[lo] = idx
+
+    anchors = []
+    idx = tail_index[-1]
+    while idx is not None:
+        anchors.append(pairs[idx])
+        idx = back[idx]
+    anchors.reverse()
+    return anchors
+
+
+def _patience(a, alo, ahi, b, blo, bhi, blocks, check=None, deadline=None):
+    """Patience diff, appending matching blocks (unordered)."""
+
+    stack = [(alo, ahi, blo, bhi)]
+    while stack:
+        if check is not None:
+            check()
+        alo, ahi, blo, bhi = stack.pop()
+        if alo == ahi or blo == bhi:
+            continue
+        if deadline is not None and deadline():
+            _approximate(a, alo, ahi, b, blo, bhi, blocks, deadline)
+            continue
+
+        anchors = _unique_anchors(a, alo, ahi, b, blo, bhi)
+        if not anchors:
+            _myers(a, alo, ahi, b, blo, bhi, blocks, check, deadline)
+            continue
+
+        i, j = alo, blo
+        for ai, bj in anchors:
+            stack.append((i, ai, j, bj))
+            blocks.append((ai, bj, 1))
+            i, j = ai + 1, bj + 1
+        stack.append((i, ahi, j, bhi))
+
+
+###############################
+# Histogram
+###############################
+def _histogram_matches(a, alo, ahi, b, blo, bhi):
+    """
+    Find the lowest occurrence matching regions.
+
+    Every region seeded by a line with the lowest occurrence count is extended
+    as far as it will go; the largest compatible regions are kept so that a
+    single pass can split the problem at many points.
+    """
+
+    positions = {}
+    for i in range(alo, ahi):
+        positions.setdefault(a[i], []).append(i)
+
+    lowest = HISTOGRAM_MAX_CHAIN
+    seeds = []
+    for j in range(blo, bhi):
+        occurrences = positions.get(b[j])
+        if occurrences is not None and len(occurrences) <= lowest:
+            if len(occurrences) < lowest:
+                lowest = len(occurrences)
+                seeds = []
+            seeds.append(j)
+
+    candidates = []
+    last_j = blo
+    for j in seeds:
+        if j < last_j:
+            continue
+        for i in positions[b[j]]:
+            si, sj = i, j
+            while si > alo and sj > blo and a[si - 1] == b[sj - 1]:
+                si -= 1
+                sj -= 1
+            ei, ej = i + 1, j + 1
+            while ei < ahi and ej < bhi and a[ei] == b[ej]:
+                ei += 1
+                ej += 1
+            candidates.append((ei - si, si, sj))
+            if ej > last_j:
+                last_j = ej
+
+    # Keep the largest regions that are ordered consistently on both sides.
+    candidates.sort(key=lambda c: (-c[0], c[1], c[2]))
+    starts = []
+    accepted = []
+    for size, si, sj in candidates:
+        idx = bisect.bisect(starts, si)
+        if idx:
+            pi, pj, pk = accepted[idx - 1]
+            if pi + pk > si or pj + pk > sj:
+                continue
+        if idx < len(accepted):
+            ni, nj = accepted[idx][:2]
+            if si + size > ni or sj + size > nj:
+                continue
+        starts.insert(idx, si)
+        accepted.insert(idx, (si, sj, size))
+    return accepted
+
+
+def _histogram(a, alo, ahi, b, blo, bhi, blocks, check=None, deadline=None):
+    """Histogram diff, appending matching blocks (unordered)."""
+
+    stack = [(alo, ahi, blo, bhi)]
+    while stack:
+        if check is not None:
+            check()
+        alo, ahi, blo, bhi = stack.pop()
+        if alo == ahi or blo == bhi:
+            continue
+        if deadline is not None and deadline():
+            _approximate(a, alo, ahi, b, blo, bhi, blocks, deadline)
+            continue
+
+        matches = _histogram_matches(a, alo, ahi, b, blo, bhi)
+        if not matches:
+            _myers(a, alo, ahi, b, blo, bhi, blocks, check, deadline)
+            continue
+
+        i, j = alo, blo
+        for match in matches:
+            ai, bj, size = match
+            stack.append((i, ai, j, bj))
+            blocks.append(match)
+            i, j = ai + size, bj + size
+        stack.append((i, ahi, j, bhi))
+
+
+_ALGORITHM_MAP = {
+    MYERS: _myers,
+    PATIENCE: _patience,
+    HISTOGRAM: _histogram
+}
+
+
+###############################
+# Segmented
+###############################
+def split_segments(a, alo, ahi, b, blo, bhi, count):
+    """
+    Cut the region into about `count` independent segments at unique matching lines.
+
+    Returns the segments and the anchor lines (as matching blocks) they were cut at.
+    """
+
+    segments = []
+    cuts = []
+    step = (ahi - alo) / count
+    i, j = alo, blo
+    for ai, bj in _unique_anchors(a, alo, ahi, b, blo, bhi):
+        if ai >= alo + step * (len(segments) + 1):
+            segments.append((i, ai, j, bj))
+            cuts.append((ai, bj, 1))
+            i, j = ai + 1, bj + 1
+    segments.append((i, ahi, j, bhi))
+    return segments, cuts
+
+
+def match_segment(algorithm, a, b, deadline=None, check=None):
+    """
+    Match a segment and return its matching blocks (runs in a worker).
+
+    Also returns whether the segment was only approximately matched because
+    the absolute `deadline` passed.  `check` can only be given to workers that
+    are threads, as it is not sent to other processes.
+    """
+
+    blocks = []
+    budget = Deadline(deadline) if deadline is not None else None
+    _ALGORITHM_MAP[select_algorithm(algorithm, len(a) + len(b))](
+        a, 0, len(a), b, 0, len(b), blocks, check, budget
+    )
+    return blocks, budget is not None and budget.approximate
+
+
+def _match_parallel(algorithm, a, alo, ahi, b, blo, bhi, blocks, executor, workers, check, deadline):
+    """
+    Match independent segments of the region concurrently with the executor.
+
+    If the executor fails (such as a process pool whose workers could not be
+    started), the segments that are left are matched here instead, and the
+    error is returned.
+    """
+
+    segments, cuts = split_segments(a, alo, ahi, b, blo, bhi, workers * SEGMENTS_PER_WORKER)
+    segments = [segment for segment in segments if segment[0] < segment[1] and segment[2] < segment[3]]
+    blocks.extend(cuts)
+    # Threads can stop as soon as the job is cancelled; other processes can not be asked.
+    segment_check = check if isinstance(executor, concurrent.futures.ThreadPoolExecutor) else None
+    seconds = deadline.deadline if deadline is not None else None
+    left = set(range(len(segments)))
+    futures = {}
+    error = None
+    try:
+        for index, (i1, i2, j1, j2) in enumerate(segments):
+            futures[executor.submit(match_segment, algorithm, a[i1:i2], b[j1:j2], seconds, segment_check)] = index
+
+        pending = set(futures)
+        while pending:
+            if check is not None:
+                check()
+            done, pending = concurrent.futures.wait(pending, timeout=0.1)
+            for future in done:
+                index = futures[future]
+                segment_blocks, approximate = future.result()
+                i1, j1 = segments[index][0], segments[index][2]
+                for i, j, k in segment_blocks:
+                    blocks.append((i1 + i, j1 + j, k))
+                if approximate:
+                    deadline.approximate = True
+                left.discard(index)
+    except DiffCancelledError:
+        raise
+    except Exception as e:
+        error = e
+    finally:
+        for future in futures:
+            future.cancel()
+
+    for index in sorted(left):
+        i1, i2, j1, j2 = segments[index]
+        _ALGORITHM_MAP[select_algorithm(algorithm, i2 - i1 + j2 - j1)](a, i1, i2, b, j1, j2, blocks, check, deadline)
+    return error
+
+
+def _normalize_blocks(blocks, la, lb):
+    """Sort and merge adjacent matching blocks and append the sentinel."""
+
+    blocks.sort()
+    normalized = []
+    i1 = j1 = k1 = 0
+    for i2, j2, k2 in blocks:
+        if not k2:
+            continue
+        if i1 + k1 == i2 and j1 + k1 == j2:
+            k1 += k2
+        else:
+            if k1:
+                normalized.append((i1, j1, k1))
+            i1, j1, k1 = i2, j2, k2
+    if k1:
+        normalized.append((i1, j1, k1))
+    normalized.append((la, lb, 0))
+    return normalized
+
+
+def _lines_equal(a, b):
+    """Get a function that compares a line of `a` with a line of `b`."""
+
+    key = getattr(a, 'key', None) or getattr(b, 'key', None)
+    if key is not None:
+        return lambda i, j: key(a[i]) == key(b[j])
+    if hasattr(a, 'raw') and hasattr(b, 'raw') and a.encoding == b.encoding:
+        return lambda i, j: a.raw(i) == b.raw(j)
+    return lambda i, j: a[i] == b[j]
+
+
+def verify_blocks(a, b, blocks):
+    """Split matching blocks at lines that only matched because their hashes collided."""
+
+    equal = _lines_equal(a, b)
+    verified = []
+    for i, j, k in blocks:
+        start = 0
+        for offset in range(k):
+            if not equal(i + offset, j + offset):
+                if offset > start:
+                    verified.append((i + start, j + start, offset - start))
+                start = offset + 1
+        if k > start:
+            verified.append((i + start, j + start, k - start))
+    return verified
+
+
+def common_affix(a, b):
+    """
+    Get the length of the identical prefix and suffix of two sequences.
+
+    Slices are compared in chunks so long identical runs are compared at C speed.
+    """
+
+    la, lb = len(a), len(b)
+    limit = min(la, lb)
+
+    prefix = 0
+    step = AFFIX_CHUNK
+    while prefix < limit:
+        end = min(prefix + step, limit)
+        if a[prefix:end] == b[prefix:end]:
+            prefix = end
+        elif step > 1:
+            step //= 8
+        else:
+            break
+
+    limit -= prefix
+    suffix = 0
+    step = AFFIX_CHUNK
+    while suffix < limit:
+        size = min(step, limit - suffix)
+        if a[la - suffix - size:la - suffix] == b[lb - suffix - size:lb - suffix]:
+            suffix += size
+        elif step > 1:
+            step //= 8
+        else:
+            break
+
+    return prefix, suffix
+
+
+def blocks_opcodes(blocks, i=0, j=0):
+    """
+    Get the opcodes that turn a into b from matching blocks.
+
+    The opcodes start at line `i` of a and `j` of b, so the opcodes of a run of
+    blocks can be had without the blocks before it.
+    """
+
+    answer = []
+    for ai, bj, size in blocks:
+        tag = ''
+        if i < ai and j < bj:
+            tag = 'replace'
+        elif i < ai:
+            tag = 'delete'
+        elif j < bj:
+            tag = 'insert'
+        if tag:
+            answer.append((tag, i, ai, j, bj))
+        i, j = ai + size, bj + size
+        if size:
+            answer.append(('equal', ai, i, bj, j))
+    return answer
+
+
+def group_opcodes(codes, n=3):
+    """
+    Isolate change clusters of opcodes by eliminating ranges with no changes.
+
+    Groups are split at equal runs of more than `n * 2` lines, so the groups
+    between two such runs do not depend on the opcodes outside of them.
+    """
+
+    codes = list(codes)
+    if not codes:
+        codes = [("equal", 0, 1, 0, 1)]
+
+    # Fixup leading and trailing groups if they show no changes.
+    if codes[0][0] == 'equal':
+        tag, i1, i2, j1, j2 = codes[0]
+        codes[0] = tag, max(i1, i2 - n), i2, max(j1, j2 - n), j2
+    if codes[-1][0] == 'equal':
+        tag, i1, i2, j1, j2 = codes[-1]
+        codes[-1] = tag, i1, min(i2, i1 + n), j1, min(j2, j1 + n)
+
+    nn = n + n
+    group = []
+    for tag, i1, i2, j1, j2 in codes:
+        # End the current group and start a new one whenever
+        # there is a large range with no changes.
+        if tag == 'equal' and i2 - i1 > nn:
+            group.append((tag, i1, min(i2, i1 + n), j1, min(j2, j1 + n)))
+            yield group
+            group = []
+            i1, j1 = max(i1, i2 - n), max(j1, j2 - n)
+        group.append((tag, i1, i2, j1, j2))
+    if group and not (len(group) == 1 and group[0][0] == 'equal'):
+        yield group
+
+
+class LineMatcher(object):
+    """
+    Match two sequences of lines.
+
+    Mirrors the parts of `difflib.SequenceMatcher` that are used for unified diffs.
+    Interned sequences are matched on their integer ids.
+
+    If `check` is given, it is called periodically while matching and may
+    raise `DiffCancelledError` to abort.
+
+    If an `executor` (`concurrent.futures` style) and a worker count are given,
+    large inputs are cut into segments at unique matching lines and the segments
+    are matched concurrently.  If the executor fails, matching finishes without
+    it and the error is kept as `executor_error`.
+
+    If `timeout` (seconds) is given and matching takes longer, the remaining work
+    falls back to a cheap approximation and `approximate` is set.  The time budget
+    does not apply to the difflib algorithm.
+    """
+
+    def __init__(self, a, b, algorithm=AUTO, check=None, executor=None, workers=0, timeout=None):
+        """Initialize."""
+
+        self.a = getattr(a, "ids", a)
+        self.b = getattr(b, "ids", b)
+        self.verify = (a, b) if getattr(a, "hashed", False) or getattr(b, "hashed", False) else None
+        self.algorithm = algorithm
+        self.check = check
+        self.executor = executor
+        self.workers = workers
+        self.timeout = timeout
+        self.approximate = False
+        self.executor_error = None
+        self.matching_blocks = None
+        self.opcodes = None
+
+    def get_matching_blocks(self):
+        """
+        Return list of triples describing matching subsequences.
+
+        Identical leading and trailing lines are trimmed first and only the
+        middle is handed to the diff algorithm.
+        """
+
+        if self.matching_blocks is not None:
+            return self.matching_blocks
+
+        a, b = self.a, self.b
+        la, lb = len(a), len(b)
+        prefix, suffix = common_affix(a, b)
+        ahi, bhi = la - suffix, lb - suffix
+
+        blocks = []
+        if prefix:
+            blocks.append((0, 0, prefix))
+        if suffix:
+            blocks.append((ahi, bhi, suffix))
+
+        deadline = Deadline(time.time() + self.timeout) if self.timeout else None
+        if prefix < ahi and prefix < bhi:
+            algorithm = select_algorithm(self.algorithm, ahi + bhi - prefix * 2)
+            if algorithm == DIFFLIB:
+                matcher = difflib.SequenceMatcher(None, a[prefix:ahi], b[prefix:bhi])
+                for i, j, k in matcher.get_matching_blocks():
+                    blocks.append((prefix + i, prefix + j, k))
+            elif (
+                self.executor is not None and self.workers > 1 and
+                ahi + bhi - prefix * 2 >= PARALLEL_MIN_LINES
+            ):
+                self.executor_error = _match_parallel(
+                    self.algorithm, a, prefix, ahi, b, prefix, bhi, blocks,
+                    self.executor, self.workers, self.check, deadline
+                )
+            else:
+                _ALGORITHM_MAP[algorithm](a, prefix, ahi, b, prefix, bhi, blocks, self.check, deadline)
+            self.approximate = deadline is not None and deadline.approximate
+
+        if self.verify is not None:
+            blocks = verify_blocks(self.verify[0], self.verify[1], blocks)
+
+        self.matching_blocks = _normalize_blocks(blocks, la, lb)
+        return self.matching_blocks
+
+    def get_opcodes(self):
+        """Return list of 5-tuples describing how to turn a into b."""
+
+        if self.opcodes is not None:
+            return self.opcodes
+
+        self.opcodes = blocks_opcodes(self.get_matching_blocks())
+        return self.opcodes
+
+    def get_stats(self, n=3):
+        """
+        Count the changes without formatting them.
+
+        Returns a dict with the number of lines `added`, `removed`, and `changed`
+        (a replaced line counts as changed, unpaired lines of a replacement as
+        added or removed), the number of unified diff `hunks` with `n` lines of
+        context, and the similarity `ratio` (as `difflib.SequenceMatcher.ratio`).
+        """
+
+        added = removed = changed = hunks = 0
+        gap = None
+        for tag, i1, i2, j1, j2 in self.get_opcodes():
+            if tag == 'equal':
+                if hunks:
+                    gap = i2 - i1
+                continue
+            # A new hunk starts after more unchanged lines than two contexts can cover.
+            if not hunks or (gap is not None and gap > n + n):
+                hunks += 1
+            gap = None
+            paired = min(i2 - i1, j2 - j1)
+            changed += paired
+            removed += i2 - i1 - paired
+            added += j2 - j1 - paired
+        total = len(self.a) + len(self.b)
+        matches = sum(size for _, _, size in self.get_matching_blocks())
+        return {
+            "added": added,
+            "removed": removed,
+            "changed": changed,
+            "hunks": hunks,
+            "ratio": 2.0 * matches / total if total else 1.0
+        }
+
+    def get_grouped_opcodes(self, n=3):
+        """Isolate change clusters by eliminating ranges with no changes."""
+
+        return group_opcodes(self.get_opcodes(), n)
+
+
+def _find_block(blocks, count, side, pos, ends):
+    """
+    Find the first of the first `count` blocks that ends after `pos` on a side.
+
+    If `ends` is false, find the first block that starts at or after `pos` instead.
+    Returns `count` if there is none.
+    """
+
+    lo, hi = 0, count
+    while lo < hi:
+        mid = (lo + hi) // 2
+        block = blocks[mid]
+        if (block[side] + block[2] > pos) if ends else (block[side] >= pos):
+            hi = mid
+        else:
+            lo = mid + 1
+    return lo
+
+
+class IncrementalMatcher(LineMatcher):
+    """
+    Matcher for two lists of lines that are edited in place.
+
+    An edit only re-matches the lines between the matching blocks that surround it,
+    and the blocks are found by bisection, so its cost depends on the size of the
+    edit, not on the number of lines.  Blocks after an edit that adds or removes
+    lines are moved, which is a plain copy of the blocks.
+    """
+
+    def __init__(self, a, b, algorithm=AUTO, timeout=None):
+        """Initialize and match the lines."""
+
+        super().__init__(list(a), list(b), algorithm, timeout=timeout)
+        self.get_matching_blocks()
+
+    def replace(self, side, start, end, lines):
+        """
+        Replace lines `start` to `end` of side `0` (a) or `1` (b) and update the matches.
+
+        Returns the `(first, last)` indexes of the matching blocks that changed.
+        Blocks before `first` are untouched, and blocks from `last` on are only
+        moved by the number of lines that were added or removed on the side.
+        """
+
+        seq = self.b if side else self.a
+        seq[start:end] = lines
+        delta = len(lines) - (end - start)
+
+        blocks = self.matching_blocks
+        count = len(blocks) - 1
+        lo = _find_block(blocks, count, side, start, True)
+        hi = _find_block(blocks, count, side, end, False)
+
+        # Keep the parts of the blocks that overlap the edit that are outside of it.
+        head = []
+        tail = []
+        if lo < hi:
+            block = blocks[lo]
+            if block[side] < start:
+                head.append((block[0], block[1], start - block[side]))
+            block = blocks[hi - 1]
+            if block[side] + block[2] > end:
+                cut = end - block[side]
+                tail.append((block[0] + cut, block[1] + cut, block[2] - cut))
+        after = tail + (blocks[hi:count] if delta else blocks[hi:hi + 1])
+        if delta:
+            if side:
+                after = [(i, j + delta, k) for i, j, k in after]
+            else:
+                after = [(i + delta, j, k) for i, j, k in after]
+            tail = after[:len(tail)]
+
+        # Re-match the lines between the blocks that surround the edit.
+        before = head[-1] if head else (blocks[lo - 1] if lo else None)
+        alo, blo = (before[0] + before[2], before[1] + before[2]) if before else (0, 0)
+        ahi, bhi = (after[0][0], after[0][1]) if after else (len(self.a), len(self.b))
+        middle = []
+        if alo < ahi and blo < bhi:
+            matcher = LineMatcher(self.a[alo:ahi], self.b[blo:bhi], self.algorithm, timeout=self.timeout)
+            middle = [(alo + i, blo + j, k) for i, j, k in matcher.get_matching_blocks() if k]
+            self.approximate = self.approximate or matcher.approximate
+
+        changed = head + middle + tail
+        if delta:
+            blocks[lo:] = changed + after[len(tail):] + [(len(self.a), len(self.b), 0)]
+        else:
+            blocks[lo:hi] = changed
+
+        # Merge the blocks that became adjacent.
+        first, last = lo, lo + len(changed)
+        i = max(first - 1, 0)
+        while i < last and i + 1 < len(blocks) - 1:
+            x, y = blocks[i], blocks[i + 1]
+            if x[0] + x[2] == y[0] and x[1] + x[2] == y[1]:
+                blocks[i:i + 2] = [(x[0], x[1], x[2] + y[2])]
+                first = min(first, i)
+                last = max(last - 1, i + 1)
+            else:
+                i += 1
+
+        self.opcodes = None
+        return first, last
+
+
+def _format_range_unified(start, stop):
+    """Convert range to the "ed" format."""
+
+    beginning = start + 1
+    length = stop - start
+    if length == 1:
+        return '%d' % beginning
+    if not length:
+        beginning -= 1
+    return '%d,%d' % (beginning, length)
+
+
+def unified_header(fromfile='', tofile='', fromfiledate='', tofiledate='', lineterm='\n'):
+    """Get the file header lines of a unified diff."""
+
+    fromdate = '\t%s' % fromfiledate if fromfiledate else ''
+    todate = '\t%s' % tofiledate if tofiledate else ''
+    return [
+        '--- %s%s%s' % (fromfile, fromdate, lineterm),
+        '+++ %s%s%s' % (tofile, todate, lineterm)
+    ]
+
+
+def unified_hunk_header(a1, a2, b1, b2, lineterm='\n'):
+    """Get the header line of a hunk of lines `a1` to `a2` of a and `b1` to `b2` of b."""
+
+    return '@@ -%s +%s @@%s' % (_format_range_unified(a1, a2), _format_range_unified(b1, b2), lineterm)
+
+
+def unified_hunk(a, b, group, lineterm='\n'):
+    """Generate the lines of the hunk of a group of opcodes (see `group_opcodes`)."""
+
+    first, last = group[0], group[-1]
+    yield unified_hunk_header(first[1], last[2], first[3], last[4], lineterm)
+
+    for tag, i1, i2, j1, j2 in group:
+        if tag == 'equal':
+            for line in a[i1:i2]:
+                yield ' ' + line
+            continue
+        if tag in ('replace', 'delete'):
+            for line in a[i1:i2]:
+                yield '-' + line
+        if tag in ('replace', 'insert'):
+            for line in b[j1:j2]:
+                yield '+' + line
+
+
+def unified_diff(
+    a, b, fromfile='', tofile='', fromfiledate='', tofiledate='',
+    n=3, lineterm='\n', algorithm=AUTO, matcher=None, check=None
+):
+    """
+    Compare two sequences of lines and generate the delta as a unified diff.
+
+    Output is formatted identically to `difflib.unified_diff`.
+    An existing `LineMatcher` for `a` and `b` can be passed in as `matcher`.
+    """
+
+    if matcher is None:
+        matcher = LineMatcher(a, b, algorithm, check)
+
+    started = False
+    for group in matcher.get_grouped_opcodes(n):
+        if check is not None:
+            check()
+        if not started:
+            started = True
+            for line in unified_header(fromfile, tofile, fromfiledate, tofiledate, lineterm):
+                yield line
+
+        for line in unified_hunk(a, b, group, lineterm):
+            yield line
@@ -0,0 +1,141 @@
+"""
+Folders.
+
+Compare the files of two folders.
+
+Copyright (c) 2013 - 2015 Isaac Muse <isaacmuse@gmail.com>
+License: MIT
+"""
+import os
+from os.path import join
+from fnmatch import fnmatch
+import concurrent.futures
+
+ADDED = "+"
+REMOVED = "-"
+MODIFIED = "!"
+ERROR = "?"
+
+# Block size used when comparing the content of files
+COMPARE_BLOCK_SIZE = 1024 * 1024
+
+# Content comparisons queued per worker at a time (bounds memory and keeps cancelling quick)
+QUEUE_PER_WORKER = 4
+
+
+def _entries(path):
+    """Get `(name, is_dir, stat)` for the entries of a folder (symlinks are not followed)."""
+
+    scandir = getattr(os, "scandir", None)
+    if scandir is not None:
+        for entry in scandir(path):
+            try:
+                is_dir = entry.is_dir(follow_symlinks=False)
+                yield entry.name, is_dir, None if is_dir else entry.stat()
+            except OSError:
+                yield entry.name, False, None
+    else:
+        for name in os.listdir(path):
+            full = join(path, name)
+            try:
+                st = os.lstat(full)
+            except OSError:
+                yield name, False, None
+                continue
+            is_dir = os.path.isdir(full) and not os.path.islink(full)
+            yield name, is_dir, None if is_dir else st
+
+
+def scan(root, exclude=(), check=None):
+    """
+    Map the relative paths of the files under a folder to their `(size, mtime)`.
+
+    Entries matching any of the `exclude` patterns by name are skipped, and
+    files that cannot be read are mapped to `None`.
+    """
+
+    files = {}
+    stack = [""]
+    while stack:
+        if check is not None:
+            check()
+        rel = stack.pop()
+        try:
+            entries = list(_entries(join(root, rel) if rel else root))
+        except OSError:
+            continue
+        for name, is_dir, st in entries:
+            if any(fnmatch(name, pattern) for pattern in exclude):
+                continue
+            path = join(rel, name) if rel else name
+            if is_dir:
+                stack.append(path)
+            else:
+                files[path] = (st.st_size, st.st_mtime) if st is not None else None
+    return files
+
+
+def same_content(file1, file2):
+    """Compare the content of two files of the same size block by block."""
+
+    with open(file1, "rb") as f1, open(file2, "rb") as f2:
+        while True:
+            block = f1.read(COMPARE_BLOCK_SIZE)
+            if block != f2.read(COMPARE_BLOCK_SIZE):
+                return False
+            if not block:
+                return True
+
+
+def compare_folders(left, right, executor, workers, exclude=(), check=None):
+    """
+    Generate `(status, path)` for the files that differ between two folders.
+
+    Both folders are scanned concurrently.  Files with the same size and
+    modification time are assumed to be the same; files with the same size
+    but another modification time have their content compared on the
+    executor.  Removed and added files are generated first, then the
+    modified files as they are found.
+    """
+
+    scans = [executor.submit(scan, folder, exclude, check) for folder in (left, right)]
+    files1, files2 = [future.result() for future in scans]
+
+    for path in sorted(set(files1) - set(files2)):
+        yield REMOVED, path
+    for path in sorted(set(files2) - set(files1)):
+        yield ADDED, path
+
+    suspects = []
+    for path in sorted(set(files1) & set(files2)):
+        stat1, stat2 = files1[path], files2[path]
+        if stat1 is None or stat2 is None:
+            yield ERROR, path
+        elif stat1[0] != stat2[0]:
+            yield MODIFIED, path
+        elif stat1[1] != stat2[1]:
+            suspects.append(path)
+
+    pending = {}
+    limit = max(workers, 1) * QUEUE_PER_WORKER
+    suspects.reverse()
+    try:
+        while suspects or pending:
+            while suspects and len(pending) < limit:
+                path = suspects.pop()
+                pending[executor.submit(same_content, join(left, path), join(right, path))] = path
+            done = concurrent.futures.wait(
+                pending, timeout=0.1, return_when=concurrent.futures.FIRST_COMPLETED
+            )[0]
+            if check is not None:
+                check()
+            for future in done:
+                path = pending.pop(future)
+                try:
+                    if not future.result():
+                        yield MODIFIED, path
+                except OSError:
+                    yield ERROR, path
+    finally:
+        for future in pending:
+            future.cancel()
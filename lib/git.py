@@ -5,11 +5,14 @@ Copyright (c) 2013 - 2015 Isaac Muse <isaacmuse@gmail.com>
 License: MIT
 """
 # import xml.etree.ElementTree as ET
-from os import environ
 import re
 import subprocess
 import sys
-from os.path import exists, isfile, dirname, join
+import threading
+import time
+from os.path import exists, join
+from . import runner
+from . import vcroot
 
 if sys.platform.startswith('win'):
     _PLATFORM = "windows"
@@ -20,37 +23,25 @@ else:
 
 _git_path = "git.exe" if _PLATFORM == "windows" else "git"
 
-# UNSTAGED_DIFF = 0
-# STAGED_DIFF = 1
-# ALL_DIFF = 2
-
+# Seconds a `git cat-file --batch` process can stay idle before it is stopped
+CAT_FILE_IDLE_TIMEOUT = 60
 
-def is_system_root(target):
-    """Check if target is the root folder."""
+# Seconds a `git cat-file --batch` process has to answer a request before it is killed
+CAT_FILE_TIMEOUT = 30
 
-    root = False
-    windows = _PLATFORM == "windows"
-    if windows and re.match(r"^[A-Za-z]{1}:\\$", target) is not None:
-        root = True
-    elif not windows and target == '/':
-        root = True
+# Running `git cat-file --batch` processes by Git tree
+_cat_files = {}
+_cat_files_lock = threading.Lock()
 
-    return root
+# UNSTAGED_DIFF = 0
+# STAGED_DIFF = 1
+# ALL_DIFF = 2
 
 
 def get_git_tree(target):
-    """Recursively get Git tree."""
+    """Get the Git tree that contains the target (or `None`)."""
 
-    root = is_system_root(target)
-    is_file = isfile(target)
-    folder = dirname(target) if is_file else target
-    if exists(join(folder, ".git")):
-        return folder
-    else:
-        if root:
-            return None
-        else:
-            return get_git_tree(dirname(folder))
+    return vcroot.get_root(target, vcroot.GIT)
 
 
 def get_git_dir(tree):
@@ -59,47 +50,165 @@ def get_git_dir(tree):
     return join(tree, ".git")
 
 
-def gitopen(args, git_tree=None):
+def gitopen(args, git_tree=None, timeout=None):
     """Call Git with arguments."""
 
-    returncode = None
-    output = None
-
     if git_tree is not None:
         cmd = [_git_path, "--work-tree=%s" % git_tree, "--git-dir=%s" % get_git_dir(git_tree)] + args
     else:
         cmd = [_git_path] + args
 
-    env = environ.copy()
-    env['LC_ALL'] = 'en_US'
+    return runner.run(cmd, timeout=timeout)
 
-    if _PLATFORM == "windows":
-        startupinfo = subprocess.STARTUPINFO()
-        startupinfo.dwFlags |= subprocess.STARTF_USESHOWWINDOW
-        process = subprocess.Popen(
-            cmd,
-            startupinfo=startupinfo,
-            stdout=subprocess.PIPE,
-            stderr=subprocess.STDOUT,
-            stdin=subprocess.PIPE,
-            shell=False,
-            env=env
-        )
-    else:
-        process = subprocess.Popen(
+
+class CatFile(object):
+    """
+    Long-lived `git cat-file --batch` process of a Git tree.
+
+    Objects are requested over the process' stdin, so reading a file at a revision
+    costs a pipe round trip instead of starting Git.  The process is restarted if it
+    dies and stopped once it has been idle for `CAT_FILE_IDLE_TIMEOUT` seconds.
+    """
+
+    def __init__(self, git_tree):
+        """Initialize."""
+
+        self.git_tree = git_tree
+        self.process = None
+        self.last_used = 0
+        self.timer = None
+        self.timed_out = None
+        self.lock = threading.Lock()
+
+    def start(self):
+        """Start the process and the idle check."""
+
+        cmd = [
+            _git_path, "--work-tree=%s" % self.git_tree, "--git-dir=%s" % get_git_dir(self.git_tree),
+            "cat-file", "--batch"
+        ]
+        # Not run through the runner: the process stays up and does not count towards its limit.
+        self.process = subprocess.Popen(
             cmd,
+            startupinfo=runner.get_startupinfo(),
             stdout=subprocess.PIPE,
-            stderr=subprocess.STDOUT,
+            stderr=subprocess.DEVNULL,
             stdin=subprocess.PIPE,
             shell=False,
-            env=env
+            env=runner.get_env()
         )
-    output = process.communicate()
-    returncode = process.returncode
-
-    assert returncode == 0, "Runtime Error: %s" % output[0].rstrip()
-
-    return output[0]
+        self.schedule(CAT_FILE_IDLE_TIMEOUT)
+
+    def schedule(self, delay):
+        """Check for idleness after a delay."""
+
+        if self.timer is not None:
+            self.timer.cancel()
+        self.timer = threading.Timer(delay, self.check_idle)
+        self.timer.daemon = True
+        self.timer.start()
+
+    def check_idle(self):
+        """Stop the process if it has been idle long enough, or check again later."""
+
+        with self.lock:
+            if self.process is None:
+                return
+            idle = time.time() - self.last_used
+            if idle < CAT_FILE_IDLE_TIMEOUT:
+                self.schedule(CAT_FILE_IDLE_TIMEOUT - idle)
+                return
+            self.stop()
+
+    def stop(self):
+        """Stop the process (the lock must be held)."""
+
+        process, self.process = self.process, None
+        if process is not None:
+            try:
+                process.stdin.close()
+                process.wait(1)
+            except Exception:
+                process.kill()
+            process.stdout.close()
+
+    def request(self, spec):
+        """Send a request and read the object (the lock must be held)."""
+
+        process = self.process
+        process.stdin.write(spec.encode('utf-8') + b'\n')
+        process.stdin.flush()
+        header = process.stdout.readline()
+        if not header:
+            raise IOError("git cat-file exited")
+        if header.endswith(b" missing\n") or header.endswith(b" ambiguous\n"):
+            return None
+        size = int(header.split()[2])
+        data = process.stdout.read(size)
+        if len(data) != size or process.stdout.read(1) != b'\n':
+            raise IOError("git cat-file output was cut short")
+        return data
+
+    def expire(self, process):
+        """Kill a process that did not answer in time, which ends the read that waits for it."""
+
+        self.timed_out = process
+        process.kill()
+
+    def read(self, spec):
+        """
+        Get the content of an object such as `rev:path` (or `None` if it does not exist).
+
+        A request that is not answered within `CAT_FILE_TIMEOUT` seconds (Git may wait
+        on a lock or a filter) kills the process and raises `runner.CommandTimeoutError`.
+        """
+
+        with self.lock:
+            self.last_used = time.time()
+            for attempt in range(2):
+                if self.process is None or self.process.poll() is not None:
+                    self.stop()
+                    self.start()
+                process = self.process
+                deadline = threading.Timer(CAT_FILE_TIMEOUT, self.expire, (process,))
+                deadline.daemon = True
+                deadline.start()
+                try:
+                    return self.request(spec)
+                except (IOError, OSError, ValueError, IndexError):
+                    # Start over with a new process once; the old one is in an unknown state.
+                    self.stop()
+                    if self.timed_out is process:
+                        # The same request would only hang again.
+                        raise runner.CommandTimeoutError(
+                            "Timed out after %s seconds: git cat-file %s" % (CAT_FILE_TIMEOUT, spec),
+                            process.args
+                        )
+                    if attempt:
+                        raise
+                finally:
+                    deadline.cancel()
+
+
+def cat_file(git_tree, spec):
+    """Get the content of an object (`rev:path`) through the Git tree's `git cat-file --batch` process."""
+
+    with _cat_files_lock:
+        catfile = _cat_files.get(git_tree)
+        if catfile is None:
+            catfile = _cat_files[git_tree] = CatFile(git_tree)
+    return catfile.read(spec)
+
+
+def stop_cat_files():
+    """Stop all `git cat-file --batch` processes."""
+
+    with _cat_files_lock:
+        catfiles = list(_cat_files.values())
+        _cat_files.clear()
+    for catfile in catfiles:
+        with catfile.lock:
+            catfile.stop()
 
 
 def show(target, rev):
@@ -113,7 +222,16 @@ def show(target, rev):
     if _PLATFORM == "windows":
         target = target.replace("\\", "/")
     if git_tree is not None:
-        bfr = gitopen(["show", "%s:%s" % (rev, target)], git_tree)
+        if "\n" in target:
+            # Requests are one per line, so such paths can only be shown the slow way.
+            bfr = gitopen(["show", "%s:%s" % (rev, target)], git_tree)
+        else:
+            bfr = cat_file(git_tree, "%s:%s" % (rev, target))
+            if bfr is None:
+                raise runner.CommandFailedError(
+                    "Runtime Error: %s does not exist in %s" % (target, rev),
+                    [_git_path, "cat-file", "--batch"]
+                )
     return bfr
 
 
@@ -185,7 +303,7 @@ def is_versioned(target):
 
     versioned = False
     if git_tree is not None:
-        output = gitopen(["status", "--ignored", "--porcelain", target], git_tree)
+        output = gitopen(["status", "--ignored", "--porcelain", target], git_tree, runner.QUERY)
         if not (output.startswith(b"!!") or output.startswith(b"??")):
             versioned = True
 
@@ -196,7 +314,7 @@ def version():
     """Get Git app version."""
 
     version = None
-    output = gitopen(['--version'])
+    output = gitopen(['--version'], timeout=runner.QUERY)
     m = re.search(br" version ([\d\.A-Za-z]+)", output)
     if m is not None:
         version = m.group(1).decode('utf-8')
@@ -207,4 +325,12 @@ def set_git_path(pth):
     """Set Git path."""
 
     global _git_path
+    if pth != _git_path:
+        stop_cat_files()
     _git_path = pth
+
+
+def get_git_path():
+    """Get Git path."""
+
+    return _git_path
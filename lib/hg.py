@@ -5,11 +5,11 @@ Copyright (c) 2013 - 2015 Isaac Muse <isaacmuse@gmail.com>
 License: MIT
 """
 import xml.etree.ElementTree as ET
-from os import environ
 import re
-import subprocess
 import sys
 from os.path import exists, dirname
+from . import runner
+from . import vcroot
 
 if sys.platform.startswith('win'):
     _PLATFORM = "windows"
@@ -21,46 +21,10 @@ else:
 _hg_path = "hg.exe" if _PLATFORM == "windows" else "hg"
 
 
-def hgopen(args, cwd=None):
-    """Call Git with arguments."""
+def hgopen(args, cwd=None, timeout=None):
+    """Call hg with arguments."""
 
-    returncode = None
-    output = None
-
-    cmd = [_hg_path] + args
-
-    env = environ.copy()
-    env['LC_ALL'] = 'en_US'
-
-    if _PLATFORM == "windows":
-        startupinfo = subprocess.STARTUPINFO()
-        startupinfo.dwFlags |= subprocess.STARTF_USESHOWWINDOW
-        process = subprocess.Popen(
-            cmd,
-            startupinfo=startupinfo,
-            stdout=subprocess.PIPE,
-            stderr=subprocess.STDOUT,
-            stdin=subprocess.PIPE,
-            cwd=cwd,
-            shell=False,
-            env=env
-        )
-    else:
-        process = subprocess.Popen(
-            cmd,
-            stdout=subprocess.PIPE,
-            stderr=subprocess.STDOUT,
-            stdin=subprocess.PIPE,
-            cwd=cwd,
-            shell=False,
-            env=env
-        )
-    output = process.communicate()
-    returncode = process.returncode
-
-    assert returncode == 0, "Runtime Error: %s\n%s" % (output[0].rstrip(), str(cmd))
-
-    return output[0]
+    return runner.run([_hg_path] + args, cwd, timeout)
 
 
 def cat(target, rev=None):
@@ -108,7 +72,7 @@ def diff(target, last=False):
     return hgopen(args + [target], dirname(target)) if args is not None else b""
 
 
-def log(target=None, limit=0):
+def log(target=None, limit=0, timeout=None):
     """Get hg log."""
 
     assert exists(target), "%s does not exist!" % target
@@ -119,7 +83,7 @@ def log(target=None, limit=0):
         args.append(str(limit))
     if target is not None:
         args.append(target)
-    output = hgopen(args, dirname(target))
+    output = hgopen(args, dirname(target), timeout)
 
     if output != "":
         results = ET.fromstring(output)
@@ -134,8 +98,10 @@ def is_versioned(target):
 
     assert exists(target), "%s does not exist!" % target
     versioned = False
+    if vcroot.get_root(target, vcroot.HG) is None:
+        return versioned
     try:
-        results = log(target, 1)
+        results = log(target, 1, runner.QUERY)
         if results is not None:
             if results.find("logentry") is not None:
                 versioned = True
@@ -149,7 +115,7 @@ def version():
     """Get hg app version."""
 
     version = None
-    output = hgopen(['--version'])
+    output = hgopen(['--version'], timeout=runner.QUERY)
     m = re.search(br"\bversion ([\d\.A-Za-z]+)", output)
     if m is not None:
         version = m.group(1).decode('utf-8')
@@ -161,3 +127,9 @@ def set_hg_path(pth):
 
     global _hg_path
     _hg_path = pth
+
+
+def get_hg_path():
+    """Get hg path."""
+
+    return _hg_path
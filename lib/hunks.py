@@ -0,0 +1,145 @@
+"""
+Hunks.
+
+Index of the hunks of a unified diff for navigation.
+
+Copyright (c) 2013 - 2015 Isaac Muse <isaacmuse@gmail.com>
+License: MIT
+"""
+from array import array
+from bisect import bisect_left, bisect_right
+import re
+
+RE_HUNK = re.compile(r'^@@ -(\d+)(?:,(\d+))? \+(\d+)(?:,(\d+))? @@')
+
+HEADER = ord('@')
+CONTEXT = ord(' ')
+REMOVED = ord('-')
+ADDED = ord('+')
+
+
+class HunkIndex(object):
+    """
+    Compact index of the hunks of a unified diff, built as the diff lines go by.
+
+    Rows are the zero based line numbers of the diff text.  Each hunk is split into
+    runs of context, removed, and added lines that remember the source line numbers
+    they start at, so mapping a row to its source lines is a binary search.
+    """
+
+    def __init__(self):
+        """Initialize."""
+
+        self.hunks = array('L')
+        self.runs = array('L')
+        self.sizes = array('L')
+        self.kinds = array('B')
+        self.left = array('L')
+        self.right = array('L')
+        self.row = 0
+        self.old = 0
+        self.new = 0
+        self.line_left = 0
+        self.line_right = 0
+
+    def __len__(self):
+        """Get the number of hunks."""
+
+        return len(self.hunks)
+
+    def scan(self, result):
+        """Index diff text or pass through an iterable of diff lines while indexing them."""
+
+        if isinstance(result, str):
+            for line in result.split('\n'):
+                self.feed(line)
+            return result
+        return self._scan(result)
+
+    def _scan(self, lines):
+        """Index lines as they are passed through."""
+
+        for line in lines:
+            self.feed(line)
+            yield line
+
+    def _run(self, kind, left, right):
+        """Extend the current run with a line of the kind, or start a new run."""
+
+        if self.kinds and self.kinds[-1] == kind and self.runs[-1] + self.sizes[-1] == self.row:
+            self.sizes[-1] += 1
+        else:
+            self.runs.append(self.row)
+            self.sizes.append(1)
+            self.kinds.append(kind)
+            self.left.append(left)
+            self.right.append(right)
+
+    def feed(self, line):
+        """Index the next line of the diff."""
+
+        if self.old > 0 or self.new > 0:
+            c = line[:1]
+            if c == '-':
+                self._run(REMOVED, self.line_left, self.line_right)
+                self.line_left += 1
+                self.old -= 1
+            elif c == '+':
+                self._run(ADDED, self.line_left, self.line_right)
+                self.line_right += 1
+                self.new -= 1
+            elif c != '\\':
+                self._run(CONTEXT, self.line_left, self.line_right)
+                self.line_left += 1
+                self.line_right += 1
+                self.old -= 1
+                self.new -= 1
+        else:
+            m = RE_HUNK.match(line)
+            if m:
+                self.line_left = int(m.group(1))
+                self.line_right = int(m.group(3))
+                self.old = int(m.group(2)) if m.group(2) is not None else 1
+                self.new = int(m.group(4)) if m.group(4) is not None else 1
+                # Empty sides are numbered from the line before them.
+                if not self.old:
+                    self.line_left += 1
+                if not self.new:
+                    self.line_right += 1
+                self.hunks.append(self.row)
+                self._run(HEADER, self.line_left, self.line_right)
+        self.row += 1
+
+    def hunk_at(self, row):
+        """Get the row of the header of the hunk that contains the row (or `None`)."""
+
+        index = bisect_right(self.hunks, row) - 1
+        return self.hunks[index] if index >= 0 else None
+
+    def next_hunk(self, row):
+        """Get the row of the first hunk after the row (or `None`)."""
+
+        index = bisect_right(self.hunks, row)
+        return self.hunks[index] if index < len(self.hunks) else None
+
+    def previous_hunk(self, row):
+        """Get the row of the last hunk before the row (or `None`)."""
+
+        index = bisect_left(self.hunks, row) - 1
+        return self.hunks[index] if index >= 0 else None
+
+    def source(self, row):
+        """
+        Get the one based `(left, right)` source line numbers of a row (or `None`).
+
+        A line that only exists on one side gets the line it would be at on the other.
+        """
+
+        index = bisect_right(self.runs, row) - 1
+        if index < 0 or row >= self.runs[index] + self.sizes[index]:
+            return None
+        offset = row - self.runs[index]
+        kind = self.kinds[index]
+        left = self.left[index] + (offset if kind in (CONTEXT, REMOVED) else 0)
+        right = self.right[index] + (offset if kind in (CONTEXT, ADDED) else 0)
+        return left, right
@@ -0,0 +1,141 @@
+"""
+Live.
+
+Keep the text of a unified diff current while its sides are edited.
+
+Copyright (c) 2013 - 2015 Isaac Muse <isaacmuse@gmail.com>
+License: MIT
+"""
+from . import differ
+
+LEFT = 0
+RIGHT = 1
+
+# Lines of context around changes
+CONTEXT = 3
+
+
+def find_hunk(hunks, side, pos):
+    """Get the index of the first hunk that starts at or after a line of a side."""
+
+    lo, hi = 0, len(hunks)
+    while lo < hi:
+        mid = (lo + hi) // 2
+        if hunks[mid][side * 2] >= pos:
+            hi = mid
+        else:
+            lo = mid + 1
+    return lo
+
+
+class LiveHunks(object):
+    """
+    Unified diff of a `differ.IncrementalMatcher` that is updated by replacements.
+
+    Edits are applied to the matcher, and the changes to the diff text are
+    returned as `(begin, end, text)` replacements of ranges of the old text
+    (in order, so they are applied from the last one).
+    """
+
+    def __init__(self, matcher, names):
+        """Initialize."""
+
+        self.matcher = matcher
+        self.names = names
+        # Rendered hunks: [a start, a end, b start, b end, header length, length]
+        self.hunks = []
+
+    def format_hunks(self, groups):
+        """Get the hunk records and the text of groups of opcodes."""
+
+        a, b = self.matcher.a, self.matcher.b
+        hunks = []
+        text = []
+        for group in groups:
+            lines = list(differ.unified_hunk(a, b, group, lineterm=''))
+            length = sum(len(line) + 1 for line in lines)
+            first, last = group[0], group[-1]
+            hunks.append([first[1], last[2], first[3], last[4], len(lines[0]) + 1, length])
+            text.extend(lines)
+        return hunks, "".join(line + "\n" for line in text)
+
+    def file_header(self):
+        """Get the file header of the diff."""
+
+        return "".join(line + "\n" for line in differ.unified_header(self.names[LEFT], self.names[RIGHT], lineterm=''))
+
+    def render_all(self):
+        """Get the replacement that writes the whole diff."""
+
+        self.hunks, text = self.format_hunks(self.matcher.get_grouped_opcodes(CONTEXT))
+        return [(0, 0, self.file_header() + text if self.hunks else "")]
+
+    def replace(self, side, start, end, lines):
+        """Replace lines `start` to `end` of a side and get the replacements of the diff text."""
+
+        delta = len(lines) - (end - start)
+        return self.render(side, delta, *self.matcher.replace(side, start, end, lines))
+
+    def render(self, side, delta, first, last):
+        """
+        Get the replacements that rewrite the hunks an edit changed.
+
+        `first` and `last` are the indexes of the matching blocks that the edit
+        changed (see `differ.IncrementalMatcher.replace`), and `delta` is the
+        number of lines it added to the side.  Hunks are split at unchanged runs
+        of more than two contexts, so only the hunks between the nearest such runs
+        around the changed blocks are formatted again; the hunks after them only
+        get their headers moved.  Returns an empty list if the text is unchanged.
+        """
+
+        blocks = self.matcher.matching_blocks
+        count = len(blocks) - 1
+        gap = CONTEXT * 2
+        # Find the unchanged runs that bound the hunks the edit can affect.
+        left = first - 1
+        while left >= 0 and blocks[left][2] <= gap:
+            left -= 1
+        right = last
+        while right < count and blocks[right][2] <= gap:
+            right += 1
+        if left >= 0:
+            codes = differ.blocks_opcodes(blocks[left:right + 1], blocks[left][0], blocks[left][1])
+        else:
+            codes = differ.blocks_opcodes(blocks[:right + 1])
+        hunks, text = self.format_hunks(differ.group_opcodes(codes, CONTEXT))
+
+        # Positions on the other side did not move, so they locate the old hunks of the same range:
+        # hunks before it start at or before the first unchanged run (a hunk at the start of the file
+        # with nothing on the other side starts right at it), and hunks after it start with its last lines.
+        other = 1 - side
+        lo = find_hunk(self.hunks, other, blocks[left][other] + 1 if left >= 0 else 0)
+        if right < count:
+            hi = find_hunk(self.hunks, other, blocks[right][other] + blocks[right][2] - CONTEXT)
+        else:
+            hi = len(self.hunks)
+
+        old = self.hunks
+        header = len(self.file_header()) if old else 0
+        begin = header + sum(hunk[5] for hunk in old[:lo])
+        end = begin + sum(hunk[5] for hunk in old[lo:hi])
+        following = old[hi:]
+        self.hunks = old[:lo] + hunks + following
+        if bool(old) != bool(self.hunks):
+            # The file header comes and goes with the hunks (and then there are no others).
+            replacements = [(0, end, self.file_header() + text if self.hunks else "")]
+        else:
+            replacements = [(begin, end, text)]
+            if delta:
+                # Lines were added or removed: move the headers of the following hunks.
+                pos = end
+                for hunk in following:
+                    hunk[side * 2] += delta
+                    hunk[side * 2 + 1] += delta
+                    line = differ.unified_hunk_header(hunk[0], hunk[1], hunk[2], hunk[3], lineterm='') + "\n"
+                    replacements.append((pos, pos + hunk[4], line))
+                    pos += hunk[5]
+                    hunk[5] += len(line) - hunk[4]
+                    hunk[4] = len(line)
+        if len(replacements) > 1 or replacements[0][0] != replacements[0][1] or replacements[0][2]:
+            return replacements
+        return []
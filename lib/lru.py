@@ -0,0 +1,69 @@
+"""
+LRU.
+
+Size bounded least recently used cache.
+
+Copyright (c) 2013 - 2015 Isaac Muse <isaacmuse@gmail.com>
+License: MIT
+"""
+from collections import OrderedDict
+import threading
+
+
+class LRUCache(object):
+    """
+    Thread safe LRU cache bounded by the total size of its entries.
+
+    The size of each entry is given by the caller when it is stored.
+    """
+
+    def __init__(self, max_size):
+        """Initialize."""
+
+        self.max_size = max_size
+        self.size = 0
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key, default=None):
+        """Get an entry and mark it as recently used."""
+
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return default
+            self.entries.move_to_end(key)
+            return entry[0]
+
+    def put(self, key, value, size):
+        """Store an entry, evicting the least recently used entries to stay under the size limit."""
+
+        with self.lock:
+            old = self.entries.pop(key, None)
+            if old is not None:
+                self.size -= old[1]
+            if size > self.max_size:
+                return
+            self.entries[key] = (value, size)
+            self.size += size
+            self._evict()
+
+    def set_max_size(self, max_size):
+        """Change the size limit."""
+
+        with self.lock:
+            self.max_size = max_size
+            self._evict()
+
+    def clear(self):
+        """Remove all entries."""
+
+        with self.lock:
+            self.entries.clear()
+            self.size = 0
+
+    def _evict(self):
+        """Evict entries until under the size limit."""
+
+        while self.size > self.max_size and self.entries:
+            self.size -= self.entries.popitem(last=False)[1][1]
@@ -0,0 +1,127 @@
+"""
+Mapped.
+
+Read the lines of large files through a memory map.
+
+Copyright (c) 2013 - 2015 Isaac Muse <isaacmuse@gmail.com>
+License: MIT
+"""
+from array import array
+import codecs
+import mmap
+import os
+
+UTF8_BOM = b'\xef\xbb\xbf'
+
+# How many lines to index between calls to the check callback
+CHECK_INTERVAL = 65536
+
+
+def is_supported_encoding(encoding):
+    """Check if lines of the encoding can be found by searching for newline bytes."""
+
+    try:
+        name = codecs.lookup(encoding).name
+    except LookupError:
+        return False
+    return not (name.startswith('utf-16') or name.startswith('utf-32'))
+
+
+class MappedLines(object):
+    """
+    Sequence of the lines of a file that is memory mapped.
+
+    Only a line offset index and a hash per line are kept in memory, and lines
+    are decoded from the map when they are accessed.  Lines are split like
+    `differ.split_lines` splits text, at newline bytes (the supported encodings
+    encode line feeds and carriage returns as single bytes).
+
+    With `hash_bytes`, lines are hashed as they are stored, so indexing does not
+    decode them; the hashes can then only be compared with those of another
+    `MappedLines` of the same encoding that hashes bytes.  Otherwise every line
+    is decoded once to hash its text (normalized by `key` if given).
+    """
+
+    hashed = True
+
+    def __init__(self, path, encoding, key=None, hash_bytes=False):
+        """Initialize."""
+
+        self.encoding = encoding
+        self.key = key if not hash_bytes else None
+        self.hash_bytes = hash_bytes
+        self.file = open(path, 'rb')
+        self.size = os.fstat(self.file.fileno()).st_size
+        self.map = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ) if self.size else b''
+        self.offsets = None
+        self.ids = None
+
+    def index(self, check=None):
+        """Build the line offset index and the line hashes."""
+
+        if self.offsets is not None:
+            return
+
+        data = self.map
+        end = self.size
+        find = data.find
+        decode = self.encoding
+        key = self.key
+        hash_bytes = self.hash_bytes
+        offsets = array('I' if end < 0xFFFFFFFF else 'Q')
+        hashes = array('q')
+        start = len(UTF8_BOM) if data[:len(UTF8_BOM)] == UTF8_BOM else 0
+        count = 0
+        while start < end:
+            nl = find(b'\n', start)
+            if nl == -1:
+                nl = end
+            offsets.append(start)
+            line = data[start:nl]
+            if line[-1:] == b'\r':
+                line = line[:-1]
+            if not hash_bytes:
+                line = line.decode(decode, 'replace')
+                if key is not None:
+                    line = key(line)
+            hashes.append(hash(line))
+            start = nl + 1
+            count += 1
+            if check is not None and not count % CHECK_INTERVAL:
+                check()
+        offsets.append(start)
+        self.offsets = offsets
+        self.ids = hashes
+
+    def raw(self, index):
+        """Get the undecoded line."""
+
+        line = self.map[self.offsets[index]:self.offsets[index + 1] - 1]
+        return line[:-1] if line[-1:] == b'\r' else line
+
+    def __len__(self):
+        """Get the line count."""
+
+        return len(self.offsets) - 1
+
+    def __getitem__(self, index):
+        """Get a line or a list of lines for a slice."""
+
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        return self.raw(index).decode(self.encoding, 'replace')
+
+    def __iter__(self):
+        """Iterate the lines."""
+
+        for i in range(len(self)):
+            yield self[i]
+
+    def close(self):
+        """Release the map and the file."""
+
+        if isinstance(self.map, mmap.mmap):
+            self.map.close()
+        self.file.close()
@@ -0,0 +1,224 @@
+"""
+Merge.
+
+Three-way merge of two descendants of a common base.
+
+Copyright (c) 2013 - 2015 Isaac Muse <isaacmuse@gmail.com>
+License: MIT
+"""
+from array import array
+from bisect import bisect_left, bisect_right
+from . import differ
+
+MARKER_LEFT = "<<<<<<<"
+MARKER_BASE = "|||||||"
+MARKER_SEPARATOR = "======="
+MARKER_RIGHT = ">>>>>>>"
+
+UNCHANGED = "unchanged"
+LEFT = "left"
+RIGHT = "right"
+SAME = "same"
+CONFLICT = "conflict"
+
+
+def sync_regions(left_blocks, right_blocks):
+    """
+    Get the regions of the base that are matched on both sides.
+
+    Takes the matching blocks of base->left and base->right and returns a list of
+    `(base_start, base_end, left_start, left_end, right_start, right_end)` that
+    ends with the (empty) sentinel region at the end of all three sequences.
+    Both block lists are walked once, side by side.
+    """
+
+    regions = []
+    i = j = 0
+    while True:
+        base1, left1, size1 = left_blocks[i]
+        base2, right2, size2 = right_blocks[j]
+        if not size1 or not size2:
+            break
+        start = max(base1, base2)
+        end = min(base1 + size1, base2 + size2)
+        if start < end:
+            left_start = left1 + start - base1
+            right_start = right2 + start - base2
+            regions.append((start, end, left_start, left_start + end - start, right_start, right_start + end - start))
+        if base1 + size1 < base2 + size2:
+            i += 1
+        else:
+            j += 1
+    base_end, left_end = left_blocks[-1][:2]
+    right_end = right_blocks[-1][1]
+    regions.append((base_end, base_end, left_end, left_end, right_end, right_end))
+    return regions
+
+
+class Merge3(object):
+    """
+    Merge two descendants (`left` and `right`) of a common `base`.
+
+    The sequences should be interned by the same `differ.LineInterner`, so chunks
+    of the three sides are compared by their ids.  The interner must not have a
+    line key, as unchanged regions are taken from the base and an ignored change
+    on either side would be lost.  Base->left and base->right
+    are matched with `differ.LineMatcher` and the merge is computed from the
+    regions of the base that both sides kept.
+
+    `check`, `executor`, `workers`, and `timeout` are passed to the matchers.
+    """
+
+    def __init__(self, base, left, right, algorithm=differ.AUTO, check=None, executor=None, workers=0, timeout=None):
+        """Initialize."""
+
+        self.base = base
+        self.left = left
+        self.right = right
+        self.algorithm = algorithm
+        self.check = check
+        self.executor = executor
+        self.workers = workers
+        self.timeout = timeout
+        self.approximate = False
+        self.executor_error = None
+
+    def get_sync_regions(self):
+        """Match the base with both sides and get the regions they share."""
+
+        matchers = [
+            differ.LineMatcher(
+                self.base, other, self.algorithm, self.check, self.executor, self.workers, self.timeout
+            ) for other in (self.left, self.right)
+        ]
+        left_blocks = matchers[0].get_matching_blocks()
+        right_blocks = matchers[1].get_matching_blocks()
+        self.approximate = matchers[0].approximate or matchers[1].approximate
+        self.executor_error = matchers[0].executor_error or matchers[1].executor_error
+        return sync_regions(left_blocks, right_blocks)
+
+    def get_regions(self):
+        """
+        Generate the merge regions.
+
+        Yields `(UNCHANGED, base_start, base_end)`, `(LEFT, left_start, left_end)`,
+        `(RIGHT, right_start, right_end)`, `(SAME, left_start, left_end)` for
+        identical changes on both sides, and `(CONFLICT, base_start, base_end,
+        left_start, left_end, right_start, right_end)`.
+        """
+
+        base = getattr(self.base, "ids", self.base)
+        left = getattr(self.left, "ids", self.left)
+        right = getattr(self.right, "ids", self.right)
+        i = j = k = 0
+        for base_start, base_end, left_start, left_end, right_start, right_end in self.get_sync_regions():
+            if i < base_start or j < left_start or k < right_start:
+                changed_left = left[j:left_start] != base[i:base_start]
+                changed_right = right[k:right_start] != base[i:base_start]
+                if not changed_left:
+                    if changed_right:
+                        yield RIGHT, k, right_start
+                elif not changed_right:
+                    yield LEFT, j, left_start
+                elif left[j:left_start] == right[k:right_start]:
+                    yield SAME, j, left_start
+                else:
+                    yield CONFLICT, i, base_start, j, left_start, k, right_start
+            if base_start < base_end:
+                yield UNCHANGED, base_start, base_end
+            i, j, k = base_end, left_end, right_end
+
+    def merge_lines(self, names=("left", "base", "right"), conflicts=None):
+        """
+        Generate the lines of the merge, with conflicts between markers.
+
+        Conflicts show the left, base, and right lines.  If a `ConflictIndex`
+        is given, the rows of the conflicts are added to it as they go by.
+        """
+
+        row = 0
+        for region in self.get_regions():
+            kind = region[0]
+            if kind == UNCHANGED:
+                lines = self.base[region[1]:region[2]]
+            elif kind == RIGHT:
+                lines = self.right[region[1]:region[2]]
+            elif kind != CONFLICT:
+                lines = self.left[region[1]:region[2]]
+            else:
+                base_start, base_end, left_start, left_end, right_start, right_end = region[1:]
+                lines = ["%s %s" % (MARKER_LEFT, names[0])]
+                lines.extend(self.left[left_start:left_end])
+                lines.append("%s %s" % (MARKER_BASE, names[1]))
+                lines.extend(self.base[base_start:base_end])
+                lines.append(MARKER_SEPARATOR)
+                lines.extend(self.right[right_start:right_end])
+                lines.append("%s %s" % (MARKER_RIGHT, names[2]))
+                if conflicts is not None:
+                    conflicts.add(row, row + len(lines) - 1)
+            for line in lines:
+                yield line
+            row += len(lines)
+
+
+class ConflictIndex(object):
+    """Rows of the first and last marker line of every conflict of a merge."""
+
+    def __init__(self):
+        """Initialize."""
+
+        self.starts = array('L')
+        self.ends = array('L')
+
+    def __len__(self):
+        """Get the number of conflicts."""
+
+        return len(self.starts)
+
+    def add(self, start, end):
+        """Add a conflict (in order)."""
+
+        self.starts.append(start)
+        self.ends.append(end)
+
+    def conflict_at(self, row):
+        """Get the `(start, end)` rows of the conflict that contains the row (or `None`)."""
+
+        index = bisect_right(self.starts, row) - 1
+        if index < 0 or row > self.ends[index]:
+            return None
+        return self.starts[index], self.ends[index]
+
+    def next_conflict(self, row):
+        """Get the row of the first conflict after the row (or `None`)."""
+
+        index = bisect_right(self.starts, row)
+        return self.starts[index] if index < len(self.starts) else None
+
+    def previous_conflict(self, row):
+        """Get the row of the last conflict before the row (or `None`)."""
+
+        index = bisect_left(self.starts, row) - 1
+        return self.starts[index] if index >= 0 else None
+
+
+def split_conflict(lines):
+    """
+    Split the lines of a conflict (markers included) into its `(left, base, right)` lines.
+
+    Returns `None` if the lines are not a conflict.
+    """
+
+    if len(lines) < 2 or not lines[0].startswith(MARKER_LEFT) or not lines[-1].startswith(MARKER_RIGHT):
+        return None
+    sides = [[]]
+    for line in lines[1:-1]:
+        if line.startswith(MARKER_BASE) and len(sides) == 1:
+            sides.append([])
+        elif line == MARKER_SEPARATOR and len(sides) == 2:
+            sides.append([])
+        else:
+            sides[-1].append(line)
+    if len(sides) != 3:
+        return None
+    return tuple(sides)
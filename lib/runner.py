@@ -0,0 +1,194 @@
+"""
+Runner.
+
+Run the version control binaries with a shared environment, timeouts, a limit
+on how many run at once, and timing statistics.
+
+Copyright (c) 2013 - 2015 Isaac Muse <isaacmuse@gmail.com>
+License: MIT
+"""
+from os import environ
+from os.path import basename, splitext
+import subprocess
+import sys
+import threading
+import time
+
+# Seconds a probe or status query can run before it is killed (`None` for no limit)
+DEFAULT_QUERY_TIMEOUT = 60
+
+# Number of commands that can run at the same time
+DEFAULT_MAX_PROCESSES = 4
+
+# Timeout of commands that are probes or status queries: the configured query timeout
+QUERY = object()
+
+_query_timeout = DEFAULT_QUERY_TIMEOUT
+_semaphore = threading.BoundedSemaphore(DEFAULT_MAX_PROCESSES)
+_max_processes = DEFAULT_MAX_PROCESSES
+_env = None
+_startupinfo = None
+
+# Timing of the commands by `(binary, subcommand)`: [calls, failures, wait seconds, run seconds, slowest run]
+_stats = {}
+_stats_lock = threading.Lock()
+
+
+class CommandError(Exception):
+    """A version control command could not be run or did not succeed."""
+
+    def __init__(self, message, cmd, returncode=None, stdout=b"", stderr=b""):
+        """Initialize."""
+
+        Exception.__init__(self, message)
+        self.cmd = cmd
+        self.returncode = returncode
+        self.stdout = stdout
+        self.stderr = stderr
+
+
+class CommandNotFoundError(CommandError):
+    """The binary could not be started."""
+
+
+class CommandTimeoutError(CommandError):
+    """The command did not finish in time and was killed."""
+
+
+class CommandFailedError(CommandError):
+    """The command exited with an error."""
+
+
+def get_env():
+    """Get the environment of the commands (shared, so it must not be changed)."""
+
+    global _env
+
+    if _env is None:
+        env = environ.copy()
+        env['LC_ALL'] = 'en_US'
+        _env = env
+    return _env
+
+
+def get_startupinfo():
+    """Get the startup info that keeps a console window from showing on Windows (`None` elsewhere)."""
+
+    global _startupinfo
+
+    if _startupinfo is None and sys.platform.startswith('win'):
+        startupinfo = subprocess.STARTUPINFO()
+        startupinfo.dwFlags |= subprocess.STARTF_USESHOWWINDOW
+        _startupinfo = startupinfo
+    return _startupinfo
+
+
+def configure(query_timeout=DEFAULT_QUERY_TIMEOUT, max_processes=DEFAULT_MAX_PROCESSES):
+    """Set the timeout of probes and status queries (`None` for no limit) and how many commands can run at once."""
+
+    global _query_timeout
+    global _semaphore
+    global _max_processes
+
+    _query_timeout = query_timeout
+    max_processes = max(1, max_processes)
+    if max_processes != _max_processes:
+        # Running commands release the semaphore they took.
+        _semaphore = threading.BoundedSemaphore(max_processes)
+        _max_processes = max_processes
+
+
+def command_name(cmd):
+    """Get the `(binary, subcommand)` a command is recorded under."""
+
+    binary = splitext(basename(cmd[0]))[0]
+    subcommand = next((arg for arg in cmd[1:] if not arg.startswith("-")), "")
+    return binary, subcommand
+
+
+def record(cmd, wait, elapsed, failed):
+    """Record the timing of a command."""
+
+    name = command_name(cmd)
+    with _stats_lock:
+        stats = _stats.get(name)
+        if stats is None:
+            stats = _stats[name] = [0, 0, 0.0, 0.0, 0.0]
+        stats[0] += 1
+        stats[1] += int(failed)
+        stats[2] += wait
+        stats[3] += elapsed
+        stats[4] = max(stats[4], elapsed)
+
+
+def get_stats():
+    """
+    Get the timing of the commands that have been run.
+
+    Returns a list of `(binary, subcommand, calls, failures, wait, run, slowest)`,
+    with the most time spent first.  Times are in seconds; `wait` is the time
+    spent waiting for another command to finish.
+    """
+
+    with _stats_lock:
+        stats = [name + tuple(values) for name, values in _stats.items()]
+    return sorted(stats, key=lambda entry: entry[4] + entry[5], reverse=True)
+
+
+def clear_stats():
+    """Forget the timing of the commands."""
+
+    with _stats_lock:
+        _stats.clear()
+
+
+def run(cmd, cwd=None, timeout=None):
+    """
+    Run a command and get its output (stdout).
+
+    The command is killed if it runs longer than `timeout` seconds (no limit if
+    `None`, the configured query timeout if `QUERY`).  Only probes and status
+    queries should be limited, as commands such as diffs and logs can rightly
+    take long on large repositories.  Raises `CommandNotFoundError`, `CommandTimeoutError`,
+    or `CommandFailedError` (with the output and error output).
+    """
+
+    if timeout is QUERY:
+        timeout = _query_timeout
+    semaphore = _semaphore
+    queued = time.time()
+    with semaphore:
+        start = time.time()
+        failed = True
+        try:
+            try:
+                process = subprocess.Popen(
+                    cmd,
+                    startupinfo=get_startupinfo(),
+                    stdout=subprocess.PIPE,
+                    stderr=subprocess.PIPE,
+                    stdin=subprocess.PIPE,
+                    cwd=cwd,
+                    shell=False,
+                    env=get_env()
+                )
+            except (IOError, OSError) as e:
+                raise CommandNotFoundError("Could not run %s: %s" % (cmd[0], e), cmd)
+            try:
+                stdout, stderr = process.communicate(timeout=timeout)
+            except subprocess.TimeoutExpired:
+                process.kill()
+                stdout, stderr = process.communicate()
+                raise CommandTimeoutError(
+                    "Timed out after %s seconds: %s" % (timeout, " ".join(command_name(cmd))),
+                    cmd, None, stdout, stderr
+                )
+            if process.returncode != 0:
+                raise CommandFailedError(
+                    "Runtime Error: %s" % (stderr or stdout).decode('utf-8', 'replace').rstrip(),
+                    cmd, process.returncode, stdout, stderr
+                )
+            failed = False
+        finally:
+            record(cmd, start - queued, time.time() - start, failed)
+    return stdout
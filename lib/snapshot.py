@@ -0,0 +1,127 @@
+"""
+Snapshot.
+
+Compact read only copy of text with a line index.
+
+Copyright (c) 2013 - 2015 Isaac Muse <isaacmuse@gmail.com>
+License: MIT
+"""
+from array import array
+from . import differ
+
+# Characters between the checkpoints that map character offsets of non-ASCII text to byte offsets
+CHECKPOINT_CHARS = 65536
+
+# Approximate number of bytes decoded at a time when iterating lines
+LINE_BLOCK_SIZE = 1024 * 1024
+
+
+class TextSnapshot(object):
+    """
+    Text stored once, as UTF-8 bytes.
+
+    Slices are decoded straight from the bytes.  For non-ASCII text, character
+    offsets are mapped to byte offsets from a checkpoint every `CHECKPOINT_CHARS`
+    characters, so a slice only decodes the bytes around it.
+
+    Lines are split like `differ.split_lines` splits the other inputs of a diff.
+    The byte offsets of the lines are indexed the first time a line is accessed
+    by number.
+    """
+
+    def __init__(self, text):
+        """Initialize."""
+
+        chunks = []
+        checkpoints = array('Q', [0])
+        size = 0
+        for start in range(0, len(text), CHECKPOINT_CHARS):
+            chunk = text[start:start + CHECKPOINT_CHARS].encode('utf-8', 'surrogatepass')
+            chunks.append(chunk)
+            size += len(chunk)
+            checkpoints.append(size)
+        self.data = b''.join(chunks)
+        self.length = len(text)
+        self.checkpoints = checkpoints if size != self.length else None
+        self.starts = None
+
+    def __len__(self):
+        """Get the length in characters."""
+
+        return self.length
+
+    def decode(self, start, end):
+        """Decode a range of bytes without copying them first."""
+
+        return str(memoryview(self.data)[start:end], 'utf-8', 'surrogatepass')
+
+    def byte_offset(self, pt):
+        """Get the byte offset of a character offset."""
+
+        if self.checkpoints is None:
+            return pt
+        index, rest = divmod(pt, CHECKPOINT_CHARS)
+        start = self.checkpoints[index]
+        if not rest:
+            return start
+        chunk = self.decode(start, self.checkpoints[index + 1])
+        return start + len(chunk[:rest].encode('utf-8', 'surrogatepass'))
+
+    def substr(self, begin, end):
+        """Get the text between two character offsets."""
+
+        begin = max(0, min(begin, self.length))
+        end = max(begin, min(end, self.length))
+        return self.decode(self.byte_offset(begin), self.byte_offset(end))
+
+    def index(self):
+        """Index the byte offsets of the lines."""
+
+        if self.starts is None:
+            data = self.data
+            find = data.find
+            starts = array('Q', [0])
+            pos = find(b'\n')
+            while pos != -1:
+                starts.append(pos + 1)
+                pos = find(b'\n', pos + 1)
+            if starts[-1] == len(data):
+                starts.pop()
+            self.starts = starts
+        return self.starts
+
+    def line_count(self):
+        """Get the number of lines."""
+
+        return len(self.index())
+
+    def raw(self, row):
+        """Get the bytes of a line (a view into the buffer, without the line break)."""
+
+        starts = self.index()
+        start = starts[row]
+        end = starts[row + 1] if row + 1 < len(starts) else len(self.data)
+        data = self.data
+        if end > start and data[end - 1:end] == b'\n':
+            end -= 1
+        if end > start and data[end - 1:end] == b'\r':
+            end -= 1
+        return memoryview(self.data)[start:end]
+
+    def line(self, row):
+        """Get the text of a line, without the line break."""
+
+        return str(self.raw(row), 'utf-8', 'surrogatepass')
+
+    def lines(self):
+        """Iterate the lines, decoding a block of whole lines at a time."""
+
+        data = self.data
+        size = len(data)
+        start = 0
+        while start < size:
+            end = data.find(b'\n', min(start + LINE_BLOCK_SIZE, size))
+            end = size if end == -1 else end + 1
+            # The block ends at a line break (or the end), so it splits into whole lines.
+            yield from differ.split_lines(self.decode(start, end))
+            start = end
@@ -5,11 +5,11 @@ Copyright (c) 2013 - 2015 Isaac Muse <isaacmuse@gmail.com>
 License: MIT
 """
 import xml.etree.ElementTree as ET
-from os import environ
 import re
-import subprocess
 import sys
 from os.path import exists, isfile
+from . import runner
+from . import vcroot
 
 NO_LOCK = 0
 LOCAL_LOCK = 1
@@ -26,43 +26,10 @@ else:
 _svn_path = "svn.exe" if _PLATFORM == "windows" else "svn"
 
 
-def svnopen(args):
+def svnopen(args, timeout=None):
     """Call SVN with arguments."""
 
-    returncode = None
-    output = None
-    cmd = [_svn_path, "--non-interactive"] + args
-
-    env = environ.copy()
-    env['LC_ALL'] = 'en_US'
-
-    if _PLATFORM == "windows":
-        startupinfo = subprocess.STARTUPINFO()
-        startupinfo.dwFlags |= subprocess.STARTF_USESHOWWINDOW
-        process = subprocess.Popen(
-            cmd,
-            startupinfo=startupinfo,
-            stdout=subprocess.PIPE,
-            stderr=subprocess.STDOUT,
-            stdin=subprocess.PIPE,
-            shell=False,
-            env=env
-        )
-    else:
-        process = subprocess.Popen(
-            cmd,
-            stdout=subprocess.PIPE,
-            stderr=subprocess.STDOUT,
-            stdin=subprocess.PIPE,
-            shell=False,
-            env=env
-        )
-    output = process.communicate()
-    returncode = process.returncode
-
-    assert returncode == 0, "Runtime Error: %s" % output[0].rstrip()
-
-    return output[0]
+    return runner.run([_svn_path, "--non-interactive"] + args, timeout=timeout)
 
 
 def revert(target):
@@ -79,7 +46,7 @@ def info(target):
         (target.startswith("http://") or target.startswith("https://")) or
         exists(target)
     ), "%s does not exist!" % target
-    output = svnopen(['info', "--xml", target])
+    output = svnopen(['info', "--xml", target], runner.QUERY)
     return ET.fromstring(output)
 
 
@@ -232,6 +199,17 @@ def export(url, name, rev=None):
     assert exists(name), "%s appears to not have been exported!" % name
 
 
+def cat(target, rev=None):
+    """Show file at revision."""
+
+    assert exists(target), "%s does not exist!" % target
+    args = ["cat"]
+    if rev is not None:
+        args.append("-r%s" % str(rev))
+    args.append(target)
+    return svnopen(args)
+
+
 def add(pth):
     """Add a file."""
 
@@ -246,7 +224,7 @@ def cleanup(pth):
     svnopen(['cleanup', pth])
 
 
-def status(pth, ignore_externals=False, ignore_unversioned=False, depth="infinity"):
+def status(pth, ignore_externals=False, ignore_unversioned=False, depth="infinity", timeout=None):
     """Get the SVN status for the folder."""
 
     assert exists(pth), "%s does not exist!" % pth
@@ -274,7 +252,7 @@ def status(pth, ignore_externals=False, ignore_unversioned=False, depth="infinit
 
     args.append(pth)
 
-    output = svnopen(args)
+    output = svnopen(args, timeout)
     root = ET.fromstring(output)
 
     target = root.find("target")
@@ -304,8 +282,10 @@ def is_versioned(target):
     assert exists(target), "%s does not exist!" % target
 
     versioned = False
+    if vcroot.get_root(target, vcroot.SVN) is None:
+        return versioned
     try:
-        entries = status(target, depth="empty")
+        entries = status(target, depth="empty", timeout=runner.QUERY)
         if len(entries["unversioned"]) == 0:
             versioned = True
     except Exception:
@@ -318,7 +298,7 @@ def version():
     """Get SVN app version."""
 
     version = None
-    output = svnopen(['--version'])
+    output = svnopen(['--version'], runner.QUERY)
     m = re.search(br" version (\d+\.\d+\.\d+) ", output)
     if m is not None:
         version = m.group(1).decode('utf-8')
@@ -330,3 +310,9 @@ def set_svn_path(pth):
 
     global _svn_path
     _svn_path = pth
+
+
+def get_svn_path():
+    """Get SVN path."""
+
+    return _svn_path
@@ -0,0 +1,114 @@
+"""
+VC Probe.
+
+Find the versions of the version control binaries concurrently, and remember
+them on disk by binary path and modification time.
+
+Copyright (c) 2013 - 2015 Isaac Muse <isaacmuse@gmail.com>
+License: MIT
+"""
+import json
+import os
+from os.path import dirname, exists, realpath
+import shutil
+import threading
+import time
+
+# Result of a probe that did not finish in time
+TIMED_OUT = object()
+
+
+def binary_stamp(binary):
+    """Get the `(full path, mtime)` of a binary (or `None` if it cannot be found)."""
+
+    path = shutil.which(binary)
+    if path is None:
+        return None
+    try:
+        path = realpath(path)
+        return path, os.stat(path).st_mtime
+    except OSError:
+        return None
+
+
+class VersionCache(object):
+    """Versions of binaries stored in a JSON file: `{path: {"mtime": mtime, "version": version}}`."""
+
+    def __init__(self, filename):
+        """Initialize."""
+
+        self.filename = filename
+        self.entries = None
+        self.lock = threading.Lock()
+
+    def load(self):
+        """Load the entries the first time they are needed (the lock must be held)."""
+
+        if self.entries is None:
+            self.entries = {}
+            try:
+                with open(self.filename, "r") as f:
+                    entries = json.load(f)
+                if isinstance(entries, dict):
+                    self.entries = entries
+            except (IOError, OSError, ValueError):
+                pass
+        return self.entries
+
+    def get(self, stamp):
+        """Get the entry of a binary stamp if the binary has not changed since (or `None`)."""
+
+        if stamp is None:
+            return None
+        with self.lock:
+            entry = self.load().get(stamp[0])
+        if not isinstance(entry, dict) or entry.get("mtime") != stamp[1]:
+            return None
+        return entry
+
+    def put(self, results):
+        """Store the versions of `{stamp: version}` and save the file."""
+
+        with self.lock:
+            entries = self.load()
+            for stamp, version in results.items():
+                entries[stamp[0]] = {"mtime": stamp[1], "version": version}
+            folder = dirname(self.filename)
+            temp = self.filename + ".tmp"
+            try:
+                if not exists(folder):
+                    os.makedirs(folder)
+                with open(temp, "w") as f:
+                    json.dump(entries, f, indent=4, sort_keys=True)
+                os.replace(temp, self.filename)
+            except (IOError, OSError):
+                pass
+
+
+def probe(probes, timeout):
+    """
+    Call the version functions of `{name: function}` at the same time.
+
+    Returns `{name: version}`, where the version is an exception if the function
+    failed, or `TIMED_OUT` if it did not return within `timeout` seconds.
+    A function that is still running is left to finish on its own.
+    """
+
+    results = {}
+
+    def run(name, function):
+        try:
+            results[name] = function()
+        except Exception as e:
+            results[name] = e
+
+    threads = []
+    for name, function in probes.items():
+        thread = threading.Thread(target=run, args=(name, function))
+        thread.daemon = True
+        thread.start()
+        threads.append(thread)
+    deadline = time.time() + timeout
+    for thread in threads:
+        thread.join(max(0, deadline - time.time()))
+    return dict((name, results.get(name, TIMED_OUT)) for name in probes)
@@ -0,0 +1,140 @@
+"""
+VC Root.
+
+Find the working copy roots (Git, Mercurial, and SVN) that contain a path.
+
+Copyright (c) 2013 - 2015 Isaac Muse <isaacmuse@gmail.com>
+License: MIT
+"""
+import os
+from os.path import abspath, dirname, exists, isfile, join
+import threading
+import time
+from .lru import LRUCache
+
+GIT = ".git"
+HG = ".hg"
+SVN = ".svn"
+
+CONTROL_DIRS = (GIT, HG, SVN)
+
+# Seconds an answer is trusted before the folders it was found from are checked for changes
+VALIDATE_INTERVAL = 5
+
+# Answers by folder: [(git root, hg root, svn root), folder mtime, last validated]
+_roots = {}
+# Number of looked up paths whose folders are remembered
+FOLDER_CACHE_SIZE = 4096
+
+# Folders of the paths that have been looked up (so files do not have to be told from folders again):
+# (folder, time found), found again once older than `VALIDATE_INTERVAL`
+_folders = LRUCache(FOLDER_CACHE_SIZE)
+_lock = threading.Lock()
+
+
+def _mtime(folder):
+    """Get the modification time of a folder (or `None` if it is gone)."""
+
+    try:
+        return os.stat(folder).st_mtime
+    except OSError:
+        return None
+
+
+def _chain(folder):
+    """Get the folder and all of its parents."""
+
+    chain = [folder]
+    parent = dirname(folder)
+    while parent != folder:
+        folder = parent
+        chain.append(folder)
+        parent = dirname(folder)
+    return chain
+
+
+def _walk(folder):
+    """Find the roots with one upward walk that stops at the first folder with an answer."""
+
+    unknown = []
+    found = (None,) * len(CONTROL_DIRS)
+    for current in _chain(folder):
+        entry = _roots.get(current)
+        if entry is not None:
+            found = entry[0]
+            break
+        unknown.append(current)
+    # Resolve downwards so every folder on the way gets its answer.
+    now = time.time()
+    for current in reversed(unknown):
+        found = tuple(
+            current if exists(join(current, control)) else root
+            for control, root in zip(CONTROL_DIRS, found)
+        )
+        _roots[current] = [found, _mtime(current), now]
+    return found
+
+
+def _validate(folder):
+    """
+    Drop the answers that may be out of date.
+
+    Creating or removing a control directory changes the modification time of
+    the folder that contains it, which invalidates the answers of that folder and
+    of every folder below it.
+    """
+
+    for current in _chain(folder):
+        entry = _roots.get(current)
+        if entry is None:
+            continue
+        if _mtime(current) != entry[1]:
+            prefix = join(current, "")
+            for key in [key for key in _roots if key == current or key.startswith(prefix)]:
+                del _roots[key]
+
+
+def get_roots(target):
+    """
+    Get the `(git, hg, svn)` roots of a file or folder (`None` where there is none).
+
+    Answers are remembered for every folder on the way up, so later lookups of
+    those folders are dictionary hits.  An answer is rechecked (without looking
+    for control directories again) once it is older than `VALIDATE_INTERVAL`,
+    and so is whether the path is a file or a folder.
+    """
+
+    now = time.time()
+    found = _folders.get(target)
+    if found is None or now - found[1] >= VALIDATE_INTERVAL:
+        # A path can be replaced by a folder (or the other way around).
+        path = abspath(target)
+        folder = dirname(path) if isfile(path) else path
+        _folders.put(target, (folder, now), 1)
+    else:
+        folder = found[0]
+    with _lock:
+        entry = _roots.get(folder)
+        if entry is not None:
+            if now - entry[2] < VALIDATE_INTERVAL:
+                return entry[0]
+            _validate(folder)
+            entry = _roots.get(folder)
+            if entry is not None:
+                entry[2] = now
+                return entry[0]
+        return _walk(folder)
+
+
+def get_root(target, control):
+    """Get the root of the working copy of one kind (`GIT`, `HG`, or `SVN`) that contains a path."""
+
+    return get_roots(target)[CONTROL_DIRS.index(control)]
+
+
+def clear():
+    """Forget all answers."""
+
+    with _lock:
+        _roots.clear()
+        _folders.clear()
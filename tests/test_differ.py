@@ -0,0 +1,347 @@
+"""Test differ."""
+import concurrent.futures
+import difflib
+import random
+import unittest
+from lib import differ
+
+
+def lcs_length(a, b):
+    """Get the length of the longest common subsequence."""
+
+    row = [0] * (len(b) + 1)
+    for x in a:
+        previous = 0
+        for j, y in enumerate(b):
+            current = row[j + 1]
+            row[j + 1] = previous + 1 if x == y else max(row[j + 1], row[j])
+            previous = current
+    return row[-1]
+
+
+def random_lines(rand, count, alphabet):
+    """Get random lines from a small alphabet so there are many repeats."""
+
+    return [rand.choice(alphabet) for _ in range(count)]
+
+
+def apply_diff(a, diff):
+    """Rebuild the new side from the old side and the hunks of a unified diff."""
+
+    result = []
+    pos = 0
+    for line in diff:
+        if line.startswith('@@'):
+            start, _, length = line.split()[1][1:].partition(',')
+            # An empty old side is numbered from the line before it.
+            start = int(start) if length == '0' else int(start) - 1
+            result.extend(a[pos:start])
+            pos = start
+        elif line.startswith('+'):
+            result.append(line[1:])
+        elif line.startswith(' '):
+            result.append(line[1:])
+            pos += 1
+        elif line.startswith('-'):
+            pos += 1
+    result.extend(a[pos:])
+    return result
+
+
+def assert_valid(test, a, b, blocks):
+    """Assert that the blocks are ordered, match equal lines, and end with the sentinel."""
+
+    test.assertEqual(blocks[-1], (len(a), len(b), 0))
+    i = j = 0
+    previous = None
+    for ai, bj, size in blocks[:-1]:
+        test.assertGreater(size, 0)
+        test.assertGreaterEqual(ai, i)
+        test.assertGreaterEqual(bj, j)
+        test.assertEqual(a[ai:ai + size], b[bj:bj + size])
+        if previous is not None:
+            # Adjacent blocks are merged.
+            test.assertFalse(ai == i and bj == j)
+        i, j = ai + size, bj + size
+        previous = (ai, bj, size)
+    test.assertLessEqual(i, len(a))
+    test.assertLessEqual(j, len(b))
+
+
+class TestSplitLines(unittest.TestCase):
+    """Test line splitting."""
+
+    def test_split(self):
+        """Test line breaks and trailing carriage returns."""
+
+        self.assertEqual(differ.split_lines(''), [])
+        self.assertEqual(differ.split_lines('a'), ['a'])
+        self.assertEqual(differ.split_lines('a\n'), ['a'])
+        self.assertEqual(differ.split_lines('a\n\n'), ['a', ''])
+        self.assertEqual(differ.split_lines('a\r\nb\rc\n'), ['a', 'b\rc'])
+
+
+class TestLineMatcher(unittest.TestCase):
+    """Test the matching blocks of the algorithms."""
+
+    def test_valid_blocks(self):
+        """Test that every algorithm gives valid matching blocks."""
+
+        rand = random.Random(0)
+        for _ in range(200):
+            a = random_lines(rand, rand.randint(0, 40), 'abcdef')
+            b = random_lines(rand, rand.randint(0, 40), 'abcdef')
+            for algorithm in differ.ALGORITHMS:
+                assert_valid(self, a, b, differ.LineMatcher(a, b, algorithm).get_matching_blocks())
+
+    def test_myers_minimal(self):
+        """Test that Myers finds a longest common subsequence."""
+
+        rand = random.Random(1)
+        for _ in range(200):
+            a = random_lines(rand, rand.randint(0, 30), 'abcd')
+            b = random_lines(rand, rand.randint(0, 30), 'abcd')
+            blocks = differ.LineMatcher(a, b, differ.MYERS).get_matching_blocks()
+            self.assertEqual(sum(size for _, _, size in blocks), lcs_length(a, b))
+
+    def test_parallel(self):
+        """Test that matching segments concurrently gives valid blocks."""
+
+        rand = random.Random(3)
+        a = ['%d' % i for i in range(1000)]
+        b = list(a)
+        for _ in range(40):
+            b[rand.randrange(len(b))] = random_lines(rand, 1, 'abc')[0]
+        minimum = differ.PARALLEL_MIN_LINES
+        differ.PARALLEL_MIN_LINES = 100
+        try:
+            with concurrent.futures.ThreadPoolExecutor(4) as executor:
+                matcher = differ.LineMatcher(a, b, differ.MYERS, executor=executor, workers=4)
+                blocks = matcher.get_matching_blocks()
+        finally:
+            differ.PARALLEL_MIN_LINES = minimum
+        self.assertIsNone(matcher.executor_error)
+        assert_valid(self, a, b, blocks)
+        self.assertEqual(sum(size for _, _, size in blocks), lcs_length(a, b))
+
+    def test_parallel_failure(self):
+        """Test that matching finishes without an executor that fails."""
+
+        class BrokenExecutor(object):
+            def submit(self, *args):
+                raise RuntimeError("broken")
+
+        a = ['%d' % i for i in range(3000)]
+        b = [line if i % 7 else 'x' for i, line in enumerate(a)]
+        minimum = differ.PARALLEL_MIN_LINES
+        differ.PARALLEL_MIN_LINES = 100
+        try:
+            matcher = differ.LineMatcher(a, b, differ.MYERS, executor=BrokenExecutor(), workers=4)
+            blocks = matcher.get_matching_blocks()
+        finally:
+            differ.PARALLEL_MIN_LINES = minimum
+        self.assertIsInstance(matcher.executor_error, RuntimeError)
+        self.assertEqual(blocks, differ.LineMatcher(a, b, differ.MYERS).get_matching_blocks())
+
+    def test_cancel(self):
+        """Test that the check can cancel matching."""
+
+        def check():
+            raise differ.DiffCancelledError()
+
+        a = ['%d' % i for i in range(2000)]
+        b = list(reversed(a))
+        with self.assertRaises(differ.DiffCancelledError):
+            differ.LineMatcher(a, b, differ.MYERS, check).get_matching_blocks()
+
+
+class TestLineInterner(unittest.TestCase):
+    """Test interning lines."""
+
+    def test_ids(self):
+        """Test that equal lines share an id and a string."""
+
+        interner = differ.LineInterner()
+        a = interner.intern(['x', 'y', 'x'])
+        b = interner.intern(iter(['y', 'z']))
+        self.assertEqual(list(a.ids), [0, 1, 0])
+        self.assertEqual(list(b.ids), [1, 2])
+        self.assertEqual(list(a), ['x', 'y', 'x'])
+        self.assertEqual(b[0:2], ['y', 'z'])
+        self.assertIs(a[1], b[0])
+        self.assertEqual(len(b), 2)
+
+    def test_interned(self):
+        """Test that interned lines give the same blocks as the lines."""
+
+        rand = random.Random(2)
+        interner = differ.LineInterner()
+        for _ in range(50):
+            a = random_lines(rand, rand.randint(0, 40), 'abcdef')
+            b = random_lines(rand, rand.randint(0, 40), 'abcdef')
+            self.assertEqual(
+                differ.LineMatcher(interner.intern(a), interner.intern(b), differ.MYERS).get_matching_blocks(),
+                differ.LineMatcher(a, b, differ.MYERS).get_matching_blocks()
+            )
+
+
+class TestCommonAffix(unittest.TestCase):
+    """Test trimming identical leading and trailing lines."""
+
+    def test_affix(self):
+        """Test affixes across chunk boundaries and overlapping affixes."""
+
+        chunk = differ.AFFIX_CHUNK
+        a = ['%d' % i for i in range(chunk * 2 + 10)]
+        b = list(a)
+        b[chunk + 3] = 'x'
+        self.assertEqual(differ.common_affix(a, b), (chunk + 3, chunk + 6))
+        self.assertEqual(differ.common_affix(a, a), (len(a), 0))
+        self.assertEqual(differ.common_affix(['a', 'b', 'a'], ['a']), (1, 0))
+        self.assertEqual(differ.common_affix(['b', 'a'], ['a']), (0, 1))
+        self.assertEqual(differ.common_affix([], ['a']), (0, 0))
+
+
+class TestIncrementalMatcher(unittest.TestCase):
+    """Test matching lines that are edited in place."""
+
+    def test_replace(self):
+        """Test that edits keep the blocks valid and report the blocks that changed."""
+
+        rand = random.Random(4)
+        for _ in range(30):
+            a = random_lines(rand, rand.randint(0, 60), 'abcdefgh')
+            b = random_lines(rand, rand.randint(0, 60), 'abcdefgh')
+            matcher = differ.IncrementalMatcher(a, b, differ.MYERS)
+            for _ in range(20):
+                side = rand.randint(0, 1)
+                seq = matcher.b if side else matcher.a
+                start = rand.randint(0, len(seq))
+                end = rand.randint(start, min(len(seq), start + 5))
+                before = list(matcher.matching_blocks)
+                lines = random_lines(rand, rand.randint(0, 5), 'abcdefgh')
+                delta = len(lines) - (end - start)
+                first, last = matcher.replace(side, start, end, lines)
+                blocks = matcher.get_matching_blocks()
+                assert_valid(self, matcher.a, matcher.b, blocks)
+                self.assertEqual(blocks[:first], before[:first])
+                moved = [
+                    (i, j + delta, k) if side else (i + delta, j, k)
+                    for i, j, k in before[len(before) - (len(blocks) - last):]
+                ]
+                self.assertEqual(blocks[last:], moved)
+                self.assertEqual(
+                    apply_diff(matcher.a, list(differ.unified_diff(matcher.a, matcher.b, matcher=matcher))[2:]),
+                    matcher.b
+                )
+
+
+class TestLineKey(unittest.TestCase):
+    """Test comparing lines with differences ignored."""
+
+    def test_none(self):
+        """Test that lines are compared as is without options."""
+
+        self.assertIsNone(differ.line_key())
+
+    def test_options(self):
+        """Test the normalized form of each option."""
+
+        self.assertEqual(differ.line_key(ignore_whitespace_change=True)('  a \t b  '), ' a b')
+        self.assertEqual(differ.line_key(ignore_all_whitespace=True)('  a \t b  '), 'ab')
+        self.assertEqual(differ.line_key(ignore_all_whitespace=True, ignore_whitespace_change=True)(' a b'), 'ab')
+        self.assertEqual(differ.line_key(ignore_case=True)('AbC'), 'abc')
+        self.assertEqual(differ.line_key(ignore_eol=True)('a\r'), 'a')
+
+    def test_line_key(self):
+        """Test that lines that only differ in ignored ways match."""
+
+        interner = differ.LineInterner(differ.line_key(ignore_whitespace_change=True, ignore_case=True))
+        a = interner.intern(['a  b', 'C', 'd'])
+        b = interner.intern(['A b ', 'c', 'e'])
+        self.assertEqual(differ.LineMatcher(a, b).get_opcodes(), [('equal', 0, 2, 0, 2), ('replace', 2, 3, 2, 3)])
+        self.assertEqual(a[0], 'a  b')
+
+    def test_whitespace_diff(self):
+        """Test that the diff shows the original lines of the changes that are not ignored."""
+
+        interner = differ.LineInterner(differ.line_key(ignore_all_whitespace=True))
+        a = interner.intern(['if x:', '    y = 1', 'z'])
+        b = interner.intern(['if x :', '\ty=1', 'Z'])
+        self.assertEqual(
+            list(differ.unified_diff(a, b, lineterm=''))[2:],
+            ['@@ -1,3 +1,3 @@', ' if x:', '     y = 1', '-z', '+Z']
+        )
+
+
+class TestUnifiedDiff(unittest.TestCase):
+    """Test unified diff output."""
+
+    def test_difflib(self):
+        """Test that the output is the same as difflib's for the same matches."""
+
+        rand = random.Random(5)
+        for _ in range(100):
+            a = random_lines(rand, rand.randint(0, 50), 'abcdefghij')
+            b = random_lines(rand, rand.randint(0, 50), 'abcdefghij')
+            matcher = differ.LineMatcher(a, b)
+            blocks = difflib.SequenceMatcher(None, a, b).get_matching_blocks()
+            matcher.matching_blocks = [tuple(block) for block in blocks]
+            for n in (0, 1, 3):
+                self.assertEqual(
+                    list(differ.unified_diff(a, b, 'a', 'b', 'then', 'now', n, matcher=matcher)),
+                    list(difflib.unified_diff(a, b, 'a', 'b', 'then', 'now', n))
+                )
+
+    def test_algorithms(self):
+        """Test that the diff of every algorithm rebuilds the new side."""
+
+        rand = random.Random(6)
+        for _ in range(100):
+            a = random_lines(rand, rand.randint(0, 50), 'abcdefghij')
+            b = random_lines(rand, rand.randint(0, 50), 'abcdefghij')
+            for algorithm in differ.ALGORITHMS:
+                diff = list(differ.unified_diff(a, b, lineterm='', algorithm=algorithm))
+                self.assertEqual(apply_diff(a, diff[2:]), b)
+
+    def test_identical(self):
+        """Test that identical sides give no output."""
+
+        self.assertEqual(list(differ.unified_diff(['a', 'b'], ['a', 'b'])), [])
+
+
+class TestStats(unittest.TestCase):
+    """Test counting changes without formatting them."""
+
+    def test_stats(self):
+        """Test the change counts of an example."""
+
+        a = ['a', 'b', 'c', 'd', 'e', 'f', 'g', 'h', 'i', 'j', 'k']
+        b = ['a', 'B', 'c', 'd', 'e', 'f', 'g', 'h', 'i', 'j', 'k', 'l', 'm']
+        stats = differ.LineMatcher(a, b, differ.MYERS).get_stats()
+        self.assertEqual(stats["changed"], 1)
+        self.assertEqual(stats["added"], 2)
+        self.assertEqual(stats["removed"], 0)
+        self.assertEqual(stats["hunks"], 2)
+        self.assertEqual(stats["ratio"], difflib.SequenceMatcher(None, a, b).ratio())
+
+    def test_random(self):
+        """Test that the counts agree with the unified diff."""
+
+        rand = random.Random(8)
+        for _ in range(100):
+            a = random_lines(rand, rand.randint(0, 50), 'abcdefghij')
+            b = random_lines(rand, rand.randint(0, 50), 'abcdefghij')
+            for n in (0, 3):
+                matcher = differ.LineMatcher(a, b, differ.MYERS)
+                stats = matcher.get_stats(n)
+                diff = list(differ.unified_diff(a, b, n=n, matcher=matcher))
+                self.assertEqual(stats["hunks"], sum(1 for line in diff if line.startswith('@@')))
+                self.assertEqual(
+                    stats["removed"] + stats["changed"],
+                    sum(1 for line in diff[2:] if line.startswith('-'))
+                )
+                self.assertEqual(
+                    stats["added"] + stats["changed"],
+                    sum(1 for line in diff[2:] if line.startswith('+'))
+                )
@@ -0,0 +1,99 @@
+"""Test folders."""
+import concurrent.futures
+import os
+from os.path import join
+import shutil
+import tempfile
+import unittest
+from lib import differ
+from lib import folders
+
+
+class TestFolders(unittest.TestCase):
+    """Test comparing the files of two folders."""
+
+    def setUp(self):
+        """Create two folder trees."""
+
+        self.top = tempfile.mkdtemp()
+        self.left = join(self.top, 'left')
+        self.right = join(self.top, 'right')
+        self.executor = concurrent.futures.ThreadPoolExecutor(2)
+
+    def tearDown(self):
+        """Remove the folder trees."""
+
+        self.executor.shutdown()
+        shutil.rmtree(self.top)
+
+    def write(self, root, path, data, mtime=1000000000):
+        """Write a file with a modification time."""
+
+        name = join(root, path)
+        if not os.path.exists(os.path.dirname(name)):
+            os.makedirs(os.path.dirname(name))
+        with open(name, 'wb') as f:
+            f.write(data)
+        os.utime(name, (mtime, mtime))
+
+    def compare(self, exclude=(), check=None):
+        """Compare the folders."""
+
+        return list(folders.compare_folders(self.left, self.right, self.executor, 2, exclude, check))
+
+    def test_compare(self):
+        """Test removed, added, and modified files."""
+
+        self.write(self.left, 'same.txt', b'same')
+        self.write(self.right, 'same.txt', b'same')
+        self.write(self.left, 'touched.txt', b'same', 1)
+        self.write(self.right, 'touched.txt', b'same', 2)
+        self.write(self.left, join('sub', 'edited.txt'), b'abcd', 1)
+        self.write(self.right, join('sub', 'edited.txt'), b'abce', 2)
+        self.write(self.left, 'grown.txt', b'a')
+        self.write(self.right, 'grown.txt', b'ab')
+        self.write(self.left, join('old', 'removed.txt'), b'x')
+        self.write(self.right, 'added.txt', b'x')
+        self.assertEqual(
+            self.compare(),
+            [
+                (folders.REMOVED, join('old', 'removed.txt')),
+                (folders.ADDED, 'added.txt'),
+                (folders.MODIFIED, 'grown.txt'),
+                (folders.MODIFIED, join('sub', 'edited.txt'))
+            ]
+        )
+
+    def test_exclude(self):
+        """Test that excluded names are skipped at any depth."""
+
+        self.write(self.left, join('.git', 'HEAD'), b'x')
+        self.write(self.left, join('sub', 'build.pyc'), b'x')
+        self.write(self.right, 'kept.txt', b'x')
+        self.assertEqual(self.compare(('.git', '*.pyc')), [(folders.ADDED, 'kept.txt')])
+        self.assertEqual(folders.scan(self.left, ('.git',)), {join('sub', 'build.pyc'): (1, 1000000000)})
+
+    def test_same_content(self):
+        """Test comparing content across blocks."""
+
+        size = folders.COMPARE_BLOCK_SIZE
+        folders.COMPARE_BLOCK_SIZE = 4
+        try:
+            self.write(self.left, 'a', b'0123456789')
+            self.write(self.right, 'a', b'0123456789')
+            self.write(self.right, 'b', b'0123456788')
+            self.assertTrue(folders.same_content(join(self.left, 'a'), join(self.right, 'a')))
+            self.assertFalse(folders.same_content(join(self.left, 'a'), join(self.right, 'b')))
+        finally:
+            folders.COMPARE_BLOCK_SIZE = size
+
+    def test_cancel(self):
+        """Test that the check can cancel the comparison."""
+
+        def check():
+            raise differ.DiffCancelledError()
+
+        self.write(self.left, 'a', b'x')
+        os.makedirs(self.right)
+        with self.assertRaises(differ.DiffCancelledError):
+            self.compare(check=check)
@@ -0,0 +1,91 @@
+"""Test Git."""
+import os
+from os.path import join
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import unittest
+from lib import git
+from lib import runner
+from lib import vcroot
+
+GIT = shutil.which("git")
+
+
+@unittest.skipIf(GIT is None, "Git is not installed")
+class TestCatFile(unittest.TestCase):
+    """Test reading revisions through `git cat-file --batch`."""
+
+    def setUp(self):
+        """Create a repository with a commit."""
+
+        self.tree = os.path.realpath(tempfile.mkdtemp())
+        self.file = join(self.tree, 'a.txt')
+        with open(self.file, 'wb') as f:
+            f.write(b'one\ntwo\n')
+        for args in (
+            ['init', '-q'],
+            ['add', 'a.txt'],
+            ['-c', 'user.name=test', '-c', 'user.email=test@example.com', 'commit', '-q', '-m', 'first']
+        ):
+            subprocess.check_call([GIT] + args, cwd=self.tree)
+        with open(self.file, 'wb') as f:
+            f.write(b'changed\n')
+        self.settings = git._git_path, git.CAT_FILE_TIMEOUT
+        vcroot.clear()
+
+    def tearDown(self):
+        """Stop the processes and remove the repository."""
+
+        git._git_path, git.CAT_FILE_TIMEOUT = self.settings
+        git.stop_cat_files()
+        vcroot.clear()
+        shutil.rmtree(self.tree)
+
+    def test_read(self):
+        """Test reading objects with one process."""
+
+        self.assertEqual(git.cat_file(self.tree, 'HEAD:a.txt'), b'one\ntwo\n')
+        catfile = git._cat_files[self.tree]
+        process = catfile.process
+        self.assertIsNone(git.cat_file(self.tree, 'HEAD:missing.txt'))
+        self.assertEqual(git.cat_file(self.tree, 'HEAD:a.txt'), b'one\ntwo\n')
+        self.assertIs(catfile.process, process)
+
+    def test_restart(self):
+        """Test that a process that died is started again."""
+
+        self.assertEqual(git.cat_file(self.tree, 'HEAD:a.txt'), b'one\ntwo\n')
+        catfile = git._cat_files[self.tree]
+        catfile.process.kill()
+        catfile.process.wait()
+        self.assertEqual(git.cat_file(self.tree, 'HEAD:a.txt'), b'one\ntwo\n')
+
+    def test_show(self):
+        """Test showing a file at a revision, and a file that is not in it."""
+
+        self.assertEqual(git.show(self.file, 'HEAD'), b'one\ntwo\n')
+        other = join(self.tree, 'b.txt')
+        with open(other, 'wb') as f:
+            f.write(b'new\n')
+        with self.assertRaises(runner.CommandFailedError):
+            git.show(other, 'HEAD')
+
+    @unittest.skipIf(sys.platform.startswith('win'), "Needs a shell script")
+    def test_timeout(self):
+        """Test that a request that hangs times out and the next one recovers."""
+
+        hang = join(tempfile.mkdtemp(dir=self.tree), 'hang.sh')
+        with open(hang, 'w') as f:
+            f.write('#!/bin/sh\nexec sleep 30\n')
+        os.chmod(hang, 0o755)
+        git._git_path = hang
+        git.CAT_FILE_TIMEOUT = 0.3
+        start = time.time()
+        with self.assertRaises(runner.CommandTimeoutError):
+            git.cat_file(self.tree, 'HEAD:a.txt')
+        self.assertLess(time.time() - start, 5)
+        git._git_path = self.settings[0]
+        self.assertEqual(git.cat_file(self.tree, 'HEAD:a.txt'), b'one\ntwo\n')
@@ -0,0 +1,71 @@
+"""Test hunks."""
+import unittest
+from lib import hunks
+
+DIFF = [
+    '--- a',
+    '+++ b',
+    '@@ -1,3 +1,3 @@',
+    ' one',
+    '-two',
+    '+TWO',
+    ' three',
+    '@@ -10,0 +11,2 @@',
+    '+new1',
+    '+new2',
+    '@@ -20 +22 @@',
+    '-old',
+    '\\ No newline at end of file',
+    '+new'
+]
+
+
+class TestHunkIndex(unittest.TestCase):
+    """Test the hunk index."""
+
+    def setUp(self):
+        """Index the diff."""
+
+        self.index = hunks.HunkIndex()
+        self.index.scan('\n'.join(DIFF))
+
+    def test_scan(self):
+        """Test that lines are passed through while they are indexed."""
+
+        index = hunks.HunkIndex()
+        self.assertEqual(list(index.scan(iter(DIFF))), DIFF)
+        self.assertEqual(list(index.hunks), list(self.index.hunks))
+
+    def test_hunks(self):
+        """Test finding hunks by row."""
+
+        index = self.index
+        self.assertEqual(len(index), 3)
+        self.assertIsNone(index.hunk_at(1))
+        self.assertEqual(index.hunk_at(2), 2)
+        self.assertEqual(index.hunk_at(6), 2)
+        self.assertEqual(index.hunk_at(9), 7)
+        self.assertEqual(index.hunk_at(13), 10)
+        self.assertEqual(index.next_hunk(0), 2)
+        self.assertEqual(index.next_hunk(2), 7)
+        self.assertIsNone(index.next_hunk(10))
+        self.assertIsNone(index.previous_hunk(2))
+        self.assertEqual(index.previous_hunk(7), 2)
+        self.assertEqual(index.previous_hunk(13), 10)
+
+    def test_source(self):
+        """Test mapping rows to source lines."""
+
+        index = self.index
+        self.assertIsNone(index.source(0))
+        self.assertEqual(index.source(2), (1, 1))
+        self.assertEqual(index.source(3), (1, 1))
+        self.assertEqual(index.source(4), (2, 2))
+        self.assertEqual(index.source(5), (3, 2))
+        self.assertEqual(index.source(6), (3, 3))
+        self.assertEqual(index.source(7), (11, 11))
+        self.assertEqual(index.source(9), (11, 12))
+        self.assertEqual(index.source(11), (20, 22))
+        self.assertIsNone(index.source(12))
+        self.assertEqual(index.source(13), (21, 22))
+        self.assertIsNone(index.source(14))
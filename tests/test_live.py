@@ -0,0 +1,79 @@
+"""Test live."""
+import random
+import unittest
+from lib import differ
+from lib import live
+
+
+def apply(text, replacements):
+    """Apply replacements of ranges of the old text."""
+
+    for begin, end, new in reversed(replacements):
+        text = text[:begin] + new + text[end:]
+    return text
+
+
+class TestLiveHunks(unittest.TestCase):
+    """Test updating the text of a diff as its sides are edited."""
+
+    def test_edit(self):
+        """Test edits that change hunks and move the hunks after them."""
+
+        a = ['%d' % i for i in range(40)]
+        b = list(a)
+        b[5] = 'x'
+        b[30] = 'y'
+        diff = live.LiveHunks(differ.IncrementalMatcher(a, b, differ.MYERS), ('a', 'b'))
+        text = apply('', diff.render_all())
+        self.assertEqual(text, "".join(line + "\n" for line in differ.unified_diff(a, b, 'a', 'b', lineterm='')))
+
+        text = apply(text, diff.replace(live.RIGHT, 10, 10, ['new', 'lines']))
+        b[10:10] = ['new', 'lines']
+        self.assertEqual(text, "".join(line + "\n" for line in differ.unified_diff(a, b, 'a', 'b', lineterm='')))
+
+        # An edit within a hunk rewrites it and only moves the headers of the hunks after it.
+        replacements = diff.replace(live.LEFT, 5, 6, ['5', 'extra'])
+        self.assertEqual(len(replacements), 2)
+        self.assertEqual(replacements[1][2], '@@ -29,7 +30,7 @@\n')
+        text = apply(text, replacements)
+        a[5:6] = ['5', 'extra']
+        self.assertEqual(text, "".join(line + "\n" for line in differ.unified_diff(a, b, 'a', 'b', lineterm='')))
+
+    def test_random_edits(self):
+        """Test that the updated text is the text of a full render."""
+
+        rand = random.Random(7)
+        for _ in range(20):
+            a = [rand.choice('abcdefghij') for _ in range(rand.randint(0, 80))]
+            b = [rand.choice('abcdefghij') for _ in range(rand.randint(0, 80))]
+            diff = live.LiveHunks(differ.IncrementalMatcher(a, b, differ.MYERS), ('a', 'b'))
+            text = apply('', diff.render_all())
+            for _ in range(30):
+                side = rand.randint(0, 1)
+                seq = diff.matcher.b if side else diff.matcher.a
+                start = rand.randint(0, len(seq))
+                end = rand.randint(start, min(len(seq), start + 4))
+                lines = [rand.choice('abcdefghij') for _ in range(rand.randint(0, 4))]
+                text = apply(text, diff.replace(side, start, end, lines))
+                full = live.LiveHunks(diff.matcher, diff.names)
+                self.assertEqual(text, apply('', full.render_all()))
+                self.assertEqual(diff.hunks, full.hunks)
+
+    def test_identical(self):
+        """Test that the file header comes and goes with the hunks."""
+
+        diff = live.LiveHunks(differ.IncrementalMatcher(['a', 'b'], ['a', 'b']), ('a', 'b'))
+        self.assertEqual(diff.render_all(), [(0, 0, "")])
+        text = apply('', diff.replace(live.LEFT, 1, 2, ['c']))
+        self.assertEqual(text, '--- a\n+++ b\n@@ -1,2 +1,2 @@\n a\n-c\n+b\n')
+        self.assertEqual(apply(text, diff.replace(live.LEFT, 1, 2, ['b'])), '')
+        self.assertEqual(diff.replace(live.LEFT, 0, 0, []), [])
+
+    def test_find_hunk(self):
+        """Test finding hunks by the line they start at."""
+
+        hunks = [[0, 2, 0, 3, 0, 0], [10, 12, 11, 13, 0, 0]]
+        self.assertEqual(live.find_hunk(hunks, live.LEFT, 0), 0)
+        self.assertEqual(live.find_hunk(hunks, live.LEFT, 1), 1)
+        self.assertEqual(live.find_hunk(hunks, live.RIGHT, 11), 1)
+        self.assertEqual(live.find_hunk(hunks, live.RIGHT, 12), 2)
@@ -0,0 +1,50 @@
+"""Test LRU."""
+import unittest
+from lib.lru import LRUCache
+
+
+class TestLRUCache(unittest.TestCase):
+    """Test the LRU cache."""
+
+    def test_evict(self):
+        """Test that the least recently used entries are evicted first."""
+
+        cache = LRUCache(10)
+        cache.put('a', 1, 4)
+        cache.put('b', 2, 4)
+        self.assertEqual(cache.get('a'), 1)
+        cache.put('c', 3, 4)
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual(cache.get('a'), 1)
+        self.assertEqual(cache.get('c'), 3)
+        self.assertEqual(cache.size, 8)
+
+    def test_replace(self):
+        """Test that storing a key again replaces its size."""
+
+        cache = LRUCache(10)
+        cache.put('a', 1, 4)
+        cache.put('a', 2, 6)
+        self.assertEqual(cache.get('a'), 2)
+        self.assertEqual(cache.size, 6)
+
+    def test_too_large(self):
+        """Test that an entry larger than the cache is not stored and drops the old value."""
+
+        cache = LRUCache(10)
+        cache.put('a', 1, 4)
+        cache.put('a', 2, 11)
+        self.assertEqual(cache.get('a', 'missing'), 'missing')
+        self.assertEqual(cache.size, 0)
+
+    def test_resize(self):
+        """Test that shrinking the cache evicts entries and clearing empties it."""
+
+        cache = LRUCache(10)
+        for key in 'abcde':
+            cache.put(key, key, 2)
+        cache.set_max_size(4)
+        self.assertEqual(list(cache.entries), ['d', 'e'])
+        cache.clear()
+        self.assertEqual(cache.size, 0)
+        self.assertIsNone(cache.get('e'))
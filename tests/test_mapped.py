@@ -0,0 +1,90 @@
+"""Test mapped."""
+import os
+import shutil
+import tempfile
+import unittest
+from lib import differ
+from lib import mapped
+
+
+class TestMappedLines(unittest.TestCase):
+    """Test reading lines through a memory map."""
+
+    def setUp(self):
+        """Create a folder for the files."""
+
+        self.folder = tempfile.mkdtemp()
+        self.mapped = []
+
+    def tearDown(self):
+        """Close the maps and remove the files."""
+
+        for lines in self.mapped:
+            lines.close()
+        shutil.rmtree(self.folder)
+
+    def map(self, data, encoding='utf-8', key=None, hash_bytes=False):
+        """Write the data to a file and map its lines."""
+
+        path = os.path.join(self.folder, '%d.txt' % len(self.mapped))
+        with open(path, 'wb') as f:
+            f.write(data)
+        lines = mapped.MappedLines(path, encoding, key, hash_bytes)
+        lines.index()
+        self.mapped.append(lines)
+        return lines
+
+    def test_lines(self):
+        """Test that lines are split like the other inputs."""
+
+        for text in ('a\r\nünï\n\nb\rc\r\nlast', 'a\n', '\n', 'a\r\n\r\n', ''):
+            for bom in (b'', mapped.UTF8_BOM):
+                lines = self.map(bom + text.encode('utf-8'))
+                self.assertEqual(list(lines), differ.split_lines(text))
+                self.assertEqual(len(lines), len(differ.split_lines(text)))
+        lines = self.map(b'a\nb\nc')
+        self.assertEqual(lines[1:], ['b', 'c'])
+        self.assertEqual(lines[-1], 'c')
+        self.assertEqual(lines.raw(0), b'a')
+
+    def test_encoding(self):
+        """Test decoding lines of another encoding."""
+
+        lines = self.map('caf\xe9\nna\xefve\n'.encode('latin-1'), 'latin-1')
+        self.assertEqual(list(lines), ['caf\xe9', 'na\xefve'])
+        self.assertTrue(mapped.is_supported_encoding('latin-1'))
+        self.assertFalse(mapped.is_supported_encoding('utf-16'))
+        self.assertFalse(mapped.is_supported_encoding('not-an-encoding'))
+
+    def test_match(self):
+        """Test matching mapped lines with each other and with plain lines."""
+
+        old, new = b'a\nb\nc\nd\n', b'a\nB\nc\nd\ne\n'
+        for hash_bytes in (False, True):
+            a, b = self.map(old, hash_bytes=hash_bytes), self.map(new, hash_bytes=hash_bytes)
+            self.assertEqual(
+                differ.LineMatcher(a, b).get_opcodes(),
+                [('equal', 0, 1, 0, 1), ('replace', 1, 2, 1, 2), ('equal', 2, 4, 2, 4), ('insert', 4, 4, 4, 5)]
+            )
+        b = differ.HashedLines(differ.split_lines(new.decode('utf-8')))
+        self.assertEqual(differ.LineMatcher(self.map(old), b).get_stats()["changed"], 1)
+
+    def test_key(self):
+        """Test that mapped lines are hashed by their normalized form."""
+
+        key = differ.line_key(ignore_case=True)
+        a, b = self.map(b'A\nb\n', key=key), self.map(b'a\nB\n', key=key)
+        self.assertEqual(differ.LineMatcher(a, b).get_opcodes(), [('equal', 0, 2, 0, 2)])
+        self.assertEqual(list(a), ['A', 'b'])
+
+    def test_collision(self):
+        """Test that lines that only matched by hash are split out of the blocks."""
+
+        a = differ.HashedLines(['x', 'y', 'z'])
+        b = differ.HashedLines(['x', 'Y', 'z'])
+        b.ids[1] = a.ids[1]
+        self.assertEqual(differ.LineMatcher(a, b).get_matching_blocks(), [(0, 0, 1), (2, 2, 1), (3, 3, 0)])
+        a = self.map(b'x\ny\nz\n', hash_bytes=True)
+        b = self.map(b'x\nY\nz\n', hash_bytes=True)
+        b.ids[1] = a.ids[1]
+        self.assertEqual(differ.LineMatcher(a, b).get_matching_blocks(), [(0, 0, 1), (2, 2, 1), (3, 3, 0)])
@@ -0,0 +1,80 @@
+"""Test merge."""
+import unittest
+from lib import differ
+from lib import merge
+
+
+class TestMerge3(unittest.TestCase):
+    """Test three-way merges."""
+
+    def merge3(self, base, left, right):
+        """Get a merge of the lines interned by one interner."""
+
+        interner = differ.LineInterner()
+        return merge.Merge3(interner.intern(base), interner.intern(left), interner.intern(right))
+
+    def test_regions(self):
+        """Test changes on one side."""
+
+        m = self.merge3(list('abcde'), list('aBcde'), list('abcdE'))
+        self.assertEqual(
+            list(m.get_regions()),
+            [(merge.UNCHANGED, 0, 1), (merge.LEFT, 1, 2), (merge.UNCHANGED, 2, 4), (merge.RIGHT, 4, 5)]
+        )
+        self.assertEqual(list(m.merge_lines()), list('aBcdE'))
+
+    def test_same(self):
+        """Test identical changes on both sides."""
+
+        m = self.merge3(list('abcde'), list('aBcdef'), list('aBcde'))
+        self.assertEqual(
+            list(m.get_regions()),
+            [(merge.UNCHANGED, 0, 1), (merge.SAME, 1, 2), (merge.UNCHANGED, 2, 5), (merge.LEFT, 5, 6)]
+        )
+        self.assertEqual(list(m.merge_lines()), list('aBcdef'))
+
+    def test_conflict(self):
+        """Test a conflict and the index of its rows."""
+
+        m = self.merge3(list('abcde'), list('aBcde'), list('aXcde'))
+        self.assertEqual(
+            list(m.get_regions()),
+            [(merge.UNCHANGED, 0, 1), (merge.CONFLICT, 1, 2, 1, 2, 1, 2), (merge.UNCHANGED, 2, 5)]
+        )
+        conflicts = merge.ConflictIndex()
+        lines = list(m.merge_lines(("mine", "old", "theirs"), conflicts))
+        self.assertEqual(
+            lines,
+            ['a', '<<<<<<< mine', 'B', '||||||| old', 'b', '=======', 'X', '>>>>>>> theirs', 'c', 'd', 'e']
+        )
+        self.assertEqual(len(conflicts), 1)
+        self.assertEqual(conflicts.conflict_at(4), (1, 7))
+        self.assertIsNone(conflicts.conflict_at(8))
+        self.assertEqual(conflicts.next_conflict(0), 1)
+        self.assertIsNone(conflicts.next_conflict(1))
+        self.assertEqual(conflicts.previous_conflict(5), 1)
+        self.assertIsNone(conflicts.previous_conflict(1))
+        self.assertEqual(merge.split_conflict(lines[1:8]), (['B'], ['b'], ['X']))
+
+    def test_split_conflict(self):
+        """Test that lines that are not a conflict are not split."""
+
+        self.assertIsNone(merge.split_conflict(['a', 'b']))
+        self.assertIsNone(merge.split_conflict(['<<<<<<< left', 'a', '>>>>>>> right']))
+        self.assertEqual(
+            merge.split_conflict(['<<<<<<< left', '||||||| base', '=======', 'x', '>>>>>>> right']),
+            ([], [], ['x'])
+        )
+
+    def test_whitespace_change(self):
+        """Test that a change that an ignore option would hide is kept."""
+
+        m = self.merge3(['a = 1', 'b = 2', 'c = 3'], ['a  =  1', 'b = 2', 'c = 3'], ['a = 1', 'b = 2', 'c = 4'])
+        self.assertEqual(list(m.merge_lines()), ['a  =  1', 'b = 2', 'c = 4'])
+
+    def test_identical(self):
+        """Test a merge without changes."""
+
+        m = self.merge3(list('abc'), list('abc'), list('abc'))
+        self.assertEqual(list(m.get_regions()), [(merge.UNCHANGED, 0, 3)])
+        self.assertEqual(list(self.merge3([], [], []).get_regions()), [])
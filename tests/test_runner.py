@@ -0,0 +1,90 @@
+"""Test runner."""
+import sys
+import threading
+import time
+import unittest
+from lib import runner
+
+
+def python(code):
+    """Get a command that runs Python code."""
+
+    return [sys.executable, "-c", code]
+
+
+class TestRunner(unittest.TestCase):
+    """Test running commands."""
+
+    def setUp(self):
+        """Start with no statistics."""
+
+        runner.clear_stats()
+
+    def tearDown(self):
+        """Restore the default configuration."""
+
+        runner.configure()
+        runner.clear_stats()
+
+    def test_run(self):
+        """Test getting the output of a command."""
+
+        self.assertEqual(runner.run(python("print('out')")).strip(), b"out")
+
+    def test_failed(self):
+        """Test a command that exits with an error."""
+
+        with self.assertRaises(runner.CommandFailedError) as cm:
+            runner.run(python("import sys; sys.stderr.write('bad'); sys.exit(3)"))
+        self.assertEqual(cm.exception.returncode, 3)
+        self.assertEqual(cm.exception.stderr, b"bad")
+        self.assertIn("bad", str(cm.exception))
+        self.assertIsInstance(cm.exception, runner.CommandError)
+
+    def test_not_found(self):
+        """Test a binary that does not exist."""
+
+        with self.assertRaises(runner.CommandNotFoundError):
+            runner.run(["easy-diff-no-such-binary", "status"])
+
+    def test_timeout(self):
+        """Test that only commands with a timeout are killed, and queries use the configured one."""
+
+        start = time.time()
+        with self.assertRaises(runner.CommandTimeoutError):
+            runner.run(python("import time; time.sleep(30)"), timeout=0.3)
+        self.assertLess(time.time() - start, 10)
+
+        runner.configure(query_timeout=0.3)
+        with self.assertRaises(runner.CommandTimeoutError):
+            runner.run(python("import time; time.sleep(30)"), timeout=runner.QUERY)
+        self.assertEqual(runner.run(python("import time; time.sleep(0.5); print(1)")).strip(), b"1")
+
+    def test_stats(self):
+        """Test the timing of commands by binary and subcommand."""
+
+        self.assertEqual(runner.command_name(["/usr/bin/git.exe", "--no-pager", "status", "-s"]), ("git", "status"))
+        exit = python("import sys; sys.exit(int(sys.argv[1]))")
+        runner.run(exit + ["0"])
+        with self.assertRaises(runner.CommandFailedError):
+            runner.run(exit + ["1"])
+        stats = runner.get_stats()
+        self.assertEqual(len(stats), 1)
+        self.assertEqual(stats[0][2:4], (2, 1))
+        runner.clear_stats()
+        self.assertEqual(runner.get_stats(), [])
+
+    def test_max_processes(self):
+        """Test that commands wait for a free slot."""
+
+        runner.configure(max_processes=1)
+        threads = [
+            threading.Thread(target=runner.run, args=(python("import time; time.sleep(0.3)"),)) for _ in range(2)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        stats = runner.get_stats()[0]
+        self.assertEqual(stats[2], 2)
+        self.assertGreater(stats[4], 0.1)
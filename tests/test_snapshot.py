@@ -0,0 +1,55 @@
+"""Test snapshot."""
+import unittest
+from lib import differ
+from lib import snapshot
+
+TEXT = 'ascii\r\nünïcödé line\n\n€uro 😀 emoji\r\nlast'
+
+
+class TestTextSnapshot(unittest.TestCase):
+    """Test text snapshots."""
+
+    def setUp(self):
+        """Use small checkpoint and line blocks so they are crossed."""
+
+        self.sizes = snapshot.CHECKPOINT_CHARS, snapshot.LINE_BLOCK_SIZE
+        snapshot.CHECKPOINT_CHARS = 5
+        snapshot.LINE_BLOCK_SIZE = 8
+
+    def tearDown(self):
+        """Restore the sizes."""
+
+        snapshot.CHECKPOINT_CHARS, snapshot.LINE_BLOCK_SIZE = self.sizes
+
+    def test_substr(self):
+        """Test slices at every pair of offsets."""
+
+        for text in (TEXT, TEXT.encode('ascii', 'replace').decode('ascii'), ''):
+            snap = snapshot.TextSnapshot(text)
+            self.assertEqual(len(snap), len(text))
+            for begin in range(len(text) + 1):
+                for end in range(begin, len(text) + 1):
+                    self.assertEqual(snap.substr(begin, end), text[begin:end])
+            self.assertEqual(snap.substr(-5, len(text) + 5), text)
+            self.assertEqual(snap.substr(3, 1), '')
+
+    def test_byte_offset(self):
+        """Test mapping character offsets to byte offsets."""
+
+        snap = snapshot.TextSnapshot(TEXT)
+        for pt in range(len(TEXT) + 1):
+            self.assertEqual(snap.byte_offset(pt), len(TEXT[:pt].encode('utf-8')))
+
+    def test_lines(self):
+        """Test that lines are split like the other inputs."""
+
+        for text in (TEXT, TEXT + '\n', TEXT + '\r\n', '\n', 'a\rb', ''):
+            snap = snapshot.TextSnapshot(text)
+            lines = differ.split_lines(text)
+            self.assertEqual(list(snap.lines()), lines)
+            self.assertEqual(snap.line_count(), len(lines))
+            self.assertEqual([snap.line(row) for row in range(snap.line_count())], lines)
+            self.assertEqual(
+                [bytes(snap.raw(row)) for row in range(len(lines))],
+                [line.encode('utf-8') for line in lines]
+            )
@@ -0,0 +1,73 @@
+"""Test VC root."""
+import os
+from os.path import join
+import shutil
+import tempfile
+import unittest
+from lib import vcroot
+
+
+class TestVCRoot(unittest.TestCase):
+    """Test finding working copy roots."""
+
+    def setUp(self):
+        """Create a folder tree."""
+
+        self.interval = vcroot.VALIDATE_INTERVAL
+        self.top = os.path.realpath(tempfile.mkdtemp())
+        self.folder = join(self.top, 'one', 'two')
+        os.makedirs(self.folder)
+        self.file = join(self.folder, 'file.txt')
+        with open(self.file, 'w') as f:
+            f.write('text')
+        vcroot.clear()
+
+    def tearDown(self):
+        """Remove the folder tree."""
+
+        vcroot.VALIDATE_INTERVAL = self.interval
+        vcroot.clear()
+        shutil.rmtree(self.top)
+
+    def touch(self, folder, offset):
+        """Move the modification time of a folder so the change is seen on any file system."""
+
+        stat = os.stat(folder)
+        os.utime(folder, (stat.st_atime, stat.st_mtime + offset))
+
+    def test_roots(self):
+        """Test that the closest control directory of each kind is found."""
+
+        os.mkdir(join(self.top, vcroot.GIT))
+        os.mkdir(join(self.top, 'one', vcroot.HG))
+        git, hg, _ = vcroot.get_roots(self.file)
+        self.assertEqual(git, self.top)
+        self.assertEqual(hg, join(self.top, 'one'))
+        self.assertEqual(vcroot.get_root(self.folder, vcroot.HG), join(self.top, 'one'))
+        self.assertEqual(vcroot.get_root(join(self.top, 'one'), vcroot.GIT), self.top)
+
+    def test_invalidate(self):
+        """Test that answers are trusted for a while and then checked for changes."""
+
+        vcroot.VALIDATE_INTERVAL = 3600
+        before = vcroot.get_root(self.file, vcroot.GIT)
+        os.mkdir(join(self.top, vcroot.GIT))
+        self.touch(self.top, 1)
+        self.assertEqual(vcroot.get_root(self.file, vcroot.GIT), before)
+
+        vcroot.VALIDATE_INTERVAL = 0
+        self.assertEqual(vcroot.get_root(self.file, vcroot.GIT), self.top)
+
+        os.rmdir(join(self.top, vcroot.GIT))
+        self.touch(self.top, 2)
+        self.assertEqual(vcroot.get_root(self.file, vcroot.GIT), before)
+
+    def test_file_replaced(self):
+        """Test that a file replaced by a folder is looked up as a folder once rechecked."""
+
+        vcroot.VALIDATE_INTERVAL = 0
+        self.assertEqual(vcroot.get_roots(self.file), vcroot.get_roots(self.folder))
+        os.remove(self.file)
+        os.makedirs(join(self.file, vcroot.SVN))
+        self.touch(self.folder, 1)
+        self.assertEqual(vcroot.get_root(self.file, vcroot.SVN), self.file)